@@ -0,0 +1,253 @@
+#!/usr/bin/env python3
+"""
+Analytics Engine
+Vectorised click history analytics over NumPy arrays
+
+A link's clicks are fetched in chunks as two integer columns, epoch
+milliseconds (sorted) and a device code, and every statistic is computed
+with array operations instead of a Python loop per click:
+
+    timeline        clicks per bucket (bincount over bucket indexes)
+    rolling_average trailing mean of the timeline (cumulative sums)
+    heatmap         weekday x hour-of-day counts in the requested timezone
+    device_by_day   device x local-day count matrix
+    click_gaps      percentiles of the time between consecutive clicks
+
+Timezones with DST are handled by looking up the UTC offset once per day
+(and per quarter hour on days with a transition), then mapping every click
+to its offset with the day index.
+"""
+
+from datetime import datetime, timedelta, timezone
+from itertools import chain
+import re
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+
+import numpy as np
+from sqlalchemy import BigInteger, Integer, case, cast, func
+
+
+MS_PER_SECOND = 1000
+SECONDS_PER_DAY = 86400
+SECONDS_PER_WEEK = 7 * SECONDS_PER_DAY
+# 1970-01-01 was a Thursday; shifting by 3 days makes Monday weekday 0
+EPOCH_WEEKDAY_SHIFT = 3 * SECONDS_PER_DAY
+
+DURATION_UNITS = {'m': 60, 'h': 3600, 'd': SECONDS_PER_DAY, 'w': SECONDS_PER_WEEK}
+BUCKET_NAMES = {'hour': 3600, 'day': SECONDS_PER_DAY, 'week': SECONDS_PER_WEEK}
+GAP_PERCENTILES = (50, 90, 99)
+
+
+def parse_duration(value, name):
+    """'15m', '6h', '7d', '2w' -> seconds; raises ValueError naming the parameter"""
+    match = re.fullmatch(r'(\d+)([mhdw])', value or '')
+    if not match or int(match.group(1)) == 0:
+        raise ValueError(f'{name} must look like 15m, 6h, 7d or 2w')
+    return int(match.group(1)) * DURATION_UNITS[match.group(2)]
+
+
+def parse_bucket(value):
+    """Bucket size in seconds: hour, day, week or a duration that divides a week"""
+    seconds = BUCKET_NAMES.get(value) or parse_duration(value, 'bucket')
+    if SECONDS_PER_WEEK % seconds:
+        raise ValueError('bucket must divide a week evenly (e.g. 15m, 1h, 6h, 1d, 1w)')
+    return seconds
+
+
+def parse_timezone(value):
+    try:
+        return ZoneInfo(value)
+    except (ZoneInfoNotFoundError, ValueError):
+        raise ValueError(f'unknown timezone {value!r}')
+
+
+def epoch_ms(dialect, column):
+    """SQL for a naive UTC DateTime column as integer epoch milliseconds"""
+    if dialect == 'sqlite':
+        return cast(func.round((func.julianday(column) - 2440587.5) * 86400000.0), Integer)
+    return cast(func.extract('epoch', column) * 1000, BigInteger)
+
+
+def device_codes(column, devices):
+    """SQL mapping device_type to its index in devices; anything else gets the last code"""
+    return case({device: code for code, device in enumerate(devices[:-1])},
+                value=column, else_=len(devices) - 1)
+
+
+class ClickHistory:
+    """
+    Sorted click timestamps (epoch ms, int64) with a device code (uint8) each
+
+    Build with from_result() from rows of (epoch_ms, device_code) ordered by
+    time; `devices` names the codes.
+    """
+
+    def __init__(self, timestamps, codes, devices):
+        self.timestamps = timestamps
+        self.codes = codes
+        self.devices = list(devices)
+
+    @classmethod
+    def from_result(cls, result, devices, chunk_size=100000):
+        """Read a (streamed) result chunk by chunk into two arrays"""
+        # Both columns are plain integers, so the DBAPI cursor's tuples are read
+        # directly; wrapping millions of them in Row objects costs more than the
+        # query. A streamed result has already buffered its first row, so that
+        # one is taken through the Result before switching to the cursor.
+        rows = [tuple(row) for row in result.fetchmany(1)]
+        times, codes = [], []
+        while rows:
+            chunk = np.fromiter(chain.from_iterable(rows), np.int64, 2 * len(rows)).reshape(-1, 2)
+            times.append(chunk[:, 0])
+            codes.append(chunk[:, 1].astype(np.uint8))
+            rows = result.cursor.fetchmany(chunk_size)
+        if not times:
+            return cls(np.empty(0, np.int64), np.empty(0, np.uint8), devices)
+        return cls(np.concatenate(times), np.concatenate(codes), devices)
+
+    def __len__(self):
+        return len(self.timestamps)
+
+    def local_seconds(self, tz):
+        """Epoch seconds shifted by each click's UTC offset in tz (wall-clock seconds)"""
+        seconds = self.timestamps // MS_PER_SECOND
+        if not len(seconds):
+            return seconds
+        return seconds + utc_offsets(seconds, tz)
+
+    def summarize(self, start, end, bucket, tz, window=7):
+        """
+        All history statistics for clicks in [start, end) (aware datetimes)
+
+        Buckets are aligned to local midnight (weeks to Monday) in tz, and
+        every bucket in the range is reported, including empty ones.
+        """
+        start_ms = int(start.timestamp() * MS_PER_SECOND)
+        end_ms = int(end.timestamp() * MS_PER_SECOND)
+        lo, hi = np.searchsorted(self.timestamps, [start_ms, end_ms])
+        view = ClickHistory(self.timestamps[lo:hi], self.codes[lo:hi], self.devices)
+        local = view.local_seconds(tz)
+
+        first_bucket, buckets = bucket_range(start, end, tz, bucket)
+        index = bucket_index(local, bucket) - bucket_index(first_bucket, bucket)
+        counts = np.bincount(np.clip(index, 0, buckets - 1), minlength=buckets)
+
+        return {
+            'start': start.isoformat(),
+            'end': end.isoformat(),
+            'timezone': str(tz),
+            'bucket_seconds': bucket,
+            'total_clicks': len(view),
+            'device_breakdown': view.device_counts(),
+            'timeline': [
+                {'start': local_label(first_bucket + i * bucket), 'clicks': int(count)}
+                for i, count in enumerate(counts)
+            ],
+            'rolling_average': {
+                'window': window,
+                'values': [round(float(value), 3) for value in rolling_average(counts, window)],
+            },
+            'heatmap': heatmap(local).tolist(),
+            'device_by_day': view.device_by_day(local),
+            'click_gaps': click_gaps(view.timestamps),
+        }
+
+    def device_counts(self):
+        counts = np.bincount(self.codes, minlength=len(self.devices))
+        return {device: int(count) for device, count in zip(self.devices, counts) if count}
+
+    def device_by_day(self, local):
+        """{'days': [...], 'devices': [...], 'counts': [[per device] per day]} over local days"""
+        if not len(local):
+            return {'days': [], 'devices': self.devices, 'counts': []}
+        days = local // SECONDS_PER_DAY
+        first = int(days[0])
+        span = int(days[-1]) - first + 1
+        matrix = np.bincount((days - first) * len(self.devices) + self.codes,
+                             minlength=span * len(self.devices)).reshape(span, len(self.devices))
+        keep = matrix.any(axis=1)
+        return {
+            'days': [local_label((first + day) * SECONDS_PER_DAY)[:10] for day in np.flatnonzero(keep)],
+            'devices': self.devices,
+            'counts': matrix[keep].tolist(),
+        }
+
+
+def utc_offsets(seconds, tz):
+    """UTC offset in seconds for each of the sorted epoch seconds in tz"""
+    if tz == timezone.utc or str(tz) == 'UTC':
+        return np.zeros(len(seconds), np.int64)
+    first_day = int(seconds[0]) // SECONDS_PER_DAY
+    last_day = int(seconds[-1]) // SECONDS_PER_DAY
+    day_offsets = np.array([_offset(day * SECONDS_PER_DAY, tz) for day in range(first_day, last_day + 2)],
+                           dtype=np.int64)
+    offsets = day_offsets[seconds // SECONDS_PER_DAY - first_day]
+
+    # Days whose offset changes by the next midnight: resolve per quarter hour
+    for day in np.flatnonzero(day_offsets[:-1] != day_offsets[1:]):
+        day_start = (first_day + int(day)) * SECONDS_PER_DAY
+        lo, hi = np.searchsorted(seconds, [day_start, day_start + SECONDS_PER_DAY])
+        quarter_offsets = np.array([_offset(day_start + q * 900, tz) for q in range(96)], dtype=np.int64)
+        offsets[lo:hi] = quarter_offsets[(seconds[lo:hi] - day_start) // 900]
+    return offsets
+
+
+def _offset(epoch_seconds, tz):
+    return int(datetime.fromtimestamp(epoch_seconds, tz).utcoffset().total_seconds())
+
+
+def bucket_range(start, end, tz, bucket):
+    """(first bucket start in wall-clock seconds, number of buckets) covering [start, end)"""
+    first = local_floor(start, tz, bucket)
+    last = local_floor(end - timedelta(microseconds=1), tz, bucket)
+    return first, (last - first) // bucket + 1
+
+
+def local_floor(moment, tz, bucket):
+    """Wall-clock epoch seconds of the start of moment's bucket in tz"""
+    local = moment.astimezone(tz)
+    seconds = int(local.replace(tzinfo=timezone.utc).timestamp())
+    if bucket == SECONDS_PER_WEEK:
+        return bucket_index(seconds, bucket) * bucket - EPOCH_WEEKDAY_SHIFT
+    return bucket_index(seconds, bucket) * bucket
+
+
+def bucket_index(local, bucket):
+    """Bucket number of wall-clock seconds (scalar or array); weekly buckets start on Monday"""
+    if bucket == SECONDS_PER_WEEK:
+        return (local + EPOCH_WEEKDAY_SHIFT) // bucket
+    return local // bucket
+
+
+def local_label(local_seconds):
+    """ISO wall-clock time (no offset) for wall-clock epoch seconds"""
+    return datetime.fromtimestamp(int(local_seconds), timezone.utc).replace(tzinfo=None).isoformat()
+
+
+def rolling_average(counts, window):
+    """Trailing mean over `window` buckets; the first buckets average what exists so far"""
+    if not len(counts):
+        return counts.astype(float)
+    sums = np.cumsum(counts, dtype=np.float64)
+    sums[window:] = sums[window:] - sums[:-window]
+    return sums / np.minimum(np.arange(1, len(counts) + 1), window)
+
+
+def heatmap(local):
+    """7 x 24 click counts, rows Monday..Sunday, columns local hour of day"""
+    weekday = ((local + EPOCH_WEEKDAY_SHIFT) // SECONDS_PER_DAY) % 7
+    hour = (local % SECONDS_PER_DAY) // 3600
+    return np.bincount(weekday * 24 + hour, minlength=7 * 24).reshape(7, 24)
+
+
+def click_gaps(timestamps):
+    """Seconds between consecutive clicks: percentiles, mean and max"""
+    if len(timestamps) < 2:
+        return None
+    gaps = np.diff(timestamps) / MS_PER_SECOND
+    values = np.percentile(gaps, GAP_PERCENTILES)
+    return {
+        **{f'p{pct}': round(float(value), 3) for pct, value in zip(GAP_PERCENTILES, values)},
+        'mean': round(float(gaps.mean()), 3),
+        'max': round(float(gaps.max()), 3),
+    }
@@ -5,25 +5,122 @@ Minimal standalone service for generating and handling smart redirect links
 Deploy this to any free cloud service (Render, Railway, Fly.io, etc.)
 """
 
-from flask import Flask, request, jsonify, redirect
+from flask import Flask, Response, g, request, jsonify, redirect, stream_with_context
 from flask_sqlalchemy import SQLAlchemy
-from datetime import datetime
-import secrets
+from sqlalchemy import event, insert, update, select, func, tuple_
+from sqlalchemy.engine import make_url
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+from sqlalchemy.orm.exc import StaleDataError
+from datetime import datetime, date, timedelta, timezone
+import atexit
+import base64
+import csv
+import hashlib
+import io
+import json
+import random
 import os
+import time
+
+from link_cache import LinkCache, LinkRecord, TTLCache, LINK_RECORD_FIELDS
+from link_index import LinkIndex
+from link_changes import LinkChangeFeed
+from click_writer import ClickWriter, ClickEvent
+from device_classifier import DeviceClassifier, BOT_RULES
+from counters import increment_counters, greatest
+from metrics import Registry
+from tokens import make_generator
+from rate_limit import TokenBucketLimiter
+from geoip import GeoIP
+from interning import StringInterner
+from profiling import RequestProfiler
+from analytics_engine import (ClickHistory, bucket_range, device_codes, epoch_ms,
+                              parse_bucket, parse_duration, parse_timezone)
 
 app = Flask(__name__)
 
 # Database configuration
-app.config['SQLALCHEMY_DATABASE_URI'] = os.environ.get('DATABASE_URL', 'sqlite:///links.db')
+def database_url(url):
+    """Fix for Heroku postgres URL"""
+    if url.startswith('postgres://'):
+        return url.replace('postgres://', 'postgresql://', 1)
+    return url
+
+
+def pool_options(url, prefix, pool_size, max_overflow, pool_timeout):
+    """Connection pool sizing from {prefix}_POOL_SIZE, _MAX_OVERFLOW and _POOL_TIMEOUT"""
+    if make_url(url).database in (None, '', ':memory:'):
+        return {}  # in-memory SQLite uses a single static connection
+    return {
+        'pool_size': int(os.environ.get(f'{prefix}_POOL_SIZE', pool_size)),
+        'max_overflow': int(os.environ.get(f'{prefix}_MAX_OVERFLOW', max_overflow)),
+        'pool_timeout': float(os.environ.get(f'{prefix}_POOL_TIMEOUT', pool_timeout)),
+    }
+
+
+app.config['SQLALCHEMY_DATABASE_URI'] = database_url(os.environ.get('DATABASE_URL', 'sqlite:///links.db'))
 app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
 
-# Fix for Heroku postgres URL
-if app.config['SQLALCHEMY_DATABASE_URI'].startswith('postgres://'):
-    app.config['SQLALCHEMY_DATABASE_URI'] = app.config['SQLALCHEMY_DATABASE_URI'].replace('postgres://', 'postgresql://', 1)
+# Redirects and link creation use the primary engine. Stats, analytics and
+# exports use a second engine with its own pool, on a replica when
+# DATABASE_READ_URL is set, so heavy reads cannot take every connection.
+READ_ENGINE_SPLIT = os.environ.get('DB_READ_SPLIT', '1') == '1'
+READ_DATABASE_URI = database_url(os.environ.get('DATABASE_READ_URL') or app.config['SQLALCHEMY_DATABASE_URI'])
+
+app.config['SQLALCHEMY_ENGINE_OPTIONS'] = pool_options(
+    app.config['SQLALCHEMY_DATABASE_URI'], 'DB', pool_size=5, max_overflow=10, pool_timeout=30)
+if READ_ENGINE_SPLIT:
+    app.config['SQLALCHEMY_BINDS'] = {
+        'read': {'url': READ_DATABASE_URI, **pool_options(
+            READ_DATABASE_URI, 'DB_READ', pool_size=5, max_overflow=10, pool_timeout=30)},
+    }
 
 db = SQLAlchemy(app)
 
 
+# SQLite tuning, applied to every new connection
+SQLITE_PRAGMAS = {
+    'busy_timeout': int(os.environ.get('SQLITE_BUSY_TIMEOUT', 5000)),  # ms to wait for a lock
+    'journal_mode': os.environ.get('SQLITE_JOURNAL_MODE', 'WAL'),  # readers don't block the writer
+    'synchronous': os.environ.get('SQLITE_SYNCHRONOUS', 'NORMAL'),  # with WAL, fsync at checkpoints only
+}
+
+
+def tune_sqlite(dbapi_connection, connection_record):
+    cursor = dbapi_connection.cursor()
+    for name, value in SQLITE_PRAGMAS.items():
+        cursor.execute(f'PRAGMA {name}={value}')
+    cursor.close()
+
+
+with app.app_context():
+    for engine in db.engines.values():
+        if engine.dialect.name == 'sqlite':
+            event.listen(engine, 'connect', tune_sqlite)
+
+
+def read_engine():
+    """Engine for read-only routes (the primary engine if the split is disabled)"""
+    return db.engines['read'] if READ_ENGINE_SPLIT else db.engine
+
+
+def read_session():
+    """Session on read_engine() for the current app context, closed on teardown"""
+    if not READ_ENGINE_SPLIT:
+        return db.session
+    if 'read_session' not in g:
+        g.read_session = Session(read_engine(), autoflush=False)
+    return g.read_session
+
+
+@app.teardown_appcontext
+def close_read_session(exception):
+    session = g.pop('read_session', None)
+    if session is not None:
+        session.close()
+
+
 # Database Models
 class SmartLink(db.Model):
     __tablename__ = 'smart_links'
@@ -47,8 +144,14 @@ class SmartLink(db.Model):
     
     is_active = db.Column(db.Boolean, default=True)
     
+    # Edits (PATCH /api/links/<token>) bump version; stale writes fail with StaleDataError
+    version = db.Column(db.Integer, nullable=False, default=1)
+    updated_at = db.Column(db.DateTime)
+    
     # Relationship to clicks
     clicks = db.relationship('LinkClick', backref='link', lazy='dynamic', cascade='all, delete-orphan')
+    
+    __mapper_args__ = {'version_id_col': version}
 
 
 class LinkClick(db.Model):
@@ -67,13 +170,628 @@ class LinkClick(db.Model):
     # Redirect info
     redirected_to = db.Column(db.Text)  # Which URL was used
     
+    # Normalized storage (CLICK_STORAGE=normalized) leaves user_agent and
+    # redirected_to empty and keeps these instead
+    user_agent_id = db.Column(db.BigInteger)  # user_agents.id
+    destination_id = db.Column(db.BigInteger)  # destinations.id
+    
+    __table_args__ = (
+        # Serves per-link time-ordered scans and keyset pagination
+        db.Index('ix_link_clicks_link_id_clicked_at', 'link_id', 'clicked_at'),
+    )
+    
+    def to_dict(self, destinations=None):
+        """destinations ({destination_id: url}, see destination_urls()) resolves redirected_to for normalized rows"""
+        redirected_to = self.redirected_to
+        if redirected_to is None and destinations is not None and self.destination_id is not None:
+            redirected_to = destinations.get(self.destination_id)
+        return {
+            'id': self.id,
+            'device_type': self.device_type,
+            'clicked_at': self.clicked_at.isoformat(),
+            'ip_address': self.ip_address,
+            'country': self.country,
+            'redirected_to': redirected_to
+        }
+    
     def __repr__(self):
         return f'<LinkClick {self.id} - {self.device_type} at {self.clicked_at}>'
 
 
-# Create tables
-with app.app_context():
-    db.create_all()
+class LinkChange(db.Model):
+    """One row per committed link edit, polled by every worker (see link_changes.py)"""
+    __tablename__ = 'link_changes'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    link_id = db.Column(db.Integer, nullable=False)
+    token = db.Column(db.String(64), nullable=False)
+    version = db.Column(db.Integer, nullable=False)
+    changed_at = db.Column(db.DateTime, nullable=False, index=True)
+
+
+class UserAgent(db.Model):
+    """Distinct User-Agent strings, keyed by a 64-bit hash (see interning.py)"""
+    __tablename__ = 'user_agents'
+    
+    id = db.Column(db.BigInteger, primary_key=True, autoincrement=False)
+    user_agent = db.Column(db.Text, nullable=False)
+
+
+class Destination(db.Model):
+    """Distinct destination URLs of normalized clicks, keyed by a 64-bit hash"""
+    __tablename__ = 'destinations'
+    
+    id = db.Column(db.BigInteger, primary_key=True, autoincrement=False)
+    url = db.Column(db.Text, nullable=False)
+
+
+class ClickRollup(db.Model):
+    """Clicks per link per day per device, maintained as clicks are recorded"""
+    __tablename__ = 'click_rollups'
+    
+    link_id = db.Column(db.Integer, db.ForeignKey('smart_links.id'), primary_key=True)
+    day = db.Column(db.Date, primary_key=True)
+    device_type = db.Column(db.String(20), primary_key=True)
+    clicks = db.Column(db.Integer, nullable=False, default=0)
+    
+    def __repr__(self):
+        return f'<ClickRollup {self.link_id} {self.day} {self.device_type}: {self.clicks}>'
+
+
+class CountryRollup(db.Model):
+    """Clicks per link per day per country ('unknown' when unresolved)"""
+    __tablename__ = 'country_rollups'
+    
+    link_id = db.Column(db.Integer, db.ForeignKey('smart_links.id'), primary_key=True)
+    day = db.Column(db.Date, primary_key=True)
+    country = db.Column(db.String(8), primary_key=True)
+    clicks = db.Column(db.Integer, nullable=False, default=0)
+    
+    def __repr__(self):
+        return f'<CountryRollup {self.link_id} {self.day} {self.country}: {self.clicks}>'
+
+
+class LinkCounterShard(db.Model):
+    """
+    Partial click counter for a link
+    
+    Clicks are spread over CLICK_COUNTER_SHARDS rows per link so concurrent
+    writers on a viral link do not all lock the same smart_links row. The
+    true total is smart_links.click_count plus the sum of the shards;
+    compact_counters.py folds shards back into smart_links.
+    """
+    __tablename__ = 'link_counter_shards'
+    
+    link_id = db.Column(db.Integer, db.ForeignKey('smart_links.id'), primary_key=True)
+    shard = db.Column(db.SmallInteger, primary_key=True, autoincrement=False)
+    clicks = db.Column(db.Integer, nullable=False, default=0)
+    last_clicked_at = db.Column(db.DateTime)
+
+
+ROLLUP_KEY = ['link_id', 'day', 'device_type']
+COUNTRY_ROLLUP_KEY = ['link_id', 'day', 'country']
+SHARD_KEY = ['link_id', 'shard']
+
+
+def rollup_rows(counts, key=ROLLUP_KEY):
+    """Turn {(link_id, day, device_type): clicks} (or another key) into key-ordered rows for increment_counters"""
+    return [
+        {**dict(zip(key, values)), 'clicks': clicks}
+        for values, clicks in sorted(counts.items())
+    ]
+
+
+def as_date(value):
+    """SQL date() comes back as a string on SQLite and a date on PostgreSQL"""
+    return date.fromisoformat(value) if isinstance(value, str) else value
+
+
+def click_user_agent():
+    """SQL for a click's User-Agent in either storage mode (outer join UserAgent first)"""
+    return func.coalesce(LinkClick.user_agent, UserAgent.user_agent)
+
+
+def click_destination():
+    """SQL for a click's destination URL in either storage mode (outer join Destination first)"""
+    return func.coalesce(LinkClick.redirected_to, Destination.url)
+
+
+def destination_urls(session, clicks):
+    """{destination_id: url} for a page of normalized LinkClick rows, in one query"""
+    ids = {click.destination_id for click in clicks if click.destination_id is not None}
+    if not ids:
+        return {}
+    return dict(session.query(Destination.id, Destination.url).filter(Destination.id.in_(ids)))
+
+
+def click_totals(links, session=None):
+    """
+    Return {link_id: (click_count, last_clicked_at)} for SmartLink rows
+    
+    Adds clicks still held in link_counter_shards to the compacted totals.
+    """
+    totals = {link.id: (link.click_count or 0, link.last_clicked_at) for link in links}
+    if not totals:
+        return totals
+    
+    shard_rows = (session or db.session).query(
+        LinkCounterShard.link_id,
+        func.sum(LinkCounterShard.clicks),
+        func.max(LinkCounterShard.last_clicked_at)
+    ).filter(LinkCounterShard.link_id.in_(list(totals))).group_by(LinkCounterShard.link_id).all()
+    
+    for link_id, clicks, last in shard_rows:
+        count, link_last = totals[link_id]
+        if link_last is None or (last is not None and last > link_last):
+            link_last = last
+        totals[link_id] = (count + int(clicks or 0), link_last)
+    return totals
+
+
+def encode_click_cursor(click):
+    """Opaque keyset cursor pointing just past a click in (clicked_at, id) DESC order"""
+    raw = f'{click.clicked_at.isoformat()}|{click.id}'
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def decode_click_cursor(cursor):
+    """Inverse of encode_click_cursor; raises ValueError on malformed input"""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)).decode()
+        clicked_at, click_id = raw.split('|')
+        return datetime.fromisoformat(clicked_at), int(click_id)
+    except Exception:
+        raise ValueError('invalid cursor')
+
+
+# Schema is managed by migrations.py: run `python migrate.py` once per deploy
+
+
+# Shared memory-mapped snapshot of active links (see build_link_index.py)
+link_index = LinkIndex.for_path(
+    os.environ.get('LINK_INDEX_PATH'),
+    check_interval=float(os.environ.get('LINK_INDEX_CHECK_INTERVAL', 5)),
+)
+
+
+# Link resolution cache (per worker process)
+def load_link_record(token):
+    """
+    Load the redirect columns for a token
+    
+    Tries the shared link index first and falls back to the database for
+    tokens created (or reactivated) since the snapshot was built.
+    """
+    if link_index is not None:
+        record = link_index.get(token)
+        if record is not None:
+            return record
+    
+    columns = [getattr(SmartLink, name) for name in LINK_RECORD_FIELDS]
+    row = db.session.query(*columns).filter(SmartLink.token == token).first()
+    return LinkRecord(*row) if row else None
+
+
+link_cache = LinkCache(
+    load_link_record,
+    maxsize=int(os.environ.get('LINK_CACHE_SIZE', 10000)),
+    ttl=float(os.environ.get('LINK_CACHE_TTL', 60)),
+    negative_ttl=float(os.environ.get('LINK_CACHE_NEGATIVE_TTL', 5)),
+)
+
+
+@event.listens_for(SmartLink, 'after_insert')
+@event.listens_for(SmartLink, 'after_update')
+@event.listens_for(SmartLink, 'after_delete')
+def _queue_link_invalidation(mapper, connection, target):
+    """Remember changed tokens so they can be evicted once the change commits"""
+    session = Session.object_session(target)
+    if session is not None:
+        session.info.setdefault('changed_tokens', set()).add(target.token)
+
+
+@event.listens_for(SmartLink, 'after_update')
+def _log_link_change(mapper, connection, target):
+    """Add a link_changes row in the edit's transaction so other workers evict the link"""
+    session = Session.object_session(target)
+    if session is None or not session.is_modified(target, include_collections=False):
+        return  # flushed without net changes, so no UPDATE was issued
+    changed_at = target.updated_at or datetime.utcnow()
+    connection.execute(LinkChange.__table__.insert().values(
+        link_id=target.id, token=target.token, version=target.version, changed_at=changed_at
+    ))
+    session.info.setdefault('edited_links', {})[target.token] = changed_at
+
+
+@event.listens_for(Session, 'after_commit')
+def _invalidate_changed_links(session):
+    for token in session.info.pop('changed_tokens', ()):
+        link_cache.invalidate(token)
+    for token, changed_at in session.info.pop('edited_links', {}).items():
+        apply_link_change(token, changed_at.replace(tzinfo=timezone.utc).timestamp())
+
+
+@event.listens_for(Session, 'after_rollback')
+def _discard_changed_links(session):
+    session.info.pop('changed_tokens', None)
+    session.info.pop('edited_links', None)
+
+
+# Cross-worker invalidation: every worker polls link_changes (see link_changes.py)
+LINK_CHANGES_POLL_INTERVAL = float(os.environ.get('LINK_CHANGES_POLL_INTERVAL', 1))
+
+
+def fetch_link_changes(since):
+    """(id, token, changed_at epoch seconds) for changes logged at or after since"""
+    query = select(LinkChange.id, LinkChange.token, LinkChange.changed_at).where(
+        LinkChange.changed_at >= datetime.fromtimestamp(since, timezone.utc).replace(tzinfo=None)
+    ).order_by(LinkChange.id)
+    # Read from the primary: a lagging replica would only delay the eviction
+    with app.app_context():
+        with db.engine.connect() as connection:
+            rows = connection.execute(query).all()
+    return [(change_id, token, changed_at.replace(tzinfo=timezone.utc).timestamp())
+            for change_id, token, changed_at in rows]
+
+
+def apply_link_change(token, changed_at):
+    """Stop serving token from this worker's cache and from an older link index snapshot"""
+    if link_index is not None:
+        link_index.mark_changed(token, changed_at)
+    link_cache.invalidate(token)
+
+
+link_changes = LinkChangeFeed(
+    fetch_link_changes,
+    apply_link_change,
+    poll_interval=LINK_CHANGES_POLL_INTERVAL,
+    overlap=float(os.environ.get('LINK_CHANGES_OVERLAP', 5)),
+    # Replay edits the current index snapshot predates so they are not served from it
+    initial_since=(link_index.built_at - link_index.change_margin
+                   if link_index is not None and link_index.built_at else None),
+)
+
+
+# Device detection
+device_classifier = DeviceClassifier(cache_size=int(os.environ.get('UA_CACHE_SIZE', 4096)))
+bot_classifier = DeviceClassifier(BOT_RULES, default='human', cache_size=int(os.environ.get('UA_CACHE_SIZE', 4096)))
+
+# Country lookup from a local IP range file (see geoip.py); None leaves country empty
+geoip = GeoIP.open_if_exists(
+    os.environ.get('GEOIP_DB_PATH'),
+    cache_size=int(os.environ.get('GEOIP_CACHE_SIZE', 65536)),
+)
+
+
+# Metrics (see /metrics)
+metrics = Registry(flush_interval=float(os.environ.get('METRICS_FLUSH_INTERVAL', 2)))
+
+HTTP_REQUESTS = metrics.counter(
+    'http_requests_total', 'HTTP requests by route, method and status', ['route', 'method', 'status'])
+HTTP_LATENCY = metrics.histogram(
+    'http_request_duration_seconds', 'HTTP request latency by route', ['route'])
+REDIRECT_STAGE = metrics.histogram(
+    'redirect_stage_seconds', 'Time spent in each stage of a redirect', ['stage'])
+REDIRECTS = metrics.counter(
+    'redirects_total', 'Redirects served by detected device type', ['device_type'])
+CLICK_EVENTS = metrics.counter(
+    'click_events_total', 'Click events by write-behind outcome', ['outcome'])
+CLICK_QUEUE_DEPTH = metrics.gauge(
+    'click_queue_depth', 'Click events waiting to be written')
+LINK_CACHE_LOOKUPS = metrics.counter(
+    'link_cache_lookups_total', 'Token lookups by cache result', ['result'])
+LINK_CACHE_EVICTIONS = metrics.counter(
+    'link_cache_evictions_total', 'Link cache entries evicted to stay within size')
+BOT_REDIRECTS = metrics.counter(
+    'bot_redirects_total', 'Redirects served to bots by category', ['category'])
+CLICKS_FILTERED = metrics.counter(
+    'clicks_filtered_total', 'Redirects served without recording a click, by reason', ['reason'])
+RESPONSE_CACHE_LOOKUPS = metrics.counter(
+    'response_cache_lookups_total', 'Stats/analytics response cache lookups by result', ['result'])
+DB_POOL = metrics.gauge(
+    'db_pool_connections', 'Database connection pool state', ['pool', 'state'])
+
+
+# Click recording
+# raw: each click row keeps the full User-Agent and destination URL
+# normalized: User-Agents and destination URLs are interned in user_agents and
+# destinations and referenced by 64-bit ids, for much smaller rows
+CLICK_STORAGE = os.environ.get('CLICK_STORAGE', 'raw')
+if CLICK_STORAGE not in ('raw', 'normalized'):
+    raise ValueError(f'CLICK_STORAGE must be raw or normalized, got {CLICK_STORAGE!r}')
+
+user_agent_interner = StringInterner(
+    UserAgent, 'user_agent', maxsize=int(os.environ.get('UA_INTERN_CACHE_SIZE', 100000)))
+destination_interner = StringInterner(
+    Destination, 'url', maxsize=int(os.environ.get('DESTINATION_INTERN_CACHE_SIZE', 100000)))
+
+# SQLite locks the whole database per write, so sharding only adds work there
+CLICK_COUNTER_SHARDS = int(os.environ.get(
+    'CLICK_COUNTER_SHARDS', 0 if app.config['SQLALCHEMY_DATABASE_URI'].startswith('sqlite') else 8
+))
+
+
+def write_clicks(clicks):
+    """
+    Persist a batch of click events
+    
+    One multi-row insert into link_clicks, one aggregated counter update per
+    link (on a random shard row unless CLICK_COUNTER_SHARDS is 0) and one
+    upsert per rollup table, all in a single transaction.
+    """
+    totals = {}
+    rollups = {}
+    country_rollups = {}
+    for click in clicks:
+        count, last = totals.get(click.link_id, (0, click.clicked_at))
+        totals[click.link_id] = (count + 1, max(last, click.clicked_at))
+        day = click.clicked_at.date()
+        key = (click.link_id, day, click.device_type or 'other')
+        rollups[key] = rollups.get(key, 0) + 1
+        key = (click.link_id, day, click.country or 'unknown')
+        country_rollups[key] = country_rollups.get(key, 0) + 1
+    
+    with app.app_context():
+        dialect = db.engine.dialect.name
+        new_user_agents = new_destinations = ()
+        try:
+            if CLICK_STORAGE == 'normalized':
+                user_agent_ids, new_user_agents = user_agent_interner.intern(
+                    db.session, [click.user_agent for click in clicks])
+                destination_ids, new_destinations = destination_interner.intern(
+                    db.session, [click.redirected_to for click in clicks])
+                rows = [
+                    {
+                        **click._asdict(),
+                        'user_agent': None,
+                        'user_agent_id': user_agent_ids.get(click.user_agent),
+                        'redirected_to': None,
+                        'destination_id': destination_ids.get(click.redirected_to)
+                    }
+                    for click in clicks
+                ]
+            else:
+                rows = [click._asdict() for click in clicks]
+            db.session.execute(insert(LinkClick), rows)
+            if CLICK_COUNTER_SHARDS > 0:
+                # Rows sorted by key so concurrent flushes lock shards in the same order
+                increment_counters(db.session, LinkCounterShard, SHARD_KEY, sorted((
+                    {
+                        'link_id': link_id,
+                        'shard': random.randrange(CLICK_COUNTER_SHARDS),
+                        'clicks': count,
+                        'last_clicked_at': last
+                    }
+                    for link_id, (count, last) in totals.items()
+                ), key=lambda row: row['link_id']), max_columns=['last_clicked_at'])
+            else:
+                for link_id, (count, last) in sorted(totals.items()):
+                    db.session.execute(
+                        update(SmartLink)
+                        .where(SmartLink.id == link_id)
+                        .values(
+                            click_count=SmartLink.click_count + count,
+                            last_clicked_at=greatest(dialect, SmartLink.last_clicked_at, last)
+                        )
+                    )
+            increment_counters(db.session, ClickRollup, ROLLUP_KEY, rollup_rows(rollups))
+            increment_counters(db.session, CountryRollup, COUNTRY_ROLLUP_KEY,
+                               rollup_rows(country_rollups, COUNTRY_ROLLUP_KEY))
+            started = time.perf_counter()
+            db.session.commit()
+            REDIRECT_STAGE.observe(time.perf_counter() - started, 'commit')
+        except Exception:
+            db.session.rollback()
+            raise
+        user_agent_interner.mark_stored(new_user_agents)
+        destination_interner.mark_stored(new_destinations)
+
+
+click_writer = ClickWriter(
+    write_clicks,
+    max_queue=int(os.environ.get('CLICK_QUEUE_SIZE', 10000)),
+    batch_size=int(os.environ.get('CLICK_BATCH_SIZE', 500)),
+    flush_interval=float(os.environ.get('CLICK_FLUSH_INTERVAL', 1.0)),
+    overflow=os.environ.get('CLICK_QUEUE_OVERFLOW', 'drop_newest'),
+    retries=int(os.environ.get('CLICK_FLUSH_RETRIES', 3)),
+    retry_backoff=float(os.environ.get('CLICK_FLUSH_BACKOFF', 0.5)),
+)
+CLICK_WRITE_BEHIND = os.environ.get('CLICK_WRITE_BEHIND', '1') == '1'
+
+# Drain queued clicks when the process exits (gunicorn also calls this from worker_exit)
+atexit.register(click_writer.close)
+
+
+@metrics.register_collector
+def collect_process_stats():
+    """Copy click queue, link cache and pool state into metrics before each snapshot"""
+    queue_stats = click_writer.stats()
+    CLICK_QUEUE_DEPTH.set(value=queue_stats['queue_depth'])
+    for outcome in ('enqueued', 'flushed', 'dropped', 'failed', 'retried'):
+        CLICK_EVENTS.set_total(outcome, value=queue_stats[outcome])
+    
+    cache_stats = link_cache.stats()
+    LINK_CACHE_LOOKUPS.set_total('hit', value=cache_stats['hits'] - cache_stats['negative_hits'])
+    LINK_CACHE_LOOKUPS.set_total('negative_hit', value=cache_stats['negative_hits'])
+    LINK_CACHE_LOOKUPS.set_total('miss', value=cache_stats['misses'])
+    LINK_CACHE_EVICTIONS.set_total(value=cache_stats['evictions'])
+    
+    cache_stats = response_cache.stats()
+    RESPONSE_CACHE_LOOKUPS.set_total('hit', value=cache_stats['hits'])
+    RESPONSE_CACHE_LOOKUPS.set_total('miss', value=cache_stats['misses'])
+    
+    with app.app_context():
+        pools = {'write': db.engine.pool}
+        if READ_ENGINE_SPLIT:
+            pools['read'] = read_engine().pool
+    for name, pool in pools.items():
+        for state in ('size', 'checkedin', 'checkedout', 'overflow'):
+            if hasattr(pool, state):
+                DB_POOL.set(name, state, value=getattr(pool, state)())
+
+
+@app.before_request
+def start_request_timer():
+    g.request_started = time.perf_counter()
+    metrics.start()
+    if LINK_CHANGES_POLL_INTERVAL > 0:
+        link_changes.start()
+
+
+@app.after_request
+def record_request_metrics(response):
+    started = g.pop('request_started', None)
+    if started is not None:
+        route = request.url_rule.rule if request.url_rule else 'unmatched'
+        HTTP_LATENCY.observe(time.perf_counter() - started, route)
+        HTTP_REQUESTS.inc(route, request.method, str(response.status_code))
+    return response
+
+
+# On-demand profiling (see profiling.py); with PROFILE_ENABLED unset no hooks are installed
+PROFILE_ENABLED = os.environ.get('PROFILE_ENABLED', '0') == '1'
+profiler = RequestProfiler(
+    os.environ.get('PROFILE_DIR', 'profiles'),
+    secret=os.environ.get('PROFILE_SECRET') or None,
+    sample_every=int(os.environ.get('PROFILE_SAMPLE_EVERY', 0)),
+    keep=int(os.environ.get('PROFILE_KEEP', 50)),
+) if PROFILE_ENABLED else None
+if profiler is not None:
+    with app.app_context():
+        profiler.init_app(app, db.engines.values())
+
+
+# Bots are always redirected; BOT_CLICK_POLICY decides whether their clicks are stored:
+# skip (default), sample (keep BOT_CLICK_SAMPLE_RATE of them) or record
+BOT_CLICK_POLICY = os.environ.get('BOT_CLICK_POLICY', 'skip')
+BOT_CLICK_SAMPLE_RATE = float(os.environ.get('BOT_CLICK_SAMPLE_RATE', 0.01))
+if BOT_CLICK_POLICY not in ('skip', 'sample', 'record'):
+    raise ValueError(f'BOT_CLICK_POLICY must be skip, sample or record, got {BOT_CLICK_POLICY!r}')
+
+# Per-IP cap on recorded clicks (per worker); CLICK_RATE_LIMIT=0 disables it
+CLICK_RATE_LIMIT = float(os.environ.get('CLICK_RATE_LIMIT', 5))
+click_rate_limiter = TokenBucketLimiter(
+    rate=CLICK_RATE_LIMIT,
+    burst=float(os.environ.get('CLICK_RATE_BURST', 50)),
+    max_keys=int(os.environ.get('CLICK_RATE_MAX_IPS', 100000)),
+) if CLICK_RATE_LIMIT > 0 else None
+
+
+# Reverse proxies in front of the app that append to X-Forwarded-For (0: none)
+TRUSTED_PROXIES = int(os.environ.get('TRUSTED_PROXIES', 1))
+
+
+def client_ip(forwarded_for, remote_addr):
+    """
+    The client address as seen by the outermost trusted proxy
+    
+    Every trusted proxy appends the address it received the request from, so
+    the TRUSTED_PROXIES-th entry from the right is the first one a client
+    cannot forge; anything to its left is client-supplied. Without enough
+    entries (or TRUSTED_PROXIES=0) the connection's remote_addr is used.
+    """
+    if TRUSTED_PROXIES > 0 and forwarded_for:
+        hops = forwarded_for.split(',')
+        if len(hops) >= TRUSTED_PROXIES:
+            return hops[-TRUSTED_PROXIES].strip() or remote_addr
+    return remote_addr
+
+
+def should_record_click(bot_category, ip_address):
+    """Apply the bot policy and per-IP rate limit; counts what is filtered"""
+    if bot_category != 'human':
+        BOT_REDIRECTS.inc(bot_category)
+        if BOT_CLICK_POLICY == 'skip' or (
+                BOT_CLICK_POLICY == 'sample' and random.random() >= BOT_CLICK_SAMPLE_RATE):
+            CLICKS_FILTERED.inc('bot')
+            return False
+    if click_rate_limiter is not None and not click_rate_limiter.allow(ip_address):
+        CLICKS_FILTERED.inc('rate_limit')
+        return False
+    return True
+
+
+def record_click(click):
+    """Queue a click for the background writer, or write it inline if write-behind is off"""
+    if CLICK_WRITE_BEHIND:
+        click_writer.submit(click)
+    else:
+        write_clicks([click])
+
+
+# Link creation
+LINK_URL_FIELDS = ['android_url', 'ios_url', 'windows_url', 'macos_url', 'linux_url', 'fallback_url']
+
+BATCH_CREATE_MAX = int(os.environ.get('BATCH_CREATE_MAX', 50000))
+BATCH_CREATE_CHUNK = int(os.environ.get('BATCH_CREATE_CHUNK', 1000))
+
+
+# Link tokens: 'random' (default) or 'time' for short, index-friendly tokens (see tokens.py)
+generate_token = make_generator(os.environ.get('TOKEN_GENERATOR', 'random'))
+
+
+def validate_link_data(data):
+    """Return an error message for an invalid create payload, or None"""
+    if not isinstance(data, dict) or 'fallback_url' not in data:
+        return 'fallback_url is required'
+    for field in LINK_URL_FIELDS + ['name']:
+        value = data.get(field)
+        if value is not None and not isinstance(value, str):
+            return f'{field} must be a string'
+    return None
+
+
+def insert_links(rows, attempts=3):
+    """
+    Insert SmartLink rows with one multi-row INSERT and commit
+    
+    If a generated token collides with an existing one (or another row in
+    the batch) the transaction is rolled back, only the colliding rows get
+    new tokens, and the insert is retried. Rows are updated in place with their final tokens.
+    """
+    for attempt in range(attempts):
+        try:
+            db.session.execute(insert(SmartLink), rows)
+            db.session.commit()
+            return
+        except IntegrityError:
+            db.session.rollback()
+            if attempt == attempts - 1:
+                raise
+            tokens = [row['token'] for row in rows]
+            taken = {token for (token,) in db.session.query(SmartLink.token).filter(SmartLink.token.in_(tokens))}
+            if not taken and len(set(tokens)) == len(tokens):
+                raise
+            seen = set()
+            for row in rows:
+                if row['token'] in taken or row['token'] in seen:
+                    row['token'] = generate_token()
+                seen.add(row['token'])
+
+
+# Yielded by iter_batch_payload for an NDJSON line that is not valid JSON
+INVALID_JSON_LINE = object()
+
+
+def iter_batch_payload():
+    """Yield link payloads from a JSON array body or an NDJSON stream"""
+    if request.mimetype in ('application/x-ndjson', 'application/jsonlines'):
+        for line in io.BufferedReader(request.stream, 1 << 16):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                yield json.loads(line)
+            except ValueError:
+                yield INVALID_JSON_LINE
+        return
+    
+    data = request.get_json(silent=True)
+    if isinstance(data, dict):
+        data = data.get('links')
+    if not isinstance(data, list):
+        raise ValueError('expected a JSON array of links')
+    yield from data
 
 
 @app.route('/')
@@ -84,9 +802,18 @@ def home():
         'version': '1.0',
         'endpoints': {
             'create_link': 'POST /api/create',
+            'create_links': 'POST /api/create/batch',
+            'update_link': 'PATCH /api/links/<token>',
+            'delete_link': 'DELETE /api/links/<token>',
             'redirect': 'GET /l/<token>',
             'stats': 'GET /api/stats/<token>',
-            'health': 'GET /health'
+            'stats_batch': 'POST /api/stats/batch',
+            'analytics': 'GET /api/analytics/<token>',
+            'clicks': 'GET /api/analytics/<token>/clicks',
+            'export': 'GET /api/export/<token>',
+            'export_all': 'GET /api/export',
+            'health': 'GET /health',
+            'metrics': 'GET /metrics'
         },
         'status': 'online'
     })
@@ -95,7 +822,18 @@ def home():
 @app.route('/health')
 def health():
     """Health check endpoint"""
-    return jsonify({'status': 'healthy', 'timestamp': datetime.utcnow().isoformat()})
+    return jsonify({
+        'status': 'healthy',
+        'timestamp': datetime.utcnow().isoformat(),
+        'click_queue': click_writer.stats(),
+        'link_changes': link_changes.stats()
+    })
+
+
+@app.route('/metrics')
+def metrics_endpoint():
+    """Prometheus metrics, aggregated across all worker processes"""
+    return Response(metrics.render(), mimetype='text/plain; version=0.0.4')
 
 
 @app.route('/api/create', methods=['POST'])
@@ -128,23 +866,16 @@ def create_link():
         if not data or 'fallback_url' not in data:
             return jsonify({'success': False, 'error': 'fallback_url is required'}), 400
         
-        # Generate unique token
-        token = secrets.token_urlsafe(12)
-        
-        # Create smart link
-        link = SmartLink(
-            token=token,
-            name=data.get('name', 'Unnamed Link'),
-            android_url=data.get('android_url'),
-            ios_url=data.get('ios_url'),
-            windows_url=data.get('windows_url'),
-            macos_url=data.get('macos_url'),
-            linux_url=data.get('linux_url'),
-            fallback_url=data['fallback_url']
-        )
-        
-        db.session.add(link)
-        db.session.commit()
+        # Create smart link (a colliding token is replaced and the insert retried)
+        row = {
+            'token': generate_token(),
+            'name': data.get('name', 'Unnamed Link'),
+            'created_at': datetime.utcnow(),
+            **{field: data.get(field) for field in LINK_URL_FIELDS}
+        }
+        insert_links([row])
+        token = row['token']
+        link_cache.invalidate(token)  # forget a cached "not found" for this token
         
         # Generate full URL
         base_url = request.host_url.rstrip('/')
@@ -154,7 +885,7 @@ def create_link():
             'success': True,
             'token': token,
             'url': full_url,
-            'created_at': link.created_at.isoformat()
+            'created_at': row['created_at'].isoformat()
         })
         
     except Exception as e:
@@ -162,6 +893,226 @@ def create_link():
         return jsonify({'success': False, 'error': str(e)}), 500
 
 
+@app.route('/api/create/batch', methods=['POST'])
+def create_links_batch():
+    """
+    Create many smart links in one request
+    
+    Request body: a JSON array of /api/create payloads (or {"links": [...]}),
+    or one payload per line with Content-Type: application/x-ndjson.
+    
+    Links are inserted with multi-row INSERTs, one transaction per chunk.
+    
+    Returns:
+    {
+        "success": true,
+        "created": 2,
+        "failed": 1,
+        "results": [
+            {"index": 0, "success": true, "token": "...", "url": "..."},
+            {"index": 1, "success": false, "error": "fallback_url is required"},
+            ...
+        ]
+    }
+    """
+    base_url = request.host_url.rstrip('/')
+    results = []
+    chunk = []
+    
+    def flush(chunk):
+        now = datetime.utcnow()
+        rows = [
+            {
+                'token': generate_token(),
+                'name': data.get('name', 'Unnamed Link'),
+                'created_at': now,
+                **{field: data.get(field) for field in LINK_URL_FIELDS}
+            }
+            for _, data in chunk
+        ]
+        try:
+            insert_links(rows)
+        except Exception as e:
+            db.session.rollback()
+            results.extend({'index': index, 'success': False, 'error': str(e)} for index, _ in chunk)
+            return
+        results.extend(
+            {
+                'index': index,
+                'success': True,
+                'token': row['token'],
+                'url': f"{base_url}/l/{row['token']}",
+                'created_at': now.isoformat()
+            }
+            for (index, _), row in zip(chunk, rows)
+        )
+    
+    try:
+        for index, data in enumerate(iter_batch_payload()):
+            if index >= BATCH_CREATE_MAX:
+                # Stop reading: one result stands for this item and everything after it
+                results.append({'index': index, 'success': False,
+                                'error': f'batch limit of {BATCH_CREATE_MAX} links exceeded; '
+                                         'this and any later items were not read'})
+                break
+            if data is INVALID_JSON_LINE:
+                error = 'invalid JSON'
+            else:
+                error = validate_link_data(data)
+            if error:
+                results.append({'index': index, 'success': False, 'error': error})
+                continue
+            chunk.append((index, data))
+            if len(chunk) >= BATCH_CREATE_CHUNK:
+                flush(chunk)
+                chunk = []
+        if chunk:
+            flush(chunk)
+    except ValueError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+    
+    results.sort(key=lambda result: result['index'])
+    created = sum(1 for result in results if result['success'])
+    
+    return jsonify({
+        'success': True,
+        'created': created,
+        'failed': len(results) - created,
+        'results': results
+    })
+
+
+# Link management
+LINK_EDITABLE_FIELDS = LINK_URL_FIELDS + ['name', 'is_active']
+
+
+def validate_link_update(data):
+    """Return an error message for an invalid update payload, or None"""
+    if not isinstance(data, dict):
+        return 'expected a JSON object'
+    unknown = sorted(set(data) - set(LINK_EDITABLE_FIELDS) - {'version'})
+    if unknown:
+        return f'unknown field {unknown[0]}'
+    for field in LINK_URL_FIELDS + ['name']:
+        value = data.get(field)
+        if value is not None and not isinstance(value, str):
+            return f'{field} must be a string'
+    if 'fallback_url' in data and not data['fallback_url']:
+        return 'fallback_url cannot be empty'
+    if 'is_active' in data and not isinstance(data['is_active'], bool):
+        return 'is_active must be true or false'
+    version = data.get('version')
+    if version is not None and (not isinstance(version, int) or isinstance(version, bool)):
+        return 'version must be an integer'
+    return None
+
+
+def link_payload(link):
+    return {
+        'token': link.token,
+        'name': link.name,
+        **{field: getattr(link, field) for field in LINK_URL_FIELDS},
+        'is_active': link.is_active,
+        'version': link.version,
+        'created_at': link.created_at.isoformat() if link.created_at else None,
+        'updated_at': link.updated_at.isoformat() if link.updated_at else None,
+    }
+
+
+def version_conflict(token):
+    current = db.session.query(SmartLink.version).filter_by(token=token).scalar()
+    return jsonify({'success': False, 'error': 'Link was modified; retry with the current version',
+                    'version': current}), 409
+
+
+def edit_link(token, changes, expected_version=None):
+    """
+    Apply field changes to a link and commit
+    
+    expected_version (optional) must match the stored version. The UPDATE
+    also checks the version it read, so of two concurrent edits one gets
+    409 instead of silently overwriting the other. A committed edit bumps
+    version and is logged to link_changes, which every worker polls.
+    """
+    link = SmartLink.query.filter_by(token=token).first()
+    if not link:
+        return jsonify({'success': False, 'error': 'Link not found'}), 404
+    if expected_version is not None and expected_version != link.version:
+        return version_conflict(token)
+    
+    changes = {field: value for field, value in changes.items() if getattr(link, field) != value}
+    if changes:
+        for field, value in changes.items():
+            setattr(link, field, value)
+        link.updated_at = datetime.utcnow()
+        try:
+            db.session.commit()
+        except StaleDataError:
+            db.session.rollback()
+            return version_conflict(token)
+    
+    return jsonify({'success': True, 'updated': bool(changes), 'link': link_payload(link)})
+
+
+@app.route('/api/links/<token>', methods=['PATCH'])
+def update_link(token):
+    """
+    Update a link's name, URLs or is_active
+    
+    Request body: any subset of the /api/create fields plus "is_active",
+    and optionally the "version" the edit is based on:
+    {
+        "ios_url": "https://apps.apple.com/...",
+        "version": 3
+    }
+    
+    Returns:
+    {
+        "success": true,
+        "updated": true,
+        "link": {"token": "abc123xyz", ..., "version": 4, "updated_at": "..."}
+    }
+    
+    409 if "version" is stale. Every worker serves the new URLs within
+    LINK_CHANGES_POLL_INTERVAL seconds.
+    """
+    try:
+        data = request.get_json(silent=True)
+        error = validate_link_update(data)
+        if error:
+            return jsonify({'success': False, 'error': error}), 400
+        
+        changes = {field: value for field, value in data.items() if field != 'version'}
+        return edit_link(token, changes, data.get('version'))
+        
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+
+@app.route('/api/links/<token>', methods=['DELETE'])
+def delete_link(token):
+    """
+    Deactivate a link (soft delete)
+    
+    The row, its clicks and its stats are kept; /l/<token> returns 404
+    until the link is reactivated with PATCH {"is_active": true}.
+    Accepts ?version=N like PATCH's "version".
+    """
+    try:
+        version = request.args.get('version')
+        if version is not None:
+            try:
+                version = int(version)
+            except ValueError:
+                return jsonify({'success': False, 'error': 'version must be an integer'}), 400
+        return edit_link(token, {'is_active': False}, version)
+        
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+
 @app.route('/l/<token>')
 def redirect_link(token):
     """
@@ -170,62 +1121,39 @@ def redirect_link(token):
     Detects user's operating system and redirects to appropriate URL
     """
     try:
-        # Find link by token
-        link = SmartLink.query.filter_by(token=token, is_active=True).first()
+        # Resolve token (served from the per-worker cache when warm)
+        started = time.perf_counter()
+        link = link_cache.get(token)
+        stage_done = time.perf_counter()
+        REDIRECT_STAGE.observe(stage_done - started, 'lookup')
         
-        if not link:
+        if not link or not link.is_active:
             return "Link not found", 404
         
         # Get user agent and IP
-        user_agent = request.headers.get('User-Agent', '').lower()
-        ip_address = request.headers.get('X-Forwarded-For', request.remote_addr)
-        if ip_address and ',' in ip_address:
-            ip_address = ip_address.split(',')[0].strip()
-        
-        # Detect OS/Device with improved detection
-        device_type = None
-        redirect_url = None
-        
-        # Check for mobile devices first (more specific)
-        if 'android' in user_agent:
-            device_type = 'android'
-            redirect_url = link.android_url
-        elif any(x in user_agent for x in ['iphone', 'ipad', 'ipod']):
-            device_type = 'ios'
-            redirect_url = link.ios_url
-        # Then check for desktop OS
-        elif 'windows' in user_agent or 'win32' in user_agent or 'win64' in user_agent:
-            device_type = 'windows'
-            redirect_url = link.windows_url
-        elif 'macintosh' in user_agent or 'mac os' in user_agent or 'darwin' in user_agent:
-            device_type = 'macos'
-            redirect_url = link.macos_url
-        elif 'linux' in user_agent and 'android' not in user_agent:
-            device_type = 'linux'
-            redirect_url = link.linux_url
-        
-        # If still no match, mark as other
-        if not device_type:
-            device_type = 'other'
-        
-        # Use fallback if no OS-specific URL
-        if not redirect_url:
-            redirect_url = link.fallback_url
-        
-        # Record detailed click
-        click = LinkClick(
-            link_id=link.id,
-            device_type=device_type,
-            user_agent=request.headers.get('User-Agent', ''),
-            ip_address=ip_address,
-            redirected_to=redirect_url
-        )
-        db.session.add(click)
+        user_agent = request.headers.get('User-Agent', '')
+        ip_address = client_ip(request.headers.get('X-Forwarded-For'), request.remote_addr)
+        
+        # Detect OS/Device and pick its URL (falls back to fallback_url)
+        started = stage_done
+        device_type = device_classifier.classify(user_agent)
+        redirect_url = link.destination(device_type)
+        stage_done = time.perf_counter()
+        REDIRECT_STAGE.observe(stage_done - started, 'classify')
+        REDIRECTS.inc(device_type)
         
-        # Update link stats
-        link.click_count += 1
-        link.last_clicked_at = datetime.utcnow()
-        db.session.commit()
+        # Record detailed click (written in the background, see click_writer)
+        if should_record_click(bot_classifier.classify(user_agent), ip_address):
+            record_click(ClickEvent(
+                link_id=link.id,
+                clicked_at=datetime.utcnow(),
+                device_type=device_type,
+                user_agent=user_agent,
+                ip_address=ip_address,
+                redirected_to=redirect_url,
+                country=geoip.lookup(ip_address) if geoip is not None else None
+            ))
+        REDIRECT_STAGE.observe(time.perf_counter() - stage_done, 'record')
         
         # Redirect
         return redirect(redirect_url, code=302)
@@ -236,6 +1164,93 @@ def redirect_link(token):
         return "Error processing link", 500
 
 
+# Conditional GET and response cache for per-link stats and analytics
+RESPONSE_CACHE_TTL = float(os.environ.get('RESPONSE_CACHE_TTL', 2))
+
+response_cache = TTLCache(maxsize=int(os.environ.get('RESPONSE_CACHE_SIZE', 10000)), ttl=RESPONSE_CACHE_TTL)
+
+
+def link_validators(link, totals, variant=''):
+    """
+    (etag, last_modified) for a link's stats and analytics
+    
+    Every field those payloads depend on changes when a click is recorded
+    or the link is edited, so unchanged validators mean an unchanged body.
+    """
+    click_count, last_clicked_at = totals
+    state = f'{link.id}|{link.version}|{link.name}|{link.is_active}|{click_count}|{last_clicked_at}|{request.full_path}|{variant}'
+    etag = hashlib.blake2b(state.encode(), digest_size=12).hexdigest()
+    last_modified = max(filter(None, (last_clicked_at, link.updated_at, link.created_at)))
+    last_modified = last_modified.replace(microsecond=0, tzinfo=timezone.utc)
+    return etag, last_modified
+
+
+def is_not_modified(etag, last_modified):
+    if request.if_none_match:
+        return request.if_none_match.contains(etag)
+    return request.if_modified_since is not None and last_modified <= request.if_modified_since
+
+
+def link_json_response(token, build, variant=''):
+    """
+    Serve build(session, link, totals) as JSON with ETag and Last-Modified
+    
+    The link row and its click totals (two indexed lookups) decide the
+    validators; a matching If-None-Match / If-Modified-Since gets a 304
+    before build runs. Rendered bodies are kept for RESPONSE_CACHE_TTL
+    seconds per URL, so repeated polls within that window skip the
+    database entirely. `variant` is mixed into the ETag for bodies that
+    also depend on something other than the link and its clicks.
+    """
+    key = request.full_path
+    entry = response_cache.get(key)
+    
+    if entry is None:
+        session = read_session()
+        link = session.query(SmartLink).filter_by(token=token).first()
+        
+        if not link:
+            return jsonify({'success': False, 'error': 'Link not found'}), 404
+        
+        totals = click_totals([link], session)[link.id]
+        etag, last_modified = link_validators(link, totals, variant)
+        if is_not_modified(etag, last_modified):
+            body = None
+        else:
+            body = jsonify({'success': True, **build(session, link, totals)}).get_data()
+            if RESPONSE_CACHE_TTL > 0:
+                response_cache.set(key, (etag, last_modified, body))
+    else:
+        etag, last_modified, body = entry
+    
+    if body is None or is_not_modified(etag, last_modified):
+        response = Response(status=304)
+    else:
+        response = Response(body, mimetype='application/json')
+    response.set_etag(etag)
+    response.last_modified = last_modified
+    response.cache_control.no_cache = True
+    return response
+
+
+# Stats
+STATS_BATCH_MAX = int(os.environ.get('STATS_BATCH_MAX', 10000))
+STATS_BATCH_CHUNK = int(os.environ.get('STATS_BATCH_CHUNK', 500))
+
+
+def stats_payload(link, totals):
+    """Stats fields for a SmartLink given its (click_count, last_clicked_at) from click_totals"""
+    click_count, last_clicked_at = totals
+    return {
+        'token': link.token,
+        'name': link.name,
+        'click_count': click_count,
+        'created_at': link.created_at.isoformat(),
+        'last_clicked_at': last_clicked_at.isoformat() if last_clicked_at else None,
+        'is_active': link.is_active
+    }
+
+
 @app.route('/api/stats/<token>')
 def get_stats(token):
     """
@@ -244,25 +1259,179 @@ def get_stats(token):
     Returns click count and other metrics
     """
     try:
-        link = SmartLink.query.filter_by(token=token).first()
+        return link_json_response(token, lambda session, link, totals: stats_payload(link, totals))
         
-        if not link:
-            return jsonify({'success': False, 'error': 'Link not found'}), 404
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+
+@app.route('/api/stats/batch', methods=['POST'])
+def get_stats_batch():
+    """
+    Get statistics for many smart links at once
+    
+    Request body: {"tokens": ["abc123xyz", ...]} or a JSON array of tokens
+    
+    Tokens are resolved with one IN query per STATS_BATCH_CHUNK tokens.
+    
+    Returns:
+    {
+        "success": true,
+        "stats": {"abc123xyz": {same fields as /api/stats/<token>}, ...},
+        "not_found": ["..."]
+    }
+    """
+    data = request.get_json(silent=True)
+    tokens = data.get('tokens') if isinstance(data, dict) else data
+    if not isinstance(tokens, list) or not all(isinstance(token, str) for token in tokens):
+        return jsonify({'success': False, 'error': 'tokens must be a list of strings'}), 400
+    tokens = list(dict.fromkeys(tokens))
+    if len(tokens) > STATS_BATCH_MAX:
+        return jsonify({'success': False, 'error': f'batch limit of {STATS_BATCH_MAX} tokens exceeded'}), 400
+    
+    try:
+        session = read_session()
+        stats = {}
+        for start in range(0, len(tokens), STATS_BATCH_CHUNK):
+            links = session.query(SmartLink).filter(
+                SmartLink.token.in_(tokens[start:start + STATS_BATCH_CHUNK])
+            ).all()
+            totals = click_totals(links, session)
+            for link in links:
+                stats[link.token] = stats_payload(link, totals[link.id])
         
         return jsonify({
             'success': True,
-            'token': token,
-            'name': link.name,
-            'click_count': link.click_count,
-            'created_at': link.created_at.isoformat(),
-            'last_clicked_at': link.last_clicked_at.isoformat() if link.last_clicked_at else None,
-            'is_active': link.is_active
+            'stats': stats,
+            'not_found': [token for token in tokens if token not in stats]
         })
         
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 500
 
 
+# Click history (range/bucket/tz on /api/analytics/<token>, see analytics_engine.py)
+HISTORY_CHUNK_SIZE = int(os.environ.get('HISTORY_CHUNK_SIZE', 100000))
+HISTORY_MAX_BUCKETS = int(os.environ.get('HISTORY_MAX_BUCKETS', 5000))
+HISTORY_PARAMS = ('range', 'bucket', 'tz', 'window')
+
+
+def history_args():
+    """Parse the click history query params; None when none are given, ValueError if invalid"""
+    if not any(name in request.args for name in HISTORY_PARAMS):
+        return None
+    tz = parse_timezone(request.args.get('tz', 'UTC'))
+    bucket = parse_bucket(request.args.get('bucket', 'day'))
+    try:
+        window = int(request.args.get('window', 7))
+    except ValueError:
+        window = 0
+    if window < 1:
+        raise ValueError('window must be a positive number of buckets')
+    end = datetime.now(timezone.utc)
+    range_value = request.args.get('range', '30d')
+    start = None
+    if range_value != 'all':
+        try:
+            start = end - timedelta(seconds=parse_duration(range_value, 'range'))
+        except OverflowError:
+            raise ValueError('range reaches back before year 1')
+    return start, end, bucket, tz, window
+
+
+def click_history(link, start, end, bucket, tz, window):
+    """
+    Timeline, heatmap, device-by-day and click gap stats for clicks in [start, end)
+    
+    Only (clicked_at, device_type) is read, as integers, in chunks of
+    HISTORY_CHUNK_SIZE rows; start=None means from the link's first click.
+    """
+    engine = read_engine()
+    if start is None:
+        with engine.connect() as connection:
+            first_click = connection.execute(
+                select(func.min(LinkClick.clicked_at)).where(LinkClick.link_id == link.id)
+            ).scalar()
+        start = min(first_click or link.created_at, link.created_at).replace(microsecond=0, tzinfo=timezone.utc)
+    if bucket_range(start, end, tz, bucket)[1] > HISTORY_MAX_BUCKETS:
+        raise ValueError(f'range has more than {HISTORY_MAX_BUCKETS} buckets; use a larger bucket')
+    
+    devices = [device for device, _ in device_classifier.rules] + [device_classifier.default]
+    query = select(
+        epoch_ms(engine.dialect.name, LinkClick.clicked_at), device_codes(LinkClick.device_type, devices)
+    ).where(
+        LinkClick.link_id == link.id,
+        LinkClick.clicked_at >= start.astimezone(timezone.utc).replace(tzinfo=None),
+        LinkClick.clicked_at < end.astimezone(timezone.utc).replace(tzinfo=None)
+    ).order_by(LinkClick.clicked_at)
+    
+    with engine.connect() as connection:
+        result = connection.execution_options(stream_results=True, yield_per=HISTORY_CHUNK_SIZE).execute(query)
+        clicks = ClickHistory.from_result(result, devices, HISTORY_CHUNK_SIZE)
+    return clicks.summarize(start, end, bucket, tz, window)
+
+
+def analytics_payload(session, link, totals, history=None):
+    """Device breakdown, daily timeline and recent clicks for a SmartLink (plus history_args() stats)"""
+    if request.args.get('source') == 'raw':
+        # Aggregate straight from link_clicks (e.g. before rollups are backfilled)
+        device = func.coalesce(LinkClick.device_type, 'other')
+        device_rows = session.query(device, func.count()).filter(
+            LinkClick.link_id == link.id
+        ).group_by(device).all()
+        
+        day = func.date(LinkClick.clicked_at)
+        day_rows = session.query(day, func.count()).filter(
+            LinkClick.link_id == link.id
+        ).group_by(day).order_by(day).all()
+        
+        country = func.coalesce(LinkClick.country, 'unknown')
+        country_rows = session.query(country, func.count()).filter(
+            LinkClick.link_id == link.id
+        ).group_by(country).all()
+    else:
+        # Count by device type and by day from the daily rollups
+        device_rows = session.query(
+            ClickRollup.device_type, func.sum(ClickRollup.clicks)
+        ).filter_by(link_id=link.id).group_by(ClickRollup.device_type).all()
+        
+        day_rows = session.query(
+            ClickRollup.day, func.sum(ClickRollup.clicks)
+        ).filter_by(link_id=link.id).group_by(ClickRollup.day).order_by(ClickRollup.day).all()
+        
+        country_rows = session.query(
+            CountryRollup.country, func.sum(CountryRollup.clicks)
+        ).filter_by(link_id=link.id).group_by(CountryRollup.country).all()
+    
+    device_counts = {device: int(count) for device, count in device_rows}
+    country_counts = {country: int(count) for country, count in country_rows}
+    timeline_data = [{'date': as_date(day).isoformat(), 'clicks': int(count)} for day, count in day_rows]
+    
+    # Recent clicks (last 50)
+    clicks = session.query(LinkClick).filter_by(link_id=link.id).order_by(
+        LinkClick.clicked_at.desc(), LinkClick.id.desc()
+    ).limit(50).all()
+    destinations = destination_urls(session, clicks)
+    recent_clicks = [click.to_dict(destinations) for click in clicks]
+    
+    click_count, last_clicked_at = totals
+    
+    payload = {
+        'token': link.token,
+        'name': link.name,
+        'total_clicks': click_count,
+        'device_breakdown': device_counts,
+        'country_breakdown': country_counts,
+        'recent_clicks': recent_clicks,
+        'timeline': timeline_data,
+        'created_at': link.created_at.isoformat(),
+        'last_clicked_at': last_clicked_at.isoformat() if last_clicked_at else None
+    }
+    if history is not None:
+        payload['history'] = click_history(link, *history)
+    return payload
+
+
 @app.route('/api/analytics/<token>')
 def get_analytics(token):
     """
@@ -271,61 +1440,231 @@ def get_analytics(token):
     Returns:
         - Total clicks
         - Clicks by device type
+        - Clicks by country
         - Recent clicks with details
         - Click timeline
+    
+    Query params:
+        source=raw  aggregate from link_clicks instead of click_rollups
+    
+    Any of these add a "history" object computed from raw clicks:
+        range   how far back: 24h, 7d, 30d (default), 2w, ... or all
+        bucket  timeline bucket: hour, day (default), week or 15m, 6h, ...
+        tz      IANA timezone for buckets, heatmap and days (default UTC)
+        window  buckets in the rolling average (default 7)
     """
     try:
-        link = SmartLink.query.filter_by(token=token).first()
+        try:
+            history = history_args()
+        except ValueError as e:
+            return jsonify({'success': False, 'error': str(e)}), 400
+        if history is None:
+            return link_json_response(token, analytics_payload)
+        
+        # Relative ranges move with the clock: the current bucket is part of the ETag
+        _, end, bucket, _, _ = history
+        return link_json_response(
+            token, lambda session, link, totals: analytics_payload(session, link, totals, history),
+            variant=str(int(end.timestamp()) // bucket))
+        
+    except ValueError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+
+@app.route('/api/analytics/<token>/clicks')
+def list_clicks(token):
+    """
+    List a link's clicks, newest first, with keyset pagination
+    
+    Query params:
+        limit   page size (default 50, max 1000)
+        cursor  next_cursor from the previous page
+    
+    Returns:
+    {
+        "success": true,
+        "clicks": [...],
+        "next_cursor": "..." or null
+    }
+    """
+    try:
+        session = read_session()
+        link = session.query(SmartLink).filter_by(token=token).first()
         
         if not link:
             return jsonify({'success': False, 'error': 'Link not found'}), 404
         
-        # Get all clicks
-        clicks = LinkClick.query.filter_by(link_id=link.id).order_by(LinkClick.clicked_at.desc()).all()
-        
-        # Count by device type
-        device_counts = {}
-        for click in clicks:
-            device = click.device_type or 'other'
-            device_counts[device] = device_counts.get(device, 0) + 1
-        
-        # Recent clicks (last 50)
-        recent_clicks = []
-        for click in clicks[:50]:
-            recent_clicks.append({
-                'id': click.id,
-                'device_type': click.device_type,
-                'clicked_at': click.clicked_at.isoformat(),
-                'ip_address': click.ip_address,
-                'redirected_to': click.redirected_to
-            })
-        
-        # Click timeline (group by date)
-        from collections import defaultdict
-        timeline = defaultdict(int)
-        for click in clicks:
-            date_key = click.clicked_at.strftime('%Y-%m-%d')
-            timeline[date_key] += 1
-        
-        # Convert timeline to sorted list
-        timeline_data = [{'date': k, 'clicks': v} for k, v in sorted(timeline.items())]
+        try:
+            limit = min(max(int(request.args.get('limit', 50)), 1), 1000)
+            cursor = request.args.get('cursor')
+            after = decode_click_cursor(cursor) if cursor else None
+        except ValueError as e:
+            return jsonify({'success': False, 'error': str(e)}), 400
+        
+        query = session.query(LinkClick).filter(LinkClick.link_id == link.id)
+        if after:
+            query = query.filter(tuple_(LinkClick.clicked_at, LinkClick.id) < tuple_(*after))
+        
+        # Fetch one extra row to know whether another page exists
+        clicks = query.order_by(
+            LinkClick.clicked_at.desc(), LinkClick.id.desc()
+        ).limit(limit + 1).all()
+        
+        next_cursor = encode_click_cursor(clicks[limit - 1]) if len(clicks) > limit else None
+        destinations = destination_urls(session, clicks[:limit])
         
         return jsonify({
             'success': True,
             'token': token,
-            'name': link.name,
-            'total_clicks': link.click_count,
-            'device_breakdown': device_counts,
-            'recent_clicks': recent_clicks,
-            'timeline': timeline_data,
-            'created_at': link.created_at.isoformat(),
-            'last_clicked_at': link.last_clicked_at.isoformat() if link.last_clicked_at else None
+            'clicks': [click.to_dict(destinations) for click in clicks[:limit]],
+            'next_cursor': next_cursor
         })
         
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 500
 
 
+# Click export
+EXPORT_FIELDS = [
+    'id', 'token', 'clicked_at', 'device_type', 'user_agent', 'ip_address', 'country', 'redirected_to'
+]
+EXPORT_CHUNK_SIZE = int(os.environ.get('EXPORT_CHUNK_SIZE', 1000))
+
+
+def timestamp_arg(name):
+    """
+    Parse an optional ISO 8601 query parameter as naive UTC (like clicked_at)
+    
+    Values without an offset are taken as UTC. Raises ValueError naming the parameter.
+    """
+    value = request.args.get(name)
+    if value is None:
+        return None
+    try:
+        parsed = datetime.fromisoformat(value)
+    except ValueError:
+        raise ValueError(f'{name} must be an ISO 8601 timestamp')
+    if parsed.tzinfo is not None:
+        parsed = parsed.astimezone(timezone.utc).replace(tzinfo=None)
+    return parsed
+
+
+def click_id_arg(name):
+    """Parse an optional click id query parameter (default 0)"""
+    try:
+        return int(request.args.get(name, 0))
+    except ValueError:
+        raise ValueError(f'{name} must be a click id')
+
+
+def export_clicks(link=None):
+    """
+    Stream clicks as NDJSON or CSV in ascending id order
+    
+    Rows are fetched EXPORT_CHUNK_SIZE at a time through a streaming
+    (server-side on PostgreSQL) cursor, so memory stays flat however many
+    clicks match. Every row carries its id; an interrupted export resumes
+    with ?cursor=<last id received>.
+    """
+    export_format = request.args.get('format', 'ndjson')
+    if export_format not in ('ndjson', 'csv'):
+        return jsonify({'success': False, 'error': 'format must be ndjson or csv'}), 400
+    
+    try:
+        after_id = click_id_arg('cursor')
+        since = timestamp_arg('since')
+        until = timestamp_arg('until')
+    except ValueError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+    
+    query = select(
+        LinkClick.id, SmartLink.token, LinkClick.clicked_at, LinkClick.device_type,
+        click_user_agent().label('user_agent'), LinkClick.ip_address, LinkClick.country,
+        click_destination().label('redirected_to')
+    ).join(SmartLink, SmartLink.id == LinkClick.link_id).outerjoin(
+        UserAgent, UserAgent.id == LinkClick.user_agent_id
+    ).outerjoin(
+        Destination, Destination.id == LinkClick.destination_id
+    ).where(LinkClick.id > after_id)
+    if link is not None:
+        query = query.where(LinkClick.link_id == link.id)
+    if since is not None:
+        query = query.where(LinkClick.clicked_at >= since)
+    if until is not None:
+        query = query.where(LinkClick.clicked_at < until)
+    query = query.order_by(LinkClick.id)
+    
+    engine = read_engine()
+    
+    def generate():
+        with engine.connect() as connection:
+            result = connection.execution_options(
+                stream_results=True, yield_per=EXPORT_CHUNK_SIZE
+            ).execute(query)
+            
+            if export_format == 'csv':
+                buffer = io.StringIO()
+                writer = csv.writer(buffer)
+                writer.writerow(EXPORT_FIELDS)
+                for rows in result.partitions():
+                    for row in rows:
+                        writer.writerow([row.clicked_at.isoformat() if field == 'clicked_at' else row[i]
+                                         for i, field in enumerate(EXPORT_FIELDS)])
+                    yield buffer.getvalue()
+                    buffer.seek(0)
+                    buffer.truncate()
+                if buffer.tell():
+                    yield buffer.getvalue()
+            else:
+                for rows in result.partitions():
+                    yield ''.join(
+                        json.dumps({
+                            **row._asdict(), 'clicked_at': row.clicked_at.isoformat()
+                        }) + '\n'
+                        for row in rows
+                    )
+    
+    name = link.token if link is not None else 'all'
+    mimetype = 'text/csv' if export_format == 'csv' else 'application/x-ndjson'
+    return Response(
+        stream_with_context(generate()),
+        mimetype=mimetype,
+        headers={'Content-Disposition': f'attachment; filename=clicks-{name}.{export_format}'}
+    )
+
+
+@app.route('/api/export/<token>')
+def export_link_clicks(token):
+    """
+    Stream all clicks of one link
+    
+    Query params:
+        format  ndjson (default) or csv
+        since   only clicks at or after this ISO 8601 time
+        until   only clicks before this ISO 8601 time
+        cursor  resume after this click id
+    """
+    link = read_session().query(SmartLink).filter_by(token=token).first()
+    
+    if not link:
+        return jsonify({'success': False, 'error': 'Link not found'}), 404
+    
+    return export_clicks(link)
+
+
+@app.route('/api/export')
+def export_all_clicks():
+    """Stream clicks of every link (same query params as /api/export/<token>)"""
+    return export_clicks()
+
+
 if __name__ == '__main__':
+    # Local runs bring the schema up to date themselves
+    import migrations
+    with app.app_context():
+        migrations.upgrade(db.engine)
+    
     port = int(os.environ.get('PORT', 5000))
     app.run(host='0.0.0.0', port=port, debug=False)
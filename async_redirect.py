@@ -0,0 +1,314 @@
+#!/usr/bin/env python3
+"""
+Async Redirect Server
+asyncio front end for /l/<token> and /health, for redirect hosts that hold
+thousands of open connections
+
+The Flask app keeps the management API; this server answers redirects with
+the same link cache, device and bot rules, click filtering and write-behind
+click queue, imported from app.py. Only a link cache miss touches the
+database: the lookup runs on a small thread pool (concurrent misses for one
+token share a single query) while the event loop keeps serving other
+connections. Requests are parsed by a minimal HTTP/1.1 reader with
+keep-alive; anything other than GET/HEAD on those two paths is refused.
+
+Usage:
+    python async_redirect.py [--port 8080] [--workers 4]
+"""
+
+import argparse
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from http import HTTPStatus
+import json
+import os
+import signal
+import socket
+import sys
+import time
+from urllib.parse import unquote
+
+from werkzeug.urls import iri_to_uri
+
+import app as service
+
+
+HEADER_LIMIT = int(os.environ.get('ASYNC_HEADER_LIMIT', 16384))
+HEADER_TIMEOUT = float(os.environ.get('ASYNC_HEADER_TIMEOUT', 10))
+KEEPALIVE_TIMEOUT = float(os.environ.get('ASYNC_KEEPALIVE_TIMEOUT', 15))
+BODY_LIMIT = 65536
+DB_THREADS = int(os.environ.get('ASYNC_DB_THREADS', 16))
+
+REDIRECT_ROUTE = '/l/<token>'
+
+
+class HTTPError(Exception):
+    """Malformed or unsupported request; answered with `status` and the connection closed"""
+
+    def __init__(self, status):
+        super().__init__(status.phrase)
+        self.status = status
+
+
+def response(status, body=b'', headers=(), keep_alive=True, head=False):
+    """Serialize a complete HTTP/1.1 response"""
+    lines = [f'HTTP/1.1 {status.value} {status.phrase}', f'Content-Length: {len(body)}']
+    lines.extend(f'{name}: {value}' for name, value in headers)
+    if not keep_alive:
+        lines.append('Connection: close')
+    head_bytes = ('\r\n'.join(lines) + '\r\n\r\n').encode('latin-1')
+    return head_bytes if head else head_bytes + body
+
+
+class RedirectServer:
+    """
+    Serves redirects from one event loop
+
+    Link cache hits, classification, filtering and queueing the click all
+    run inline; they are in-memory and take microseconds. Cache misses (and
+    inline click writes when CLICK_WRITE_BEHIND=0) go to `executor`.
+    """
+
+    def __init__(self, executor):
+        self.executor = executor
+        self._loading = {}
+        # submit() only waits when the queue is full and the policy is 'block'
+        self.inline_clicks = service.CLICK_WRITE_BEHIND and service.click_writer.overflow != 'block'
+
+    def _load_link(self, token):
+        with service.app.app_context():
+            return service.link_cache.get(token)
+
+    async def resolve(self, token):
+        """Return the LinkRecord for token, querying at most once per token at a time"""
+        cached, link = service.link_cache.peek(token)
+        if cached:
+            return link
+        future = self._loading.get(token)
+        if future is None:
+            future = asyncio.get_running_loop().run_in_executor(self.executor, self._load_link, token)
+            self._loading[token] = future
+            future.add_done_callback(lambda _: self._loading.pop(token, None))
+        return await asyncio.shield(future)
+
+    async def redirect(self, token, headers, peer):
+        started = time.perf_counter()
+        link = await self.resolve(token)
+        stage_done = time.perf_counter()
+        service.REDIRECT_STAGE.observe(stage_done - started, 'lookup')
+
+        if not link or not link.is_active:
+            return HTTPStatus.NOT_FOUND, b'Link not found', [('Content-Type', 'text/html; charset=utf-8')]
+
+        user_agent = headers.get('user-agent', '')
+        ip_address = service.client_ip(headers.get('x-forwarded-for'), peer)
+
+        started = stage_done
+        device_type = service.device_classifier.classify(user_agent)
+        redirect_url = link.destination(device_type)
+        stage_done = time.perf_counter()
+        service.REDIRECT_STAGE.observe(stage_done - started, 'classify')
+        service.REDIRECTS.inc(device_type)
+
+        if service.should_record_click(service.bot_classifier.classify(user_agent), ip_address):
+            click = service.ClickEvent(
+                link_id=link.id,
+                clicked_at=datetime.utcnow(),
+                device_type=device_type,
+                user_agent=user_agent,
+                ip_address=ip_address,
+                redirected_to=redirect_url,
+                country=service.geoip.lookup(ip_address) if service.geoip is not None else None
+            )
+            if self.inline_clicks:
+                service.record_click(click)
+            else:
+                await asyncio.get_running_loop().run_in_executor(self.executor, service.record_click, click)
+        service.REDIRECT_STAGE.observe(time.perf_counter() - stage_done, 'record')
+
+        return HTTPStatus.FOUND, b'', [('Location', iri_to_uri(redirect_url))]
+
+    def health(self):
+        body = json.dumps({
+            'status': 'healthy',
+            'timestamp': datetime.utcnow().isoformat(),
+            'click_queue': service.click_writer.stats(),
+            'link_changes': service.link_changes.stats()
+        }).encode()
+        return HTTPStatus.OK, body, [('Content-Type', 'application/json')]
+
+    async def dispatch(self, method, path, headers, peer):
+        """Return (route, status, body, headers) for one request"""
+        if path.startswith('/l/'):
+            token = unquote(path[3:])
+            if token and '/' not in token:
+                if method not in ('GET', 'HEAD'):
+                    return REDIRECT_ROUTE, HTTPStatus.METHOD_NOT_ALLOWED, b'', [('Allow', 'GET, HEAD')]
+                try:
+                    return (REDIRECT_ROUTE, *await self.redirect(token, headers, peer))
+                except Exception as e:
+                    print(f"Error in redirect: {e}")
+                    return REDIRECT_ROUTE, HTTPStatus.INTERNAL_SERVER_ERROR, b'Error processing link', []
+        elif path == '/health':
+            if method not in ('GET', 'HEAD'):
+                return '/health', HTTPStatus.METHOD_NOT_ALLOWED, b'', [('Allow', 'GET, HEAD')]
+            return ('/health', *self.health())
+        return 'unmatched', HTTPStatus.NOT_FOUND, b'Not Found', [('Content-Type', 'text/plain')]
+
+    async def read_request(self, reader, timeout):
+        """Parse one request head; returns (method, path, version, headers) or None at EOF"""
+        try:
+            head = await asyncio.wait_for(reader.readuntil(b'\r\n\r\n'), timeout)
+        except asyncio.IncompleteReadError as e:
+            if e.partial.strip():
+                raise HTTPError(HTTPStatus.BAD_REQUEST)
+            return None
+        except asyncio.LimitOverrunError:
+            raise HTTPError(HTTPStatus.REQUEST_HEADER_FIELDS_TOO_LARGE)
+
+        request_line, *header_lines = head.decode('latin-1').split('\r\n')
+        parts = request_line.split(' ')
+        if len(parts) != 3 or not parts[2].startswith('HTTP/1.'):
+            raise HTTPError(HTTPStatus.BAD_REQUEST)
+        method, target, version = parts
+
+        headers = {}
+        for line in header_lines:
+            if not line:
+                continue
+            name, sep, value = line.partition(':')
+            if not sep:
+                raise HTTPError(HTTPStatus.BAD_REQUEST)
+            headers.setdefault(name.strip().lower(), value.strip())
+
+        # Redirect requests have no body; discard a small one to stay in sync with the stream
+        if 'transfer-encoding' in headers:
+            raise HTTPError(HTTPStatus.LENGTH_REQUIRED)
+        try:
+            length = int(headers.get('content-length', 0))
+        except ValueError:
+            raise HTTPError(HTTPStatus.BAD_REQUEST)
+        if length > BODY_LIMIT:
+            raise HTTPError(HTTPStatus.REQUEST_ENTITY_TOO_LARGE)
+        if length:
+            await asyncio.wait_for(reader.readexactly(length), HEADER_TIMEOUT)
+
+        return method, target.split('?', 1)[0], version, headers
+
+    async def handle(self, reader, writer):
+        peername = writer.get_extra_info('peername')
+        peer = peername[0] if isinstance(peername, tuple) else None
+        timeout = HEADER_TIMEOUT
+        try:
+            while True:
+                try:
+                    request = await self.read_request(reader, timeout)
+                except HTTPError as e:
+                    writer.write(response(e.status, e.status.phrase.encode(), keep_alive=False))
+                    await writer.drain()
+                    break
+                if request is None:
+                    break
+
+                started = time.perf_counter()
+                method, path, version, headers = request
+                connection = headers.get('connection', '').lower()
+                keep_alive = connection == 'keep-alive' if version == 'HTTP/1.0' else connection != 'close'
+
+                route, status, body, extra_headers = await self.dispatch(method, path, headers, peer)
+                writer.write(response(status, body, extra_headers, keep_alive, head=method == 'HEAD'))
+                service.HTTP_LATENCY.observe(time.perf_counter() - started, route)
+                service.HTTP_REQUESTS.inc(route, method, str(status.value))
+                await writer.drain()
+                if not keep_alive:
+                    break
+                timeout = KEEPALIVE_TIMEOUT
+        except (asyncio.TimeoutError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+
+async def serve(sock=None, host='0.0.0.0', port=8080, backlog=2048):
+    """Run one event loop until SIGTERM/SIGINT"""
+    loop = asyncio.get_running_loop()
+    executor = ThreadPoolExecutor(max_workers=DB_THREADS, thread_name_prefix='redirect-db')
+    loop.set_default_executor(executor)
+    handler = RedirectServer(executor)
+    service.metrics.start()
+    if service.LINK_CHANGES_POLL_INTERVAL > 0:
+        service.link_changes.start()
+
+    if sock is not None:
+        server = await asyncio.start_server(handler.handle, sock=sock, limit=HEADER_LIMIT, backlog=backlog)
+    else:
+        server = await asyncio.start_server(handler.handle, host, port, limit=HEADER_LIMIT, backlog=backlog)
+
+    stop = asyncio.Event()
+    for signum in (signal.SIGTERM, signal.SIGINT):
+        loop.add_signal_handler(signum, stop.set)
+    async with server:
+        await stop.wait()
+    executor.shutdown(wait=True)
+
+
+def run_worker(sock, backlog):
+    """Serve on an inherited socket in a forked worker, then drain clicks like gunicorn's worker_exit"""
+    # Connections opened before the fork belong to the parent
+    with service.app.app_context():
+        service.db.engine.dispose(close=False)
+        if service.READ_ENGINE_SPLIT:
+            service.read_engine().dispose(close=False)
+    try:
+        asyncio.run(serve(sock=sock, backlog=backlog))
+    finally:
+        service.click_writer.close()
+        service.metrics.write_snapshot()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Async redirect server for /l/<token> and /health')
+    parser.add_argument('--host', default='0.0.0.0')
+    parser.add_argument('--port', type=int, default=int(os.environ.get('PORT', 8080)))
+    parser.add_argument('--workers', type=int, default=int(os.environ.get('ASYNC_WORKERS', 1)),
+                        help='processes sharing the listening socket')
+    parser.add_argument('--backlog', type=int, default=2048)
+    args = parser.parse_args()
+
+    sock = socket.create_server((args.host, args.port), backlog=args.backlog, reuse_port=False)
+    print(f"✅ Serving redirects on {args.host}:{sock.getsockname()[1]} with {args.workers} worker(s)", flush=True)
+
+    if args.workers == 1:
+        run_worker(sock, args.backlog)
+        return
+
+    children = []
+    for _ in range(args.workers):
+        pid = os.fork()
+        if pid == 0:
+            status = 0
+            try:
+                run_worker(sock, args.backlog)
+            except BaseException as e:
+                print(f"❌ Worker {os.getpid()} failed: {e}", file=sys.stderr)
+                status = 1
+            finally:
+                os._exit(status)
+        children.append(pid)
+
+    def forward(signum, frame):
+        for child in children:
+            try:
+                os.kill(child, signum)
+            except ProcessLookupError:
+                pass
+
+    signal.signal(signal.SIGTERM, forward)
+    signal.signal(signal.SIGINT, forward)
+    for child in children:
+        os.waitpid(child, 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+"""
+Backfill: Build click_rollups and country_rollups from existing link_clicks rows
+Run once after deploying rollups; safe to re-run
+
+Only days that still have all their raw clicks are rebuilt: rollups for days
+before the oldest remaining click (aged out by prune_clicks.py) are kept, and
+so is the oldest day itself if the rollups count more clicks on it than are
+left. --since limits the rebuild further.
+"""
+
+import argparse
+from datetime import date, datetime, timedelta
+
+from app import (
+    app, db, LinkClick, ClickRollup, CountryRollup, ROLLUP_KEY, COUNTRY_ROLLUP_KEY, rollup_rows, as_date
+)
+from counters import increment_counters
+from sqlalchemy import func
+
+
+def first_complete_day():
+    """The oldest day whose raw clicks are all still in link_clicks, or None if there are none"""
+    oldest = db.session.query(func.min(LinkClick.clicked_at)).scalar()
+    if oldest is None:
+        return None
+    day = oldest.date()
+    start = datetime.combine(day, datetime.min.time())
+    remaining = db.session.query(func.count()).filter(
+        LinkClick.clicked_at >= start, LinkClick.clicked_at < start + timedelta(days=1)
+    ).scalar()
+    counted = db.session.query(func.coalesce(func.sum(ClickRollup.clicks), 0)).filter(
+        ClickRollup.day == day
+    ).scalar()
+    return day + timedelta(days=1) if counted > remaining else day
+
+
+def backfill(chunk_size=50000, since=None):
+    """Rebuild the rollup tables from `since` (a date) on by scanning link_clicks in id-ordered chunks"""
+    with app.app_context():
+        try:
+            first_day = first_complete_day()
+            if first_day is None:
+                print("No clicks to backfill")
+                return
+            since = max(since or first_day, first_day)
+            since_at = datetime.combine(since, datetime.min.time())
+
+            # Clear rebuilt days and fix the upper bound in one transaction:
+            # clicks above max_id are counted by the live write path instead.
+            db.session.query(ClickRollup).filter(ClickRollup.day >= since).delete()
+            db.session.query(CountryRollup).filter(CountryRollup.day >= since).delete()
+            max_id = db.session.query(func.max(LinkClick.id)).scalar() or 0
+            db.session.commit()
+
+            print(f"Rebuilding rollups from {since} for click ids 1..{max_id}")
+
+            day = func.date(LinkClick.clicked_at)
+            rollups = [
+                (ClickRollup, ROLLUP_KEY, func.coalesce(LinkClick.device_type, 'other')),
+                (CountryRollup, COUNTRY_ROLLUP_KEY, func.coalesce(LinkClick.country, 'unknown')),
+            ]
+            low = 0
+            while low < max_id:
+                high = min(low + chunk_size, max_id)
+                written = 0
+                for model, key, column in rollups:
+                    rows = db.session.query(
+                        LinkClick.link_id, day, column, func.count()
+                    ).filter(
+                        LinkClick.id > low, LinkClick.id <= high, LinkClick.clicked_at >= since_at
+                    ).group_by(LinkClick.link_id, day, column).all()
+
+                    counts = {
+                        (link_id, as_date(click_day), value): count
+                        for link_id, click_day, value, count in rows
+                    }
+                    increment_counters(db.session, model, key, rollup_rows(counts, key))
+                    written += len(counts)
+                db.session.commit()
+
+                print(f"  ids {low + 1}..{high}: {written} rollup rows")
+                low = high
+
+            print("\n✅ Backfill completed successfully!")
+
+        except Exception as e:
+            print(f"❌ Backfill failed: {e}")
+            db.session.rollback()
+            raise
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Build click_rollups and country_rollups from link_clicks')
+    parser.add_argument('--chunk-size', type=int, default=50000, help='click ids scanned per transaction')
+    parser.add_argument('--since', type=date.fromisoformat, default=None,
+                        help='only rebuild days from this date (YYYY-MM-DD) on')
+    args = parser.parse_args()
+
+    print("=" * 60)
+    print("BACKFILL: Click Rollups")
+    print("=" * 60)
+    backfill(args.chunk_size, args.since)
@@ -0,0 +1,6 @@
+"""
+Benchmarks for the link service
+
+Run from the repository root, e.g.:
+    python -m benchmarks.bench_device_classifier
+"""
@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+"""
+Benchmark: click history analytics for one link, NumPy engine vs a per-row loop
+
+One link gets --clicks clicks spread over --days days (inserted directly,
+without rollups). "loop" reads (clicked_at, device_type) rows through the
+ORM and builds the daily timeline, weekday x hour heatmap, device-by-day
+counts and click gaps in Python, converting each click to the timezone;
+"numpy" is click_history(), the code behind
+/api/analytics/<token>?range=all&tz=...
+
+Usage:
+    python -m benchmarks.bench_analytics_engine [--clicks 10000000] [--tz America/New_York]
+"""
+
+import argparse
+from collections import Counter
+from datetime import datetime, timedelta, timezone
+import random
+import tempfile
+import time
+from zoneinfo import ZoneInfo
+
+from benchmarks.harness import load_app
+
+
+DEVICES = ['android', 'ios', 'windows', 'macos', 'linux', 'other']
+
+
+def insert_clicks(app_module, link_id, clicks, days, chunk=100000):
+    """Insert clicks in time order, as live traffic writes them, with random gaps"""
+    rng = random.Random(9)
+    clicked_at = datetime.utcnow() - timedelta(days=days)
+    mean_gap = days * 86400 / clicks
+    table = app_module.LinkClick.__table__
+    with app_module.app.app_context():
+        for offset in range(0, clicks, chunk):
+            rows = []
+            for _ in range(min(chunk, clicks - offset)):
+                clicked_at += timedelta(seconds=rng.expovariate(1 / mean_gap))
+                rows.append({
+                    'link_id': link_id,
+                    'clicked_at': clicked_at,
+                    'device_type': rng.choice(DEVICES),
+                    'ip_address': '10.0.0.1',
+                })
+            app_module.db.session.execute(table.insert(), rows)
+            app_module.db.session.commit()
+
+
+def loop_history(app_module, link_id, tz):
+    """The same statistics with one Python iteration per click"""
+    LinkClick = app_module.LinkClick
+    timeline, heatmap, device_by_day = Counter(), Counter(), Counter()
+    devices = Counter()
+    gaps = []
+    previous = None
+    with app_module.app.app_context():
+        rows = app_module.db.session.query(LinkClick.clicked_at, LinkClick.device_type).filter(
+            LinkClick.link_id == link_id).order_by(LinkClick.clicked_at).yield_per(100000)
+        for clicked_at, device_type in rows:
+            local = clicked_at.replace(tzinfo=timezone.utc).astimezone(tz)
+            day = local.date()
+            timeline[day] += 1
+            heatmap[local.weekday(), local.hour] += 1
+            device_by_day[day, device_type] += 1
+            devices[device_type] += 1
+            if previous is not None:
+                gaps.append((clicked_at - previous).total_seconds())
+            previous = clicked_at
+    gaps.sort()
+    percentiles = {pct: gaps[int(pct / 100 * (len(gaps) - 1))] for pct in (50, 90, 99)} if gaps else {}
+    return sum(timeline.values()), percentiles
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--clicks', type=int, default=10000000)
+    parser.add_argument('--days', type=int, default=365)
+    parser.add_argument('--tz', default='America/New_York')
+    args = parser.parse_args()
+
+    app_module = load_app(f"sqlite:///{tempfile.mkdtemp(prefix='history-')}/links.db")
+    with app_module.app.app_context():
+        app_module.insert_links([{
+            'token': 'history', 'fallback_url': 'https://example.com/', 'created_at': datetime.utcnow(),
+        }])
+        link = app_module.SmartLink.query.filter_by(token='history').one()
+        link_id = link.id
+
+    started = time.perf_counter()
+    insert_clicks(app_module, link_id, args.clicks, args.days)
+    print(f"inserted {args.clicks:,} clicks in {time.perf_counter() - started:.1f}s")
+
+    tz = ZoneInfo(args.tz)
+    end = datetime.now(timezone.utc) + timedelta(days=1)  # the last random gaps can run past now
+    with app_module.app.app_context():
+        link = app_module.db.session.get(app_module.SmartLink, link_id)
+        started = time.perf_counter()
+        history = app_module.click_history(link, None, end, 86400, tz, 7)
+        numpy_seconds = time.perf_counter() - started
+
+    started = time.perf_counter()
+    total, percentiles = loop_history(app_module, link_id, tz)
+    loop_seconds = time.perf_counter() - started
+
+    print(f"{'engine':>8} {'seconds':>9} {'clicks':>12} {'p50 gap':>9} {'p99 gap':>9}")
+    print(f"{'loop':>8} {loop_seconds:>9.2f} {total:>12,} {percentiles.get(50, 0):>9.3f} "
+          f"{percentiles.get(99, 0):>9.3f}")
+    gaps = history['click_gaps'] or {}
+    print(f"{'numpy':>8} {numpy_seconds:>9.2f} {history['total_clicks']:>12,} {gaps.get('p50', 0):>9.3f} "
+          f"{gaps.get('p99', 0):>9.3f}")
+    print(f"speedup: {loop_seconds / numpy_seconds:.1f}x")
+
+
+if __name__ == '__main__':
+    main()
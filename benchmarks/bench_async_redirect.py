@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+"""
+Benchmark: redirects under many concurrent connections, gunicorn vs async_redirect
+
+Both servers run as separate processes on the same seeded SQLite database
+with the same number of worker processes: `gunicorn app:app` (sync workers,
+as in the Procfile) and `python async_redirect.py`. An asyncio client opens
+--connections connections at once and spreads --requests redirects over
+them, reusing a connection whenever the server keeps it alive.
+
+Usage:
+    python -m benchmarks.bench_async_redirect [--connections 1000] [--workers 2]
+"""
+
+import argparse
+import asyncio
+import os
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+from benchmarks.harness import load_app, percentile, seed
+from benchmarks.ua_corpus import sample_user_agents
+
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def start_server(kind, port, workers, env):
+    if kind == 'gunicorn':
+        command = ['gunicorn', 'app:app', '--workers', str(workers), '--bind', f'127.0.0.1:{port}',
+                   '--backlog', '2048', '--log-level', 'warning']
+    else:
+        command = [sys.executable, 'async_redirect.py', '--host', '127.0.0.1', '--port', str(port),
+                   '--workers', str(workers)]
+    return subprocess.Popen(command, cwd=ROOT, env=env, stdout=subprocess.DEVNULL)
+
+
+async def wait_ready(port, timeout=30):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            reader, writer = await asyncio.open_connection('127.0.0.1', port)
+            writer.write(b'GET /health HTTP/1.1\r\nHost: bench\r\nConnection: close\r\n\r\n')
+            await writer.drain()
+            if (await reader.read(12)).startswith(b'HTTP/1.1 200'):
+                writer.close()
+                return
+            writer.close()
+        except OSError:
+            pass
+        await asyncio.sleep(0.2)
+    raise RuntimeError(f'server on port {port} did not become ready')
+
+
+async def client(port, paths, user_agents, counter, latencies, errors):
+    """One connection's worth of sequential requests, reconnecting when the server closes"""
+    reader = writer = None
+    for i in counter:
+        request = (f'GET {paths[i % len(paths)]} HTTP/1.1\r\nHost: bench\r\n'
+                   f'User-Agent: {user_agents[i % len(user_agents)]}\r\n\r\n').encode('latin-1')
+        started = time.perf_counter()
+        try:
+            if writer is None:
+                reader, writer = await asyncio.open_connection('127.0.0.1', port)
+            writer.write(request)
+            head = await reader.readuntil(b'\r\n\r\n')
+            headers = head.decode('latin-1').lower()
+            length = int(headers.split('content-length:', 1)[1].split('\r\n', 1)[0])
+            await reader.readexactly(length)
+            if not head.startswith(b'HTTP/1.1 302'):
+                errors.append(head.split(b'\r\n', 1)[0])
+            if 'connection: close' in headers:
+                writer.close()
+                writer = None
+        except (OSError, asyncio.IncompleteReadError) as e:
+            errors.append(repr(e))
+            if writer is not None:
+                writer.close()
+            writer = None
+        latencies.append(time.perf_counter() - started)
+    if writer is not None:
+        writer.close()
+
+
+async def load(port, paths, user_agents, connections, requests):
+    await wait_ready(port)
+    counter = iter(range(requests))
+    latencies, errors = [], []
+    started = time.perf_counter()
+    await asyncio.gather(*(client(port, paths, user_agents, counter, latencies, errors)
+                           for _ in range(connections)))
+    elapsed = time.perf_counter() - started
+    latencies.sort()
+    return {
+        'rps': requests / elapsed,
+        'p50_ms': percentile(latencies, 50) * 1000,
+        'p99_ms': percentile(latencies, 99) * 1000,
+        'errors': len(errors),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--connections', type=int, default=1000)
+    parser.add_argument('--requests', type=int, default=50000)
+    parser.add_argument('--workers', type=int, default=2)
+    parser.add_argument('--links', type=int, default=5000)
+    parser.add_argument('--port', type=int, default=18090)
+    args = parser.parse_args()
+
+    database_url = f"sqlite:///{tempfile.mkdtemp(prefix='asyncredirect-')}/links.db"
+    app_module = load_app(database_url)
+    tokens = seed(app_module, links=args.links, clicks=0)
+    rng = random.Random(5)
+    paths = [f'/l/{rng.choice(tokens)}' for _ in range(args.requests)]
+    user_agents = sample_user_agents(5000, seed=5)
+
+    env = dict(os.environ, DATABASE_URL=database_url, CLICK_RATE_LIMIT='0')
+    servers = ['gunicorn', 'async'] if shutil.which('gunicorn') else ['async']
+    if 'gunicorn' not in servers:
+        print('gunicorn is not installed; only the async server is measured')
+
+    print(f"{args.connections} connections, {args.requests} redirects over {args.links} links, "
+          f"{args.workers} worker process(es) each")
+    print(f"{'server':>10} {'req/s':>8} {'p50 ms':>8} {'p99 ms':>8} {'errors':>7}")
+    for i, kind in enumerate(servers):
+        port = args.port + i
+        process = start_server(kind, port, args.workers, env)
+        try:
+            result = asyncio.run(load(port, paths, user_agents, args.connections, args.requests))
+        finally:
+            process.terminate()
+            process.wait(30)
+        print(f"{kind:>10} {result['rps']:>8.0f} {result['p50_ms']:>8.1f} {result['p99_ms']:>8.1f} "
+              f"{result['errors']:>7}")
+
+
+if __name__ == '__main__':
+    main()
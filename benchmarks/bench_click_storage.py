@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+"""
+Benchmark: link_clicks size and click write throughput, raw vs normalized storage
+
+Writes --clicks clicks through write_clicks in flusher-sized batches with
+realistic User-Agents and per-device destinations, then reports clicks/s
+and the on-disk size of link_clicks (with its indexes) and of the
+user_agents and destinations lookup tables.
+
+Usage:
+    python -m benchmarks.bench_click_storage [--clicks 200000] [--database-url URL]
+"""
+
+import argparse
+import random
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import text
+
+from benchmarks.harness import load_app
+from benchmarks.ua_corpus import sample_user_agents
+from link_cache import LinkRecord
+
+
+def table_bytes(app_module, tables):
+    with app_module.app.app_context():
+        connection = app_module.db.session.connection()
+        if connection.dialect.name == 'postgresql':
+            return sum(connection.execute(text('SELECT pg_total_relation_size(:t)'), {'t': t}).scalar()
+                       for t in tables)
+        return connection.execute(text(
+            'SELECT SUM(pgsize) FROM dbstat WHERE name IN (SELECT name FROM sqlite_master WHERE tbl_name IN '
+            f"({', '.join(repr(t) for t in tables)}))"
+        )).scalar() or 0
+
+
+def run(storage, args):
+    database_url = args.database_url or f"sqlite:///{tempfile.mkdtemp(prefix='clickstorage-')}/links.db"
+    app_module = load_app(database_url, CLICK_STORAGE=storage)
+    rng = random.Random(3)
+
+    with app_module.app.app_context():
+        if app_module.db.engine.dialect.name == 'postgresql':
+            app_module.db.session.execute(text(
+                'TRUNCATE smart_links, link_clicks, click_rollups, country_rollups, '
+                'link_counter_shards, user_agents, destinations RESTART IDENTITY'
+            ))
+            app_module.db.session.commit()
+        app_module.insert_links([
+            {
+                'token': app_module.generate_token(),
+                'android_url': f'https://play.google.com/store/apps/details?id=com.example.app{i}&referrer=utm_source%3Demail',
+                'ios_url': f'https://apps.apple.com/us/app/example-app/id{100000000 + i}?pt=118&ct=email',
+                'fallback_url': f'https://www.example.com/campaigns/spring-sale/landing?utm_source=email&link={i}',
+                'created_at': datetime.utcnow(),
+            }
+            for i in range(args.links)
+        ])
+        links = [
+            LinkRecord(*row) for row in app_module.db.session.query(
+                *[getattr(app_module.SmartLink, name) for name in app_module.LINK_RECORD_FIELDS])
+        ]
+
+    user_agents = sample_user_agents(20000, seed=3)
+    now = datetime.utcnow()
+    started = time.perf_counter()
+    batch = []
+    for i in range(args.clicks):
+        link = rng.choice(links)
+        user_agent = user_agents[i % len(user_agents)]
+        device_type = app_module.device_classifier.classify(user_agent)
+        batch.append(app_module.ClickEvent(
+            link_id=link.id,
+            clicked_at=now - timedelta(seconds=rng.randrange(30 * 86400)),
+            device_type=device_type,
+            user_agent=user_agent,
+            ip_address=f'10.{rng.randrange(256)}.{rng.randrange(256)}.{rng.randrange(256)}',
+            redirected_to=link.destination(device_type),
+        ))
+        if len(batch) == args.batch_size:
+            app_module.write_clicks(batch)
+            batch = []
+    if batch:
+        app_module.write_clicks(batch)
+    seconds = time.perf_counter() - started
+
+    return {
+        'rate': args.clicks / seconds,
+        'clicks_mb': table_bytes(app_module, ['link_clicks']) / 1e6,
+        'lookup_mb': table_bytes(app_module, ['user_agents', 'destinations']) / 1e6,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--clicks', type=int, default=200000)
+    parser.add_argument('--links', type=int, default=1000)
+    parser.add_argument('--batch-size', type=int, default=500)
+    parser.add_argument('--database-url', default=None, help='default: a fresh temp SQLite file per run')
+    args = parser.parse_args()
+
+    print(f"{'storage':>10} {'clicks/s':>9} {'link_clicks MB':>15} {'bytes/click':>12} {'lookup MB':>10}")
+    for storage in ('raw', 'normalized'):
+        result = run(storage, args)
+        print(f"{storage:>10} {result['rate']:>9.0f} {result['clicks_mb']:>15.1f} "
+              f"{result['clicks_mb'] * 1e6 / args.clicks:>12.0f} {result['lookup_mb']:>10.2f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,59 @@
+#!/usr/bin/env python3
+"""
+Benchmark: POST /api/create/batch vs one POST /api/create per link
+
+Usage:
+    python -m benchmarks.bench_create_batch [--links 20000] [--database-url URL]
+"""
+
+import argparse
+import json
+import time
+
+from benchmarks.harness import load_app
+
+
+def payload(i):
+    return {
+        'name': f'Campaign link {i}',
+        'android_url': f'https://play.google.com/store/apps/details?id=com.example&ref={i}',
+        'ios_url': f'https://apps.apple.com/app/id123456789?ref={i}',
+        'fallback_url': f'https://example.com/?ref={i}',
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--links', type=int, default=20000)
+    parser.add_argument('--single-links', type=int, default=2000, help='links created through /api/create')
+    parser.add_argument('--database-url', default=None)
+    args = parser.parse_args()
+
+    app = load_app(args.database_url)
+    client = app.app.test_client()
+
+    start = time.perf_counter()
+    for i in range(args.single_links):
+        assert client.post('/api/create', json=payload(i)).status_code == 200
+    single = args.single_links / (time.perf_counter() - start)
+
+    body = [payload(i) for i in range(args.links)]
+    start = time.perf_counter()
+    response = client.post('/api/create/batch', json=body)
+    batch = args.links / (time.perf_counter() - start)
+    assert response.get_json()['created'] == args.links
+
+    ndjson = '\n'.join(json.dumps(item) for item in body)
+    start = time.perf_counter()
+    response = client.post('/api/create/batch', data=ndjson, content_type='application/x-ndjson')
+    stream = args.links / (time.perf_counter() - start)
+    assert response.get_json()['created'] == args.links
+
+    print(f"{'POST /api/create':<32} {single:>10,.0f} links/s  ({args.single_links:,} links)")
+    print(f"{'POST /api/create/batch (JSON)':<32} {batch:>10,.0f} links/s  ({args.links:,} links)")
+    print(f"{'POST /api/create/batch (NDJSON)':<32} {stream:>10,.0f} links/s  ({args.links:,} links)")
+    print(f"speedup: {batch / single:.1f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+"""
+Benchmark: memoized DeviceClassifier vs the original inline detection chain
+
+"no memo" rows are the cache-miss path every new User-Agent pays; the bot
+rows are the second classification each recorded redirect makes.
+
+Usage:
+    python -m benchmarks.bench_device_classifier [--requests 500000]
+"""
+
+import argparse
+import time
+
+from device_classifier import DeviceClassifier, BOT_RULES
+from benchmarks.ua_corpus import sample_user_agents
+
+
+def legacy_classify(user_agent):
+    """The detection chain redirect_link used before DeviceClassifier"""
+    user_agent = user_agent.lower()
+    if 'android' in user_agent:
+        return 'android'
+    elif any(x in user_agent for x in ['iphone', 'ipad', 'ipod']):
+        return 'ios'
+    elif 'windows' in user_agent or 'win32' in user_agent or 'win64' in user_agent:
+        return 'windows'
+    elif 'macintosh' in user_agent or 'mac os' in user_agent or 'darwin' in user_agent:
+        return 'macos'
+    elif 'linux' in user_agent and 'android' not in user_agent:
+        return 'linux'
+    return 'other'
+
+
+def run(label, fn, corpus):
+    start = time.perf_counter()
+    for ua in corpus:
+        fn(ua)
+    elapsed = time.perf_counter() - start
+    print(f"{label:<28} {len(corpus) / elapsed:>14,.0f} UA/s   {elapsed * 1e9 / len(corpus):>8.0f} ns/UA")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--requests', type=int, default=500000)
+    parser.add_argument('--variants', type=int, default=2000, help='distinct UA strings in the stream')
+    args = parser.parse_args()
+
+    corpus = sample_user_agents(args.requests, variants=args.variants)
+
+    classifier = DeviceClassifier()
+    mismatches = sum(1 for ua in set(corpus) if legacy_classify(ua) != classifier.classify(ua))
+    print(f"{len(corpus):,} requests, {len(set(corpus)):,} distinct UAs, {mismatches} mismatches vs legacy")
+    print("-" * 60)
+
+    run('legacy inline chain', legacy_classify, corpus)
+    run('compiled, no memo', DeviceClassifier(cache_size=0).classify, corpus)
+    run('compiled + memo', DeviceClassifier().classify, corpus)
+    run('bots, no memo', DeviceClassifier(BOT_RULES, default='human', cache_size=0).classify, corpus)
+    run('bots + memo', DeviceClassifier(BOT_RULES, default='human').classify, corpus)
+
+    info = classifier.cache_info()
+    print("-" * 60)
+    print(f"memo cache: {info.currsize} entries, maxsize {info.maxsize}")
+
+
+if __name__ == '__main__':
+    main()
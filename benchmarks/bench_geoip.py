@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""
+Benchmark: GeoIP table load time, memory and lookup rate
+
+Without --csv a synthetic table the size of a full country dataset
+(~350k IPv4 and ~300k IPv6 ranges over ~250 countries) is generated.
+
+Usage:
+    python -m benchmarks.bench_geoip
+    python -m benchmarks.bench_geoip --csv dbip-country-lite.csv
+"""
+
+import argparse
+import ipaddress
+import os
+import random
+import tempfile
+import time
+
+from geoip import GeoIP
+
+
+def country_codes():
+    letters = 'ABCDEFGHIJKLMNOPQRSTUVWXYZ'
+    return [a + b for a in letters for b in letters][:250]
+
+
+def write_synthetic(path, v4_ranges, v6_ranges, seed=1):
+    rng = random.Random(seed)
+    codes = country_codes()
+    with open(path, 'w') as f:
+        f.write('start_ip,end_ip,country\n')
+        start = 1 << 24
+        step = ((224 << 24) - start) // v4_ranges
+        for _ in range(v4_ranges):
+            size = rng.randint(step // 2, step * 3 // 2)
+            end = min(start + size, 224 << 24) - 1
+            f.write(f'{ipaddress.IPv4Address(start)},{ipaddress.IPv4Address(end)},{rng.choice(codes)}\n')
+            start = end + 1 + rng.choice((0, 0, 0, 256))
+        start = 0x2000 << 112
+        step = (0x1000 << 112) // v6_ranges
+        for _ in range(v6_ranges):
+            end = start + (rng.randint(step // 2, step * 3 // 2) >> 80 << 80) - 1
+            f.write(f'{ipaddress.IPv6Address(start)},{ipaddress.IPv6Address(end)},{rng.choice(codes)}\n')
+            start = end + 1
+
+
+def rss_mb():
+    with open('/proc/self/statm') as f:
+        return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') / 1e6
+
+
+def rate(fn, values):
+    started = time.perf_counter()
+    for value in values:
+        fn(value)
+    return len(values) / (time.perf_counter() - started)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--csv', default=None, help='real range file (default: synthetic)')
+    parser.add_argument('--v4-ranges', type=int, default=350000)
+    parser.add_argument('--v6-ranges', type=int, default=300000)
+    parser.add_argument('--lookups', type=int, default=500000)
+    parser.add_argument('--distinct-ips', type=int, default=20000, help='distinct addresses in the cached run')
+    args = parser.parse_args()
+
+    path = args.csv
+    if path is None:
+        path = os.path.join(tempfile.mkdtemp(prefix='geoip-'), 'ranges.csv')
+        write_synthetic(path, args.v4_ranges, args.v6_ranges)
+
+    rss_before = rss_mb()
+    started = time.perf_counter()
+    geoip = GeoIP(path, cache_size=65536)
+    load_seconds = time.perf_counter() - started
+    rss_after = rss_mb()
+    stats = geoip.stats()
+
+    rng = random.Random(2)
+    v4 = [str(ipaddress.IPv4Address(rng.randrange(1 << 24, 224 << 24))) for _ in range(args.lookups)]
+    v6 = [str(ipaddress.IPv6Address(rng.randrange(0x2000 << 112, 0x3000 << 112))) for _ in range(args.lookups)]
+    hot = v4[:args.distinct_ips]
+    repeated = [hot[rng.randrange(len(hot))] for _ in range(args.lookups)]
+    for ip in hot:
+        geoip.lookup(ip)
+
+    print(f"ranges:             {stats['ipv4_ranges']:,} IPv4, {stats['ipv6_ranges']:,} IPv6, "
+          f"{stats['countries']} countries")
+    print(f"load time:          {load_seconds:.2f}s")
+    print(f"table arrays:       {stats['bytes'] / 1e6:.1f} MB")
+    print(f"RSS after load:     +{rss_after - rss_before:.1f} MB")
+    print(f"IPv4 uncached:      {rate(geoip._lookup, v4):>12,.0f} lookups/s")
+    print(f"IPv6 uncached:      {rate(geoip._lookup, v6):>12,.0f} lookups/s")
+    print(f"cached ({len(hot):,} IPs): {rate(geoip.lookup, repeated):>12,.0f} lookups/s")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+"""
+Benchmark: concurrent redirects on one token, single counter row vs sharded
+
+Every click is written inside its request (CLICK_WRITE_BEHIND=0) so the
+counter update is on the request path, which is where row-lock contention
+on a viral link shows up. Row locks only matter on PostgreSQL; on SQLite
+the whole database is locked per write, so expect little difference there.
+
+Usage:
+    python -m benchmarks.bench_hot_counter --database-url postgresql://localhost/bench
+    python -m benchmarks.bench_hot_counter --shards 0,4,16 --concurrency 32
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+from benchmarks.harness import load_app, serve_app, http_request, drive
+
+
+def run_child(args):
+    """Run one configuration in this process and print its summary as JSON"""
+    app_module = load_app(args.database_url, CLICK_WRITE_BEHIND='0', CLICK_COUNTER_SHARDS=args.child_shards)
+    client = app_module.app.test_client()
+    token = client.post('/api/create', json={'fallback_url': 'https://example.com'}).get_json()['token']
+
+    base_url, stop = serve_app(app_module.app)
+    try:
+        summary = drive(
+            lambda i: http_request(base_url, 'GET', f'/l/{token}')[0] == 302,
+            args.requests, args.concurrency, warmup=20
+        )
+    finally:
+        stop()
+
+    summary['click_count'] = client.get(f'/api/stats/{token}').get_json()['click_count']
+    print(json.dumps(summary))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--shards', default='0,8', help='comma separated shard counts (0 = counter on smart_links)')
+    parser.add_argument('--requests', type=int, default=3000)
+    parser.add_argument('--concurrency', type=int, default=16)
+    parser.add_argument('--database-url', default=None, help='default: a fresh temp SQLite file per run')
+    parser.add_argument('--child-shards', type=int, default=None, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child_shards is not None:
+        run_child(args)
+        return
+
+    print(f"{'shards':>6} {'rps':>9} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'errors':>7} {'counted':>8}")
+    for shards in args.shards.split(','):
+        database_url = args.database_url or f"sqlite:///{tempfile.mkdtemp(prefix='hotcounter-')}/links.db"
+        command = [
+            sys.executable, '-m', 'benchmarks.bench_hot_counter',
+            '--child-shards', shards, '--requests', str(args.requests),
+            '--concurrency', str(args.concurrency), '--database-url', database_url,
+        ]
+        output = subprocess.check_output(command, cwd=os.getcwd(), text=True)
+        summary = json.loads(output.strip().splitlines()[-1])
+        print(f"{shards:>6} {summary['rps']:>9.0f} {summary['p50_ms']:>9.2f} {summary['p95_ms']:>9.2f} "
+              f"{summary['p99_ms']:>9.2f} {summary['errors']:>7} {summary['click_count']:>8}")
+
+
+if __name__ == '__main__':
+    main()
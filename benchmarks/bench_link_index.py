@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""
+Benchmark: memory-mapped link index size, memory and lookup latency
+
+Builds a synthetic snapshot (no database needed), maps it and measures
+random hit/miss lookups and resident memory.
+
+Usage:
+    python -m benchmarks.bench_link_index [--links 10000000] [--path /tmp/links.idx]
+"""
+
+import argparse
+import os
+import random
+import tempfile
+import time
+
+from link_index import LinkIndex, write_index
+
+
+ALPHABET = '0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZ_abcdefghijklmnopqrstuvwxyz'
+
+
+def token_for(i, width=16):
+    """Deterministic fixed-width tokens that sort in the same order as i"""
+    chars = []
+    for _ in range(width):
+        i, remainder = divmod(i, len(ALPHABET))
+        chars.append(ALPHABET[remainder])
+    return ''.join(reversed(chars))
+
+
+def rows(n, spacing):
+    app_urls = [f'https://play.google.com/store/apps/details?id=com.example.app{i}' for i in range(1000)]
+    ios_urls = [f'https://apps.apple.com/app/id{100000000 + i}' for i in range(1000)]
+    for i in range(n):
+        yield (token_for(i * spacing), i + 1, app_urls[i % 1000], ios_urls[i % 1000],
+               None, None, None, f'https://example.com/campaign/{i}')
+
+
+def rss_mb():
+    with open('/proc/self/statm') as f:
+        return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') / 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--links', type=int, default=1000000)
+    parser.add_argument('--lookups', type=int, default=200000)
+    parser.add_argument('--path', default=os.path.join(tempfile.gettempdir(), 'bench-links.idx'))
+    args = parser.parse_args()
+
+    spacing = 7  # leave gaps between tokens so misses land inside the table
+    started = time.perf_counter()
+    write_index(args.path, rows(args.links, spacing), key_width=16)
+    build_seconds = time.perf_counter() - started
+    size_mb = os.path.getsize(args.path) / 1e6
+
+    rng = random.Random(1)
+    hits = [token_for(rng.randrange(args.links) * spacing) for _ in range(args.lookups)]
+    misses = [token_for(rng.randrange(args.links) * spacing + 3) for _ in range(args.lookups)]
+
+    rss_before = rss_mb()
+    index = LinkIndex(args.path, check_interval=3600)
+    rss_mapped = rss_mb()
+
+    started = time.perf_counter()
+    for token in hits:
+        index.get(token)
+    hit_us = (time.perf_counter() - started) / args.lookups * 1e6
+
+    started = time.perf_counter()
+    for token in misses:
+        index.get(token)
+    miss_us = (time.perf_counter() - started) / args.lookups * 1e6
+
+    rss_after = rss_mb()
+    assert index.stats()['hits'] == args.lookups
+
+    print(f"links:              {args.links:,}")
+    print(f"build time:         {build_seconds:.1f}s")
+    print(f"file size:          {size_mb:.1f} MB ({size_mb * 1e6 / args.links:.0f} bytes/link)")
+    print(f"RSS after mmap:     +{rss_mapped - rss_before:.1f} MB")
+    print(f"RSS after lookups:  +{rss_after - rss_before:.1f} MB (shared page cache, not per worker)")
+    print(f"hit lookup:         {hit_us:.2f} us")
+    print(f"miss lookup:        {miss_us:.2f} us")
+
+    os.remove(args.path)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,160 @@
+#!/usr/bin/env python3
+"""
+Load test: redirect, create, stats and analytics against a local app
+
+Starts app.py on a temp SQLite database (or --database-url), seeds links and
+clicks, drives concurrent load at each route and reports requests/second and
+p50/p95/p99 latency. Results are written as JSON so runs can be compared.
+
+Usage:
+    python -m benchmarks.bench_load --output results.json
+    python -m benchmarks.bench_load --baseline results.json   # exit 1 on regression
+    python -m benchmarks.bench_load --url http://127.0.0.1:8000 --skip-seed  # external server
+"""
+
+import argparse
+import json
+import os
+import random
+import subprocess
+import sys
+import time
+from datetime import datetime
+
+from benchmarks.harness import load_app, serve_app, http_request, drive, seed
+from benchmarks.ua_corpus import sample_user_agents
+
+
+SCENARIOS = ('redirect', 'create', 'stats', 'analytics')
+
+
+def make_scenarios(base_url, tokens, seed_value=7):
+    rng = random.Random(seed_value)
+    user_agents = sample_user_agents(10000, seed=seed_value)
+    body = json.dumps({
+        'name': 'Load test link',
+        'android_url': 'https://play.google.com/store/apps/details?id=com.example',
+        'ios_url': 'https://apps.apple.com/app/id123456789',
+        'fallback_url': 'https://example.com',
+    })
+
+    def redirect(i):
+        status, _ = http_request(base_url, 'GET', f'/l/{rng.choice(tokens)}',
+                                 headers={'User-Agent': user_agents[i % len(user_agents)]})
+        return status == 302
+
+    def create(i):
+        status, _ = http_request(base_url, 'POST', '/api/create', body=body,
+                                 headers={'Content-Type': 'application/json'})
+        return status == 200
+
+    def stats(i):
+        status, _ = http_request(base_url, 'GET', f'/api/stats/{rng.choice(tokens)}')
+        return status == 200
+
+    def analytics(i):
+        status, _ = http_request(base_url, 'GET', f'/api/analytics/{rng.choice(tokens)}')
+        return status == 200
+
+    return {'redirect': redirect, 'create': create, 'stats': stats, 'analytics': analytics}
+
+
+def compare(results, baseline, tolerance):
+    """Print per-scenario deltas and return the list of regressions"""
+    regressions = []
+    print(f"\n{'scenario':<12} {'rps':>18} {'p95 ms':>20}")
+    for name, current in results['scenarios'].items():
+        previous = baseline.get('scenarios', {}).get(name)
+        if not previous:
+            continue
+        rps_delta = (current['rps'] - previous['rps']) / previous['rps'] if previous['rps'] else 0.0
+        p95_delta = (current['p95_ms'] - previous['p95_ms']) / previous['p95_ms'] if previous['p95_ms'] else 0.0
+        flag = ''
+        if rps_delta < -tolerance or p95_delta > tolerance:
+            regressions.append(name)
+            flag = '  <-- regression'
+        print(f"{name:<12} {previous['rps']:>8.0f} -> {current['rps']:<8.0f} "
+              f"{previous['p95_ms']:>8.2f} -> {current['p95_ms']:<8.2f} "
+              f"({rps_delta:+.0%} rps, {p95_delta:+.0%} p95){flag}")
+    return regressions
+
+
+def git_revision():
+    try:
+        return subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'], text=True,
+                                       stderr=subprocess.DEVNULL).strip()
+    except Exception:
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--links', type=int, default=1000)
+    parser.add_argument('--clicks', type=int, default=100000)
+    parser.add_argument('--requests', type=int, default=2000, help='requests per scenario')
+    parser.add_argument('--concurrency', type=int, default=16)
+    parser.add_argument('--scenarios', default=','.join(SCENARIOS))
+    parser.add_argument('--database-url', default=None, help='default: temp SQLite file')
+    parser.add_argument('--url', default=None, help='load an already running server instead of starting one')
+    parser.add_argument('--skip-seed', action='store_true', help='use links already in the database')
+    parser.add_argument('--output', default=None, help='write results JSON here')
+    parser.add_argument('--baseline', default=None, help='results JSON to compare against')
+    parser.add_argument('--tolerance', type=float, default=0.10, help='allowed relative regression')
+    args = parser.parse_args()
+
+    app_module = load_app(args.database_url)
+
+    if args.skip_seed:
+        with app_module.app.app_context():
+            tokens = [token for (token,) in app_module.db.session.query(app_module.SmartLink.token)]
+    else:
+        start = time.perf_counter()
+        tokens = seed(app_module, links=args.links, clicks=args.clicks)
+        print(f"Seeded {args.links:,} links and {args.clicks:,} clicks in {time.perf_counter() - start:.1f}s")
+    if not tokens:
+        sys.exit('no links to load test')
+
+    stop = None
+    base_url = args.url
+    if base_url is None:
+        base_url, stop = serve_app(app_module.app)
+
+    scenarios = make_scenarios(base_url, tokens)
+    results = {
+        'timestamp': datetime.utcnow().isoformat(),
+        'git_revision': git_revision(),
+        'python': sys.version.split()[0],
+        'database': app_module.app.config['SQLALCHEMY_DATABASE_URI'].split(':', 1)[0],
+        'links': len(tokens),
+        'clicks': 0 if args.skip_seed else args.clicks,
+        'scenarios': {},
+    }
+
+    print(f"\n{'scenario':<12} {'requests':>9} {'errors':>7} {'rps':>9} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}")
+    try:
+        for name in args.scenarios.split(','):
+            summary = drive(scenarios[name], args.requests, args.concurrency, warmup=min(50, args.requests))
+            results['scenarios'][name] = summary
+            print(f"{name:<12} {summary['requests']:>9} {summary['errors']:>7} {summary['rps']:>9.0f} "
+                  f"{summary['p50_ms']:>9.2f} {summary['p95_ms']:>9.2f} {summary['p99_ms']:>9.2f}")
+    finally:
+        if stop:
+            stop()
+        app_module.click_writer.close()
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+        print(f"\nResults written to {os.path.abspath(args.output)}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(results, json.load(f), args.tolerance)
+        if regressions:
+            print(f"\n❌ Regression in: {', '.join(regressions)}")
+            sys.exit(1)
+        print("\n✅ No regressions")
+
+
+if __name__ == '__main__':
+    main()
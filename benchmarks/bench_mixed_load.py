@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""
+Benchmark: redirect and create latency while heavy analytics queries run
+
+Background threads keep requesting /api/analytics/<token>?source=raw (a full
+aggregate over link_clicks) while redirects and creates are driven against a
+deliberately small write pool. Clicks are written inside each redirect
+(CLICK_WRITE_BEHIND=0) so every redirect needs a write connection. Runs once
+with reads on their own engine and once with DB_READ_SPLIT=0 (one shared pool).
+
+Usage:
+    python -m benchmarks.bench_mixed_load
+    python -m benchmarks.bench_mixed_load --database-url postgresql://localhost/bench --readers 16
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+
+from benchmarks.harness import load_app, serve_app, http_request, drive, seed
+
+
+def run_child(args):
+    """Run one configuration in this process and print its summary as JSON"""
+    app_module = load_app(
+        args.database_url, CLICK_WRITE_BEHIND='0', DB_READ_SPLIT=args.child_split,
+        DB_POOL_SIZE=args.pool_size, DB_MAX_OVERFLOW=0, DB_POOL_TIMEOUT=10,
+        DB_READ_POOL_SIZE=args.pool_size, DB_READ_MAX_OVERFLOW=0, DB_READ_POOL_TIMEOUT=60,
+    )
+    tokens = seed(app_module, links=10, clicks=args.clicks)
+    body = json.dumps({'fallback_url': 'https://example.com'})
+
+    base_url, stop = serve_app(app_module.app)
+    done = threading.Event()
+    analytics_requests = []
+
+    def reader(n):
+        completed = 0
+        while not done.is_set():
+            http_request(base_url, 'GET', f'/api/analytics/{tokens[n % len(tokens)]}?source=raw', timeout=120)
+            completed += 1
+        analytics_requests.append(completed)
+
+    readers = [threading.Thread(target=reader, args=(n,)) for n in range(args.readers)]
+    for thread in readers:
+        thread.start()
+    try:
+        def redirect_or_create(i):
+            if i % 10 == 0:
+                return http_request(base_url, 'POST', '/api/create', body=body,
+                                    headers={'Content-Type': 'application/json'})[0] == 200
+            return http_request(base_url, 'GET', f'/l/{tokens[i % len(tokens)]}')[0] == 302
+
+        summary = drive(redirect_or_create, args.requests, args.concurrency, warmup=20)
+    finally:
+        done.set()
+        for thread in readers:
+            thread.join()
+        stop()
+
+    summary['analytics_requests'] = sum(analytics_requests)
+    print(json.dumps(summary))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--requests', type=int, default=2000, help='redirects and creates (1 in 10) to drive')
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument('--readers', type=int, default=8, help='threads issuing analytics requests')
+    parser.add_argument('--clicks', type=int, default=200000, help='clicks to seed')
+    parser.add_argument('--pool-size', type=int, default=4, help='connections per pool (no overflow)')
+    parser.add_argument('--database-url', default=None, help='default: a fresh temp SQLite file per run')
+    parser.add_argument('--child-split', default=None, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child_split is not None:
+        run_child(args)
+        return
+
+    print(f"{'reads':>8} {'rps':>9} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'errors':>7} {'analytics':>10}")
+    for split, label in (('0', 'shared'), ('1', 'split')):
+        database_url = args.database_url or f"sqlite:///{tempfile.mkdtemp(prefix='mixedload-')}/links.db"
+        command = [
+            sys.executable, '-m', 'benchmarks.bench_mixed_load', '--child-split', split,
+            '--requests', str(args.requests), '--concurrency', str(args.concurrency),
+            '--readers', str(args.readers), '--clicks', str(args.clicks),
+            '--pool-size', str(args.pool_size), '--database-url', database_url,
+        ]
+        output = subprocess.check_output(command, cwd=os.getcwd(), text=True)
+        summary = json.loads(output.strip().splitlines()[-1])
+        print(f"{label:>8} {summary['rps']:>9.0f} {summary['p50_ms']:>9.2f} {summary['p95_ms']:>9.2f} "
+              f"{summary['p99_ms']:>9.2f} {summary['errors']:>7} {summary['analytics_requests']:>10}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,59 @@
+#!/usr/bin/env python3
+"""
+Benchmark: worker cold-start time with and without schema work at import
+
+"create_all" reproduces the old behaviour (db.create_all() when app.py is
+imported); "migrated" is the current import against an already migrated
+database. Each sample is a fresh interpreter, like a new gunicorn worker.
+
+Usage:
+    python -m benchmarks.bench_startup [--runs 20] [--database-url URL]
+"""
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+import migrations
+from sqlalchemy import create_engine
+
+
+CHILD = '''
+import time
+started = time.perf_counter()
+import app
+if {create_all}:
+    with app.app.app_context():
+        app.db.create_all()
+print(time.perf_counter() - started)
+'''
+
+
+def sample(database_url, create_all):
+    env = dict(os.environ, DATABASE_URL=database_url)
+    output = subprocess.check_output(
+        [sys.executable, '-c', CHILD.format(create_all=create_all)], env=env, text=True
+    )
+    return float(output.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--runs', type=int, default=20)
+    parser.add_argument('--database-url', default=None, help='default: temp SQLite file')
+    args = parser.parse_args()
+
+    database_url = args.database_url or f"sqlite:///{tempfile.mkdtemp(prefix='startup-')}/links.db"
+    migrations.upgrade(create_engine(database_url), log=lambda message: None)
+
+    print(f"{'mode':<12} {'median ms':>10} {'min ms':>8} {'max ms':>8}")
+    for label, create_all in (('create_all', True), ('migrated', False)):
+        samples = [sample(database_url, create_all) * 1000 for _ in range(args.runs)]
+        print(f"{label:<12} {statistics.median(samples):>10.1f} {min(samples):>8.1f} {max(samples):>8.1f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,49 @@
+#!/usr/bin/env python3
+"""
+Benchmark: POST /api/stats/batch vs one GET /api/stats/<token> per link
+
+Usage:
+    python -m benchmarks.bench_stats_batch [--tokens 1000] [--database-url URL]
+"""
+
+import argparse
+import statistics
+import time
+
+from benchmarks.harness import load_app, seed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--tokens', type=int, default=1000, help='tokens per dashboard page')
+    parser.add_argument('--links', type=int, default=10000)
+    parser.add_argument('--clicks', type=int, default=100000)
+    parser.add_argument('--rounds', type=int, default=5)
+    parser.add_argument('--database-url', default=None)
+    args = parser.parse_args()
+
+    app = load_app(args.database_url)
+    tokens = seed(app, links=args.links, clicks=args.clicks)[:args.tokens]
+    client = app.app.test_client()
+
+    single, batch = [], []
+    for _ in range(args.rounds):
+        start = time.perf_counter()
+        for token in tokens:
+            assert client.get(f'/api/stats/{token}').status_code == 200
+        single.append(time.perf_counter() - start)
+
+        start = time.perf_counter()
+        response = client.post('/api/stats/batch', json={'tokens': tokens})
+        batch.append(time.perf_counter() - start)
+        assert len(response.get_json()['stats']) == len(tokens)
+
+    single_ms = statistics.median(single) * 1000
+    batch_ms = statistics.median(batch) * 1000
+    print(f"{'GET /api/stats/<token> x ' + str(len(tokens)):<32} {single_ms:>9.1f} ms")
+    print(f"{'POST /api/stats/batch':<32} {batch_ms:>9.1f} ms")
+    print(f"speedup: {single_ms / batch_ms:.1f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+"""
+Benchmark: link insert throughput and token index size per token generator
+
+Inserts --links links in batches (as /api/create/batch does) with each
+generator and reports overall and final-stretch insert rate, plus the size
+of the unique index on smart_links.token. Random tokens land at random
+pages of the index; time-ordered tokens append at its right edge.
+
+Usage:
+    python -m benchmarks.bench_tokens [--links 10000000] [--generators random,time]
+    python -m benchmarks.bench_tokens --database-url postgresql://localhost/bench  # scratch database, emptied per run
+"""
+
+import argparse
+import tempfile
+import time
+from datetime import datetime
+
+from sqlalchemy import text
+
+from benchmarks.harness import load_app
+
+
+def index_bytes(app_module):
+    with app_module.app.app_context():
+        connection = app_module.db.session.connection()
+        if connection.dialect.name == 'postgresql':
+            return connection.execute(text("SELECT pg_relation_size('ix_smart_links_token')")).scalar()
+        return connection.execute(text(
+            "SELECT SUM(pgsize) FROM dbstat WHERE name = 'ix_smart_links_token'"
+        )).scalar()
+
+
+def run(generator, args):
+    database_url = args.database_url or f"sqlite:///{tempfile.mkdtemp(prefix='tokens-')}/links.db"
+    app_module = load_app(database_url, TOKEN_GENERATOR=generator)
+    generate_token = app_module.generate_token
+
+    with app_module.app.app_context():
+        if app_module.db.engine.dialect.name == 'postgresql':
+            app_module.db.session.execute(text(
+                'TRUNCATE smart_links, link_clicks, click_rollups, link_counter_shards RESTART IDENTITY'
+            ))
+            app_module.db.session.commit()
+
+        now = datetime.utcnow()
+        tail_start = args.links - args.links // 10
+        tail_started = None
+        started = time.perf_counter()
+        for offset in range(0, args.links, args.batch_size):
+            if offset >= tail_start and tail_started is None:
+                tail_started = time.perf_counter()
+            app_module.insert_links([
+                {'token': generate_token(), 'fallback_url': 'https://example.com/', 'created_at': now}
+                for _ in range(min(args.batch_size, args.links - offset))
+            ])
+        finished = time.perf_counter()
+
+    return {
+        'rate': args.links / (finished - started),
+        'tail_rate': (args.links - tail_start) / (finished - tail_started),
+        'index_mb': index_bytes(app_module) / 1e6,
+        'token_length': len(generate_token()),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--links', type=int, default=1000000)
+    parser.add_argument('--batch-size', type=int, default=1000)
+    parser.add_argument('--generators', default='random,time')
+    parser.add_argument('--database-url', default=None, help='default: a fresh temp SQLite file per run')
+    args = parser.parse_args()
+
+    print(f"{'generator':>9} {'chars':>6} {'links/s':>9} {'last 10%/s':>11} {'index MB':>9}")
+    for generator in args.generators.split(','):
+        result = run(generator, args)
+        print(f"{generator:>9} {result['token_length']:>6} {result['rate']:>9.0f} "
+              f"{result['tail_rate']:>11.0f} {result['index_mb']:>9.1f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,202 @@
+#!/usr/bin/env python3
+"""
+Shared helpers for benchmarks: a throwaway app instance on a temp SQLite file
+"""
+
+import importlib
+import os
+import sys
+import tempfile
+
+
+def load_app(database_url=None, **env):
+    """
+    Import app.py against its own database and return the module
+
+    Environment overrides (e.g. CLICK_WRITE_BEHIND='0') are applied before
+    import because app.py reads its configuration at import time. Without a
+    database_url a fresh SQLite file in a temp directory is used. Pending
+    migrations are applied, as `python migrate.py` would on deploy.
+    """
+    if database_url is None:
+        workdir = tempfile.mkdtemp(prefix='linkbench-')
+        database_url = f"sqlite:///{os.path.join(workdir, 'links.db')}"
+    os.environ['DATABASE_URL'] = database_url
+    # Load generators send every request from one IP, so the per-IP click limit is off
+    env.setdefault('CLICK_RATE_LIMIT', '0')
+    os.environ.update({key: str(value) for key, value in env.items()})
+
+    if 'app' in sys.modules:
+        del sys.modules['app']
+    app_module = importlib.import_module('app')
+
+    import migrations
+    with app_module.app.app_context():
+        migrations.upgrade(app_module.db.engine, log=lambda message: None)
+    return app_module
+
+
+def percentile(sorted_values, pct):
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return 0.0
+    rank = max(0, min(len(sorted_values) - 1, int(round(pct / 100 * len(sorted_values))) - 1))
+    return sorted_values[rank]
+
+
+def serve_app(flask_app, host='127.0.0.1', port=0):
+    """
+    Serve a Flask app from a background thread with werkzeug's threaded server
+
+    Returns (base_url, stop) where stop() shuts the server down.
+    """
+    import threading
+    from werkzeug.serving import make_server, WSGIRequestHandler
+
+    class QuietHandler(WSGIRequestHandler):
+        def log_request(self, *args, **kwargs):
+            pass
+
+    server = make_server(host, port, flask_app, threaded=True, request_handler=QuietHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+
+    def stop():
+        server.shutdown()
+        thread.join()
+
+    return f'http://{host}:{server.server_port}', stop
+
+
+def http_request(base_url, method, path, body=None, headers=None, timeout=30):
+    """Send one request on a fresh connection and return (status, body bytes)"""
+    import http.client
+    from urllib.parse import urlsplit
+
+    parts = urlsplit(base_url)
+    connection = http.client.HTTPConnection(parts.hostname, parts.port, timeout=timeout)
+    try:
+        connection.request(method, path, body=body, headers=headers or {})
+        response = connection.getresponse()
+        return response.status, response.read()
+    finally:
+        connection.close()
+
+
+def drive(make_request, requests, concurrency, warmup=0):
+    """
+    Run make_request(i) `requests` times from `concurrency` threads
+
+    make_request returns True on success. Returns a summary dict with
+    throughput and latency percentiles in milliseconds.
+    """
+    import threading
+    import time
+
+    for i in range(warmup):
+        make_request(i)
+
+    latencies = []
+    errors = 0
+    lock = threading.Lock()
+    counter = iter(range(requests))
+
+    def worker():
+        nonlocal errors
+        local_latencies = []
+        local_errors = 0
+        while True:
+            with lock:
+                i = next(counter, None)
+            if i is None:
+                break
+            start = time.perf_counter()
+            try:
+                ok = make_request(i)
+            except Exception:
+                ok = False
+            local_latencies.append(time.perf_counter() - start)
+            if not ok:
+                local_errors += 1
+        with lock:
+            latencies.extend(local_latencies)
+            errors += local_errors
+
+    threads = [threading.Thread(target=worker) for _ in range(concurrency)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    return {
+        'requests': requests,
+        'errors': errors,
+        'concurrency': concurrency,
+        'seconds': round(elapsed, 3),
+        'rps': round(requests / elapsed, 1) if elapsed else 0.0,
+        'mean_ms': round(sum(latencies) / len(latencies) * 1000, 3) if latencies else 0.0,
+        'p50_ms': round(percentile(latencies, 50) * 1000, 3),
+        'p95_ms': round(percentile(latencies, 95) * 1000, 3),
+        'p99_ms': round(percentile(latencies, 99) * 1000, 3),
+    }
+
+
+def seed(app_module, links=1000, clicks=100000, seed_value=42):
+    """
+    Fill the app's database with `links` links and `clicks` clicks
+
+    Clicks go through write_clicks so counters and rollups match what the
+    live write path produces. Returns the list of tokens.
+    """
+    import random
+    from datetime import datetime, timedelta
+
+    from benchmarks.ua_corpus import sample_user_agents
+
+    rng = random.Random(seed_value)
+    flask_app = app_module.app
+
+    with flask_app.app_context():
+        rows = []
+        for i in range(links):
+            rows.append({
+                'token': app_module.generate_token(),
+                'name': f'Bench link {i}',
+                'android_url': f'https://play.google.com/store/apps/details?id=com.example{i}',
+                'ios_url': f'https://apps.apple.com/app/id{100000 + i}',
+                'fallback_url': f'https://example.com/{i}',
+                'created_at': datetime.utcnow(),
+            })
+            if len(rows) == 5000:
+                app_module.insert_links(rows)
+                rows = []
+        if rows:
+            app_module.insert_links(rows)
+
+        link_ids = [link_id for (link_id,) in app_module.db.session.query(app_module.SmartLink.id)]
+        tokens = [token for (token,) in app_module.db.session.query(app_module.SmartLink.token)]
+
+    user_agents = sample_user_agents(min(clicks, 20000) or 1, seed=seed_value)
+    now = datetime.utcnow()
+    batch = []
+    for i in range(clicks):
+        user_agent = user_agents[i % len(user_agents)]
+        device_type = app_module.device_classifier.classify(user_agent)
+        batch.append(app_module.ClickEvent(
+            link_id=rng.choice(link_ids),
+            clicked_at=now - timedelta(seconds=rng.randrange(90 * 86400)),
+            device_type=device_type,
+            user_agent=user_agent,
+            ip_address=f'10.{rng.randrange(256)}.{rng.randrange(256)}.{rng.randrange(256)}',
+            redirected_to='https://example.com/',
+        ))
+        if len(batch) == 5000:
+            app_module.write_clicks(batch)
+            batch = []
+    if batch:
+        app_module.write_clicks(batch)
+
+    return tokens
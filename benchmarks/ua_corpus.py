@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+"""
+Realistic User-Agent corpus for benchmarks
+Weights roughly follow the share of each browser/OS family in real traffic
+"""
+
+import random
+
+
+USER_AGENTS = [
+    # Android
+    (30, 'Mozilla/5.0 (Linux; Android 10; K) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/124.0.0.0 Mobile Safari/537.36'),
+    (8, 'Mozilla/5.0 (Linux; Android 13; SM-S911B) AppleWebKit/537.36 (KHTML, like Gecko) SamsungBrowser/24.0 Chrome/117.0.0.0 Mobile Safari/537.36'),
+    (4, 'Mozilla/5.0 (Linux; Android 14; Pixel 8) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/124.0.6367.82 Mobile Safari/537.36'),
+    (3, 'Mozilla/5.0 (Linux; U; Android 12; en-US; Redmi Note 11) AppleWebKit/537.36 (KHTML, like Gecko) Version/4.0 Chrome/100.0.4896.58 UCBrowser/13.4.0.1306 Mobile Safari/537.36'),
+    (2, 'Dalvik/2.1.0 (Linux; U; Android 11; M2101K6G Build/RKQ1.200826.002)'),
+    # iOS
+    (18, 'Mozilla/5.0 (iPhone; CPU iPhone OS 17_4 like Mac OS X) AppleWebKit/605.1.15 (KHTML, like Gecko) Version/17.4 Mobile/15E148 Safari/604.1'),
+    (5, 'Mozilla/5.0 (iPhone; CPU iPhone OS 16_6 like Mac OS X) AppleWebKit/605.1.15 (KHTML, like Gecko) CriOS/124.0.6367.88 Mobile/15E148 Safari/604.1'),
+    (3, 'Mozilla/5.0 (iPad; CPU OS 17_4 like Mac OS X) AppleWebKit/605.1.15 (KHTML, like Gecko) Version/17.4 Mobile/15E148 Safari/604.1'),
+    (2, 'Mozilla/5.0 (iPhone; CPU iPhone OS 17_3 like Mac OS X) AppleWebKit/605.1.15 (KHTML, like Gecko) Mobile/15E148 [FBAN/FBIOS;FBAV/455.0.0.38.108]'),
+    # Windows
+    (12, 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/124.0.0.0 Safari/537.36'),
+    (3, 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/124.0.0.0 Safari/537.36 Edg/124.0.0.0'),
+    (2, 'Mozilla/5.0 (Windows NT 10.0; Win64; x64; rv:125.0) Gecko/20100101 Firefox/125.0'),
+    (1, 'Microsoft Office/16.0 (Windows NT 10.0; Microsoft Outlook 16.0.17531; Pro)'),
+    # macOS
+    (4, 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/124.0.0.0 Safari/537.36'),
+    (2, 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/605.1.15 (KHTML, like Gecko) Version/17.4.1 Safari/605.1.15'),
+    (1, 'Mozilla/5.0 (Macintosh; Intel Mac OS X 14.4; rv:125.0) Gecko/20100101 Firefox/125.0'),
+    # Linux
+    (1, 'Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/124.0.0.0 Safari/537.36'),
+    (1, 'Mozilla/5.0 (X11; Ubuntu; Linux x86_64; rv:125.0) Gecko/20100101 Firefox/125.0'),
+    # Crawlers, prefetchers and tools
+    (2, 'Slackbot-LinkExpanding 1.0 (+https://api.slack.com/robots)'),
+    (2, 'WhatsApp/2.23.20.0 A'),
+    (1, 'facebookexternalhit/1.1 (+http://www.facebook.com/externalhit_uatext.php)'),
+    (1, 'Mozilla/5.0 (compatible; Googlebot/2.1; +http://www.google.com/bot.html)'),
+    (1, 'Twitterbot/1.0'),
+    (1, 'curl/8.4.0'),
+    (1, 'python-requests/2.31.0'),
+    (1, ''),
+]
+
+
+def sample_user_agents(n, seed=42, variants=2000):
+    """
+    Return n User-Agent strings drawn from the weighted corpus
+
+    Each base string is expanded into version variants so the stream holds
+    roughly `variants` distinct strings, like real traffic does.
+    """
+    rng = random.Random(seed)
+    weights = [w for w, _ in USER_AGENTS]
+    bases = [ua for _, ua in USER_AGENTS]
+    per_base = max(1, variants // len(bases))
+    picks = rng.choices(range(len(bases)), weights=weights, k=n)
+    return [
+        f'{bases[i]} build/{rng.randrange(per_base)}' if bases[i] else ''
+        for i in picks
+    ]
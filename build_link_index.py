@@ -0,0 +1,56 @@
+#!/usr/bin/env python3
+"""
+Build: Write a memory-mapped snapshot of all active links
+Run periodically (e.g. from cron); workers pick up the new file automatically
+"""
+
+import argparse
+import os
+import time
+
+from app import app, db, SmartLink
+from link_index import write_index
+from sqlalchemy import select, func
+
+
+def build(path, chunk_size=10000):
+    """Stream active links in token order into a new index file at path"""
+    with app.app_context():
+        try:
+            key_width = db.session.query(func.max(func.length(SmartLink.token))).scalar() or 1
+
+            # The index is searched by byte order, so sort without locale collation
+            token_order = SmartLink.token
+            if db.engine.dialect.name == 'postgresql':
+                token_order = SmartLink.token.collate('C')
+
+            query = select(
+                SmartLink.token, SmartLink.id,
+                SmartLink.android_url, SmartLink.ios_url, SmartLink.windows_url,
+                SmartLink.macos_url, SmartLink.linux_url, SmartLink.fallback_url
+            ).where(SmartLink.is_active.is_(True)).order_by(token_order).execution_options(yield_per=chunk_size)
+
+            # Links edited after this moment are looked up in the database by workers
+            built_at = time.time()
+            started = time.perf_counter()
+            count = write_index(path, db.session.execute(query), key_width, built_at)
+            elapsed = time.perf_counter() - started
+
+            size = os.path.getsize(path)
+            print(f"✅ Wrote {count:,} links to {path} ({size / 1e6:.1f} MB) in {elapsed:.1f}s")
+
+        except Exception as e:
+            print(f"❌ Build failed: {e}")
+            raise
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Build the shared link index snapshot')
+    parser.add_argument('--output', default=os.environ.get('LINK_INDEX_PATH', 'links.idx'))
+    parser.add_argument('--chunk-size', type=int, default=10000, help='rows fetched per round-trip')
+    args = parser.parse_args()
+
+    print("=" * 60)
+    print("BUILD: Link Index")
+    print("=" * 60)
+    build(args.output, args.chunk_size)
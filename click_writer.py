@@ -0,0 +1,182 @@
+#!/usr/bin/env python3
+"""
+Click Writer
+Write-behind queue that batches click events off the redirect request path
+"""
+
+from collections import namedtuple
+import os
+import queue
+import threading
+import time
+
+
+ClickEvent = namedtuple('ClickEvent', [
+    'link_id', 'clicked_at', 'device_type', 'user_agent', 'ip_address', 'redirected_to', 'country'
+], defaults=(None,))
+
+OVERFLOW_POLICIES = ('drop_newest', 'drop_oldest', 'block')
+
+
+class ClickWriter:
+    """
+    Bounded in-process queue drained by a background flusher thread
+
+    flush_fn(events) is called with up to batch_size events at a time, either
+    when a batch fills up or flush_interval seconds after the first queued
+    event. When the queue is full the overflow policy decides what happens:
+
+        drop_newest - discard the incoming event
+        drop_oldest - discard the oldest queued event to make room
+        block       - wait up to block_timeout seconds, then discard
+
+    A batch whose flush_fn raises (database down, lock timeout) is retried
+    up to `retries` times, waiting retry_backoff seconds before the first
+    retry and twice as long before each next one; only then are its events
+    counted as failed. New events keep queueing meanwhile.
+
+    The flusher thread is started lazily on first submit so that it is
+    created inside each gunicorn worker rather than in a pre-fork master.
+    """
+
+    def __init__(self, flush_fn, max_queue=10000, batch_size=500, flush_interval=1.0,
+                 overflow='drop_newest', block_timeout=0.05, retries=3, retry_backoff=0.5):
+        if overflow not in OVERFLOW_POLICIES:
+            raise ValueError(f'overflow must be one of {OVERFLOW_POLICIES}, got {overflow!r}')
+
+        self.flush_fn = flush_fn
+        self.max_queue = max_queue
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.overflow = overflow
+        self.block_timeout = block_timeout
+        self.retries = retries
+        self.retry_backoff = retry_backoff
+
+        self.enqueued = 0
+        self.flushed = 0
+        self.dropped = 0
+        self.failed = 0
+        self.retried = 0
+        self.batches = 0
+
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._reset()
+
+    def _reset(self):
+        self._queue = queue.Queue(maxsize=self.max_queue)
+        self._stop = threading.Event()
+        self._thread = None
+        self._pid = os.getpid()
+
+    def _ensure_started(self):
+        if self._thread is not None and self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid != os.getpid():
+                # Forked after the thread was started: the queue and thread belong to the parent
+                self._reset()
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='click-writer', daemon=True)
+                self._thread.start()
+
+    def submit(self, event):
+        """Queue a click event; returns False if it was dropped"""
+        self._ensure_started()
+        try:
+            if self.overflow == 'block':
+                self._queue.put(event, timeout=self.block_timeout)
+            else:
+                self._queue.put_nowait(event)
+        except queue.Full:
+            if self.overflow != 'drop_oldest':
+                self.dropped += 1
+                return False
+            try:
+                self._queue.get_nowait()
+                self.dropped += 1
+            except queue.Empty:
+                pass
+            try:
+                self._queue.put_nowait(event)
+            except queue.Full:
+                self.dropped += 1
+                return False
+        self.enqueued += 1
+        return True
+
+    def _take_batch(self, wait, batch=None):
+        """Fill batch (default: a new one) up to batch_size events, waiting at most `wait` seconds"""
+        batch = [] if batch is None else batch
+        deadline = time.monotonic() + wait
+        while len(batch) < self.batch_size:
+            timeout = deadline - time.monotonic()
+            try:
+                if timeout <= 0:
+                    batch.append(self._queue.get_nowait())
+                else:
+                    batch.append(self._queue.get(timeout=timeout))
+            except queue.Empty:
+                break
+        return batch
+
+    def _write(self, batch):
+        if not batch:
+            return
+        delay = self.retry_backoff
+        for attempt in range(self.retries + 1):
+            try:
+                self.flush_fn(batch)
+                self.flushed += len(batch)
+                self.batches += 1
+                return
+            except Exception as e:
+                if attempt == self.retries:
+                    print(f"Error flushing {len(batch)} clicks, giving up after {attempt + 1} attempts: {e}")
+                    self.failed += len(batch)
+                    return
+                print(f"Error flushing {len(batch)} clicks, retrying in {delay:.1f}s: {e}")
+                self.retried += len(batch)
+                time.sleep(delay)
+                delay *= 2
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                first = self._queue.get(timeout=self.flush_interval)
+            except queue.Empty:
+                continue
+            batch = self._take_batch(self.flush_interval, [first])
+            with self._flush_lock:
+                self._write(batch)
+
+    def flush(self):
+        """Synchronously write everything currently queued"""
+        with self._flush_lock:
+            while True:
+                batch = self._take_batch(0)
+                if not batch:
+                    break
+                self._write(batch)
+
+    def close(self, timeout=5.0):
+        """Stop the flusher thread and drain the queue (graceful shutdown)"""
+        if self._pid != os.getpid():
+            return
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+        self.flush()
+
+    def stats(self):
+        return {
+            'queue_depth': self._queue.qsize(),
+            'max_queue': self.max_queue,
+            'enqueued': self.enqueued,
+            'flushed': self.flushed,
+            'dropped': self.dropped,
+            'failed': self.failed,
+            'retried': self.retried,
+            'batches': self.batches,
+        }
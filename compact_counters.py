@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+"""
+Compaction: Fold sharded click counters back into smart_links
+Run periodically (e.g. from cron, or with --interval as a sidecar process)
+"""
+
+import argparse
+import time
+
+from app import app, db, SmartLink, LinkCounterShard
+from counters import greatest
+from sqlalchemy import select, update, delete
+
+
+def compact(batch_size=1000):
+    """
+    Move shard totals into smart_links.click_count, batch_size links per transaction
+
+    Each shard is decremented by exactly the amount read rather than reset,
+    so clicks recorded while compaction runs are never lost.
+    Returns the number of clicks folded.
+    """
+    folded = 0
+    with app.app_context():
+        dialect = db.engine.dialect.name
+        after = 0
+        try:
+            while True:
+                link_ids = db.session.execute(
+                    select(LinkCounterShard.link_id)
+                    .where(LinkCounterShard.link_id > after, LinkCounterShard.clicks > 0)
+                    .distinct()
+                    .order_by(LinkCounterShard.link_id)
+                    .limit(batch_size)
+                ).scalars().all()
+                if not link_ids:
+                    break
+
+                # Same (link_id, shard) lock order as the click writer
+                shards = db.session.execute(
+                    select(LinkCounterShard.link_id, LinkCounterShard.shard,
+                           LinkCounterShard.clicks, LinkCounterShard.last_clicked_at)
+                    .where(LinkCounterShard.link_id.in_(link_ids), LinkCounterShard.clicks > 0)
+                    .order_by(LinkCounterShard.link_id, LinkCounterShard.shard)
+                    .with_for_update()
+                ).all()
+
+                totals = {}
+                for link_id, shard, clicks, last in shards:
+                    db.session.execute(
+                        update(LinkCounterShard)
+                        .where(LinkCounterShard.link_id == link_id, LinkCounterShard.shard == shard)
+                        .values(clicks=LinkCounterShard.clicks - clicks)
+                    )
+                    count, latest = totals.get(link_id, (0, last))
+                    if latest is None or (last is not None and last > latest):
+                        latest = last
+                    totals[link_id] = (count + clicks, latest)
+
+                for link_id, (count, last) in totals.items():
+                    values = {'click_count': SmartLink.click_count + count}
+                    if last is not None:
+                        values['last_clicked_at'] = greatest(dialect, SmartLink.last_clicked_at, last)
+                    db.session.execute(update(SmartLink).where(SmartLink.id == link_id).values(values))
+                    folded += count
+
+                db.session.execute(
+                    delete(LinkCounterShard)
+                    .where(LinkCounterShard.link_id.in_(link_ids), LinkCounterShard.clicks == 0)
+                )
+                db.session.commit()
+                after = link_ids[-1]
+
+        except Exception as e:
+            print(f"❌ Compaction failed: {e}")
+            db.session.rollback()
+            raise
+
+    return folded
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Fold sharded click counters into smart_links')
+    parser.add_argument('--batch-size', type=int, default=1000, help='links per transaction')
+    parser.add_argument('--interval', type=float, default=None, help='keep running, compacting every N seconds')
+    args = parser.parse_args()
+
+    while True:
+        started = time.perf_counter()
+        clicks = compact(args.batch_size)
+        print(f"✅ Folded {clicks:,} clicks in {time.perf_counter() - started:.2f}s")
+        if args.interval is None:
+            break
+        time.sleep(args.interval)
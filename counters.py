@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+"""
+Counters
+Portable "insert or add to" upserts for pre-aggregated counter tables
+"""
+
+from sqlalchemy import insert, update, and_, case, func
+
+
+# Rows per INSERT statement, keeps bound parameters under SQLite's limit
+CHUNK_SIZE = 1000
+
+
+def greatest(dialect, current, new):
+    """SQL for the larger of two values, treating a NULL current value as absent"""
+    if dialect == 'postgresql':
+        return func.greatest(current, new)
+    if dialect == 'sqlite':
+        return func.max(func.coalesce(current, new), new)
+    return case((current > new, current), else_=new)
+
+
+def increment_counters(session, model, key_columns, rows, count_column='clicks', max_columns=()):
+    """
+    Add each row's count onto the matching counter row, creating it if missing
+
+    rows is a list of dicts holding the key columns plus count_column (and
+    any max_columns, which keep the larger of the stored and new value).
+    Keys must be unique within rows (aggregate first). Uses a single
+    INSERT ... ON CONFLICT DO UPDATE on SQLite and PostgreSQL, and falls back
+    to UPDATE-then-INSERT per row elsewhere.
+    """
+    if not rows:
+        return
+
+    dialect = session.get_bind().dialect.name
+    count = getattr(model, count_column)
+
+    if dialect in ('sqlite', 'postgresql'):
+        if dialect == 'sqlite':
+            from sqlalchemy.dialects.sqlite import insert as dialect_insert
+        else:
+            from sqlalchemy.dialects.postgresql import insert as dialect_insert
+        for start in range(0, len(rows), CHUNK_SIZE):
+            stmt = dialect_insert(model).values(rows[start:start + CHUNK_SIZE])
+            assignments = {count_column: count + getattr(stmt.excluded, count_column)}
+            for column in max_columns:
+                assignments[column] = greatest(dialect, getattr(model, column), getattr(stmt.excluded, column))
+            stmt = stmt.on_conflict_do_update(index_elements=key_columns, set_=assignments)
+            session.execute(stmt)
+        return
+
+    for row in rows:
+        match = and_(*(getattr(model, key) == row[key] for key in key_columns))
+        assignments = {count_column: count + row[count_column]}
+        for column in max_columns:
+            assignments[column] = greatest(dialect, getattr(model, column), row[column])
+        result = session.execute(update(model).where(match).values(assignments))
+        if result.rowcount == 0:
+            session.execute(insert(model).values(row))
+
+
+def insert_missing(session, model, key_columns, rows):
+    """
+    Insert rows whose key is not already present, leaving existing rows untouched
+
+    Uses INSERT ... ON CONFLICT DO NOTHING on SQLite and PostgreSQL, and
+    falls back to SELECT-then-INSERT elsewhere.
+    """
+    if not rows:
+        return
+
+    dialect = session.get_bind().dialect.name
+
+    if dialect in ('sqlite', 'postgresql'):
+        if dialect == 'sqlite':
+            from sqlalchemy.dialects.sqlite import insert as dialect_insert
+        else:
+            from sqlalchemy.dialects.postgresql import insert as dialect_insert
+        for start in range(0, len(rows), CHUNK_SIZE):
+            stmt = dialect_insert(model).values(rows[start:start + CHUNK_SIZE])
+            session.execute(stmt.on_conflict_do_nothing(index_elements=key_columns))
+        return
+
+    for row in rows:
+        match = and_(*(getattr(model, key) == row[key] for key in key_columns))
+        if session.query(model).filter(match).first() is None:
+            session.execute(insert(model).values(row))
@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+"""
+Device Classifier
+Maps User-Agent strings to device types for smart redirects, and bots to
+a bot category (DeviceClassifier(BOT_RULES, default='human'))
+"""
+
+from functools import lru_cache
+import re
+
+
+# (device_type, substrings) in priority order: when a User-Agent matches
+# several rules the earliest one wins, e.g. Android UAs also mention Linux
+# and iOS UAs also mention "Mac OS".
+DEFAULT_RULES = [
+    ('android', ['android']),
+    ('ios', ['iphone', 'ipad', 'ipod']),
+    ('windows', ['windows', 'win32', 'win64']),
+    ('macos', ['macintosh', 'mac os', 'darwin']),
+    ('linux', ['linux']),
+]
+
+# (category, substrings) for automated clients. Link-preview fetchers and
+# messaging-app prefetchers come first: they are the bulk of bot hits on
+# shared links. Names are matched as written in the User-Agent, so generic
+# words like "bot" alone are avoided (phone models such as CUBOT contain them).
+BOT_RULES = [
+    ('preview', [
+        'facebookexternalhit', 'facebot', 'slackbot', 'slack-imgproxy', 'whatsapp', 'twitterbot',
+        'discordbot', 'telegrambot', 'linkedinbot', 'skypeuripreview', 'pinterestbot', 'redditbot',
+        'embedly', 'iframely', 'snapchat/preview', 'applebot', 'vkshare',
+    ]),
+    ('crawler', [
+        'googlebot', 'bingbot', 'yandexbot', 'baiduspider', 'duckduckbot', 'slurp', 'ahrefsbot',
+        'semrushbot', 'petalbot', 'bytespider', 'gptbot', 'ccbot', 'crawler', 'spider',
+        'bot/', 'bot;', '+http',
+    ]),
+    ('scanner', [
+        'proofpoint', 'mimecast', 'barracuda', 'safelinks', 'urlscan', 'virustotal', 'zgrab',
+        'masscan', 'nmap', 'nessus', 'nuclei', 'headlesschrome', 'phantomjs',
+        'curl/', 'wget/', 'python-requests', 'python-urllib', 'aiohttp', 'go-http-client',
+        'java/', 'libwww-perl', 'httpclient',
+    ]),
+]
+
+
+# Rule sets with more substrings than this are prefiltered with one regex scan;
+# below it, plain substring tests in priority order are faster
+PREFILTER_MIN_PATTERNS = 16
+
+
+def _trie_regex(words):
+    """Build a regex matching any of `words`, factored on shared prefixes"""
+    trie = {}
+    for word in words:
+        node = trie
+        for char in word:
+            node = node.setdefault(char, {})
+        node[''] = {}
+
+    def build(node):
+        alternatives = [re.escape(char) + build(child) for char, child in sorted(node.items()) if char]
+        if not alternatives:
+            return ''
+        body = alternatives[0] if len(alternatives) == 1 else '(?:' + '|'.join(alternatives) + ')'
+        if '' in node:
+            body = f'(?:{body})?'
+        return body
+
+    return '|'.join(re.escape(char) + build(child) for char, child in sorted(trie.items()))
+
+
+class DeviceClassifier:
+    """
+    Memoized User-Agent classifier
+
+    Rules are checked in priority order with plain substring tests, stopping
+    at the first match. Large rule sets (BOT_RULES) are first searched with
+    one prefix-factored (trie shaped) regex of all their substrings: a
+    User-Agent matching none costs a single scan, and otherwise only the
+    rules up to the one found are tested. Results are memoized in a bounded
+    LRU cache because real traffic only carries a few thousand distinct
+    User-Agent strings.
+
+    New rules (tablets, bots, smart TVs, ...) are added with add_rule();
+    a lower priority index wins over later rules.
+    """
+
+    def __init__(self, rules=None, default='other', cache_size=4096):
+        self.rules = [(device, list(patterns)) for device, patterns in (rules or DEFAULT_RULES)]
+        self.default = default
+        self.cache_size = cache_size
+        self._compile()
+
+    def _compile(self):
+        self._rule_for = {}
+        for index, (device, patterns) in enumerate(self.rules):
+            for pattern in patterns:
+                self._rule_for.setdefault(pattern.lower(), index)
+        self._search = None
+        if len(self._rule_for) > PREFILTER_MIN_PATTERNS:
+            self._search = re.compile(_trie_regex(self._rule_for)).search
+        self._ordered = [(device, tuple(pattern.lower() for pattern in patterns))
+                         for device, patterns in self.rules]
+        # classify(user_agent) -> device type, memoized; rebuilt so old results are dropped
+        self.classify = lru_cache(maxsize=self.cache_size)(self._classify)
+
+    def add_rule(self, device_type, patterns, priority=None):
+        """Add a rule; priority is its index in the rule list (default: lowest)"""
+        rule = (device_type, list(patterns))
+        if priority is None:
+            self.rules.append(rule)
+        else:
+            self.rules.insert(priority, rule)
+        self._compile()
+
+    def _classify(self, user_agent):
+        user_agent = user_agent.lower() if user_agent else ''
+        rules = self._ordered
+        if self._search is not None:
+            match = self._search(user_agent)
+            if match is None:
+                return self.default
+            rules = rules[:self._rule_for[match.group()] + 1]
+        for device, patterns in rules:
+            for pattern in patterns:
+                if pattern in user_agent:
+                    return device
+        return self.default
+
+    def cache_info(self):
+        return self.classify.cache_info()
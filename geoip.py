@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+"""
+GeoIP
+Offline IP -> country resolution from a local range file
+
+The file is CSV with one range per line, IPv4 or IPv6, as distributed by
+DB-IP ("IP to Country Lite") and similar datasets:
+
+    start_ip,end_ip,country_code
+    1.0.0.0,1.0.0.255,AU
+    2001:200::,2001:200:ffff:ffff:ffff:ffff:ffff:ffff,JP
+
+Ranges are loaded into sorted arrays of integers (range starts and ends plus
+a small country id), merged where neighbours share a country, and looked up
+by binary search. IPv6 ranges are keyed on their upper 64 bits: addresses
+are allocated to countries in /64 or larger blocks, so the lower half is
+never needed and both address families fit in flat uint arrays.
+"""
+
+from array import array
+from bisect import bisect_right
+import csv
+from functools import lru_cache
+import os
+import socket
+
+
+class _RangeTable:
+    """Disjoint [start, end] integer ranges with a country id each"""
+
+    def __init__(self, typecode):
+        self.starts = array(typecode)
+        self.ends = array(typecode)
+        self.countries = array('H')
+
+    def build(self, ranges):
+        for start, end, country in sorted(ranges):
+            if self.starts and start <= self.ends[-1] + 1 and country == self.countries[-1]:
+                # Adjacent or overlapping with the same country: extend the previous range
+                self.ends[-1] = max(self.ends[-1], end)
+                continue
+            if self.starts and start <= self.ends[-1]:
+                start = self.ends[-1] + 1  # overlapping: the earlier range wins
+                if start > end:
+                    continue
+            self.starts.append(start)
+            self.ends.append(end)
+            self.countries.append(country)
+
+    def find(self, value):
+        position = bisect_right(self.starts, value) - 1
+        if position >= 0 and value <= self.ends[position]:
+            return self.countries[position]
+        return None
+
+    def nbytes(self):
+        return sum(len(a) * a.itemsize for a in (self.starts, self.ends, self.countries))
+
+
+class GeoIP:
+    """
+    Country lookup for IPv4 and IPv6 addresses
+
+    lookup(ip) returns an ISO country code or None. Results are memoized in
+    an LRU of cache_size addresses, since clicks come from a much smaller
+    set of addresses than the table covers.
+    """
+
+    def __init__(self, path, cache_size=65536):
+        self.path = path
+        self.country_codes = []
+        self.v4 = _RangeTable('I')
+        self.v6 = _RangeTable('Q')
+        self._load(path)
+        self.lookup = lru_cache(maxsize=cache_size)(self._lookup)
+
+    @classmethod
+    def open_if_exists(cls, path, cache_size=65536):
+        """Return a GeoIP for path, or None if no path is configured"""
+        if not path or not os.path.exists(path):
+            return None
+        return cls(path, cache_size)
+
+    def _country_id(self, code, ids):
+        country = ids.get(code)
+        if country is None:
+            country = ids[code] = len(self.country_codes)
+            self.country_codes.append(code)
+        return country
+
+    def _load(self, path):
+        ids = {}
+        v4, v6 = [], []
+        with open(path, newline='') as f:
+            for row in csv.reader(f):
+                if len(row) < 3 or not row[2] or row[0].startswith('#'):
+                    continue
+                start_ip, end_ip, code = row[0].strip(), row[1].strip(), row[2].strip().upper()
+                try:
+                    if ':' in start_ip:
+                        v6.append((_v6_key(start_ip), _v6_key(end_ip), self._country_id(code, ids)))
+                    else:
+                        v4.append((_v4_key(start_ip), _v4_key(end_ip), self._country_id(code, ids)))
+                except OSError:
+                    continue  # header row or malformed address
+        self.v4.build(v4)
+        self.v6.build(v6)
+
+    def _lookup(self, ip):
+        if not ip:
+            return None
+        try:
+            if ':' in ip:
+                if ip.startswith('::ffff:') and '.' in ip:
+                    country = self.v4.find(_v4_key(ip[7:]))
+                else:
+                    country = self.v6.find(_v6_key(ip))
+            else:
+                country = self.v4.find(_v4_key(ip))
+        except OSError:
+            return None
+        return None if country is None else self.country_codes[country]
+
+    def stats(self):
+        return {
+            'ipv4_ranges': len(self.v4.starts),
+            'ipv6_ranges': len(self.v6.starts),
+            'countries': len(self.country_codes),
+            'bytes': self.v4.nbytes() + self.v6.nbytes(),
+            'cache': self.lookup.cache_info()._asdict(),
+        }
+
+
+def _v4_key(ip):
+    return int.from_bytes(socket.inet_pton(socket.AF_INET, ip), 'big')
+
+
+def _v6_key(ip):
+    return int.from_bytes(socket.inet_pton(socket.AF_INET6, ip)[:8], 'big')
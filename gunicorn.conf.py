@@ -0,0 +1,59 @@
+"""
+Gunicorn configuration
+Picked up automatically by `gunicorn app:app` from the working directory
+"""
+
+import glob
+import os
+import tempfile
+
+
+def on_starting(server):
+    """Give this master's workers a clean shared directory for metrics snapshots"""
+    directory = os.environ.get('METRICS_DIR')
+    if directory:
+        for path in glob.glob(os.path.join(directory, '*.json')):
+            os.remove(path)
+    else:
+        os.environ['METRICS_DIR'] = tempfile.mkdtemp(prefix='link-metrics-')
+
+
+# Token worker ids per host: TOKEN_WORKER_ID_BASE + slot, slot < TOKEN_WORKER_ID_SLOTS
+TOKEN_WORKER_ID_SLOTS = int(os.environ.get('TOKEN_WORKER_ID_SLOTS', 64))
+
+
+def pre_fork(server, worker):
+    """
+    Reserve the lowest token worker id slot not held by a live worker
+
+    Slots are freed in child_exit, so respawned workers reuse them and ids
+    stay within [TOKEN_WORKER_ID_BASE, TOKEN_WORKER_ID_BASE + TOKEN_WORKER_ID_SLOTS).
+    Give each host a base TOKEN_WORKER_ID_SLOTS apart when several hosts
+    create links.
+    """
+    base = int(os.environ.get('TOKEN_WORKER_ID_BASE', 0))
+    taken = getattr(server, 'token_slots', set())
+    server.token_slots = taken
+    slot = next((slot for slot in range(TOKEN_WORKER_ID_SLOTS) if slot not in taken), None)
+    if slot is None or base + slot > 1023:
+        raise RuntimeError(f'no free token worker id in {base}..{min(base + TOKEN_WORKER_ID_SLOTS, 1024) - 1}')
+    taken.add(slot)
+    worker.token_slot = slot
+
+
+def post_fork(server, worker):
+    """Give each worker its own id for time-ordered tokens"""
+    base = int(os.environ.get('TOKEN_WORKER_ID_BASE', 0))
+    os.environ['TOKEN_WORKER_ID'] = str(base + worker.token_slot)
+
+
+def child_exit(server, worker):
+    """Release the exited worker's token id slot (runs in the master)"""
+    server.token_slots.discard(getattr(worker, 'token_slot', None))
+
+
+def worker_exit(server, worker):
+    """Flush queued click events and final metrics before a worker process exits"""
+    from app import click_writer, metrics
+    click_writer.close()
+    metrics.write_snapshot()
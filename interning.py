@@ -0,0 +1,62 @@
+#!/usr/bin/env python3
+"""
+Interning
+Content-addressed interning of repeated strings for normalized click storage
+
+A string's id is a 64-bit hash of it, so any worker can compute the id
+without asking the database; the string itself is stored once in a lookup
+table (user_agents for User-Agents, destinations for redirect URLs). Real
+traffic repeats a few thousand User-Agents and each link's two or three
+URLs, so after warm-up every id is already known to be stored and a batch of
+clicks needs no extra statement at all. Because a click keeps the id of the
+exact URL it was sent to, its destination survives later edits of the link.
+"""
+
+from functools import lru_cache
+import hashlib
+import threading
+
+from counters import insert_missing
+
+
+def string_id(value):
+    """Signed 64-bit id (fits a BIGINT column) for a string"""
+    digest = hashlib.blake2b(value.encode('utf-8', 'surrogatepass'), digest_size=8).digest()
+    return int.from_bytes(digest, 'big', signed=True)
+
+
+class StringInterner:
+    """
+    Maps strings to ids, inserting unseen strings into model's `column`
+
+    intern() adds missing rows inside the caller's transaction and returns
+    the ids it inserted; pass them to mark_stored() once that transaction
+    has committed, so a rolled back batch is retried next time. Up to
+    maxsize ids are remembered per process.
+    """
+
+    def __init__(self, model, column, maxsize=100000):
+        self.model = model
+        self.column = column
+        self.maxsize = maxsize
+        self.id_for = lru_cache(maxsize=maxsize)(string_id)
+        self._stored = set()
+        self._lock = threading.Lock()
+
+    def intern(self, session, values):
+        """Return ({value: id}, new_ids) for the distinct non-None strings given"""
+        ids = {value: self.id_for(value) for value in set(values) if value is not None}
+        with self._lock:
+            new = {value: value_id for value, value_id in ids.items() if value_id not in self._stored}
+        if new:
+            insert_missing(session, self.model, ['id'], [
+                {'id': value_id, self.column: value}
+                for value, value_id in sorted(new.items(), key=lambda item: item[1])
+            ])
+        return ids, set(new.values())
+
+    def mark_stored(self, ids):
+        with self._lock:
+            if len(self._stored) + len(ids) > self.maxsize:
+                self._stored.clear()
+            self._stored.update(ids)
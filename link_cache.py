@@ -0,0 +1,159 @@
+#!/usr/bin/env python3
+"""
+Link Cache
+Per-worker LRU cache for token -> link resolution on the redirect hot path
+"""
+
+from collections import OrderedDict, namedtuple
+import threading
+import time
+
+
+# Columns needed to serve a redirect, in the order they are selected
+LINK_RECORD_FIELDS = (
+    'id', 'is_active',
+    'android_url', 'ios_url', 'windows_url', 'macos_url', 'linux_url', 'fallback_url',
+)
+
+
+class LinkRecord(namedtuple('LinkRecord', LINK_RECORD_FIELDS)):
+    """Compact immutable view of a SmartLink row"""
+
+    __slots__ = ()
+
+    def destination(self, device_type):
+        """Return the URL for a device type, falling back to fallback_url"""
+        return getattr(self, f'{device_type}_url', None) or self.fallback_url
+
+
+# Sentinel stored for tokens known not to exist
+_MISSING = object()
+
+
+class TTLCache:
+    """
+    Thread-safe LRU cache with per-entry expiry and hit/miss/eviction counters
+
+    Entries are evicted least-recently-used first once maxsize is reached,
+    and treated as absent once their TTL has elapsed.
+    """
+
+    def __init__(self, maxsize=10000, ttl=60.0):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def get(self, key, default=None, count_miss=True):
+        """count_miss=False for a lookup whose miss is retried through get()"""
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                self.misses += count_miss
+                return default
+            value, expires_at = entry
+            if expires_at < time.monotonic():
+                del self._data[key]
+                self.expirations += 1
+                self.misses += count_miss
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key, value, ttl=None):
+        expires_at = time.monotonic() + (self.ttl if ttl is None else ttl)
+        with self._lock:
+            self._data[key] = (value, expires_at)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+    def stats(self):
+        return {
+            'size': len(self._data),
+            'maxsize': self.maxsize,
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'expirations': self.expirations,
+        }
+
+
+class LinkCache:
+    """
+    Token -> LinkRecord cache with negative caching
+
+    loader(token) is called on a miss and must return a LinkRecord or None.
+    Unknown tokens are cached for negative_ttl seconds so that scans of bad
+    tokens do not reach the database either. A load that overlaps an
+    invalidate() is returned but not cached, so an edit committed while the
+    old row was being read cannot be pinned for a full ttl.
+    """
+
+    def __init__(self, loader, maxsize=10000, ttl=60.0, negative_ttl=5.0):
+        self.loader = loader
+        self.negative_ttl = negative_ttl
+        self._cache = TTLCache(maxsize=maxsize, ttl=ttl)
+        self._invalidations = 0
+        self.negative_hits = 0
+
+    def get(self, token):
+        """Return the LinkRecord for token, or None if it does not exist"""
+        record = self._cache.get(token)
+        if record is _MISSING:
+            self.negative_hits += 1
+            return None
+        if record is not None:
+            return record
+
+        invalidations = self._invalidations
+        record = self.loader(token)
+        if invalidations != self._invalidations:
+            return record
+        if record is None:
+            self._cache.set(token, _MISSING, ttl=self.negative_ttl)
+        else:
+            self._cache.set(token, record)
+        return record
+
+    def peek(self, token):
+        """
+        Return (cached, record) without calling the loader
+
+        cached is False on a miss; a cached unknown token gives (True, None).
+        A miss is not counted, since the caller follows it with get().
+        """
+        record = self._cache.get(token, count_miss=False)
+        if record is _MISSING:
+            self.negative_hits += 1
+            return True, None
+        return record is not None, record
+
+    def invalidate(self, token):
+        self._invalidations += 1
+        self._cache.delete(token)
+
+    def clear(self):
+        self._cache.clear()
+
+    def stats(self):
+        stats = self._cache.stats()
+        stats['negative_hits'] = self.negative_hits
+        return stats
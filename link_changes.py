@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""
+Link Changes
+Cross-worker invalidation of cached links through a polled change log
+
+Every edit made through the API adds a row to link_changes in the same
+transaction. A background thread in each worker reads new rows every
+poll_interval seconds and hands each changed token to on_change, which
+evicts it from the worker's caches. Redirects themselves never query for
+changes, and an edit reaches every worker within about poll_interval
+seconds.
+
+Each poll re-reads the last `overlap` seconds of the log, because rows
+from concurrent transactions can commit out of order and hosts' clocks
+differ slightly. Rows already handled are skipped by id.
+"""
+
+import os
+import threading
+import time
+
+
+class LinkChangeFeed:
+    """
+    Poll fetch(since) for (id, token, changed_at epoch seconds) rows
+
+    on_change(token, changed_at) is called once per change row. The first
+    poll starts at initial_since (epoch seconds, default: now), so a new
+    worker only replays changes that matter to it. The thread is started
+    lazily by start() so it runs inside each gunicorn worker.
+    """
+
+    def __init__(self, fetch, on_change, poll_interval=1.0, overlap=5.0, initial_since=None,
+                 clock=time.time):
+        self.fetch = fetch
+        self.on_change = on_change
+        self.poll_interval = poll_interval
+        self.overlap = overlap
+        self.clock = clock
+        self._since = clock() if initial_since is None else initial_since
+        self._seen = {}  # change id -> changed_at, for rows inside the overlap window
+        self._lock = threading.Lock()
+        self._thread = None
+        self._pid = None
+        self.polls = 0
+        self.changes = 0
+        self.errors = 0
+
+    def start(self):
+        """Start the polling thread in this process (idempotent, fork-aware)"""
+        if self._thread is not None and self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._thread is None or self._pid != os.getpid():
+                self._pid = os.getpid()
+                self._thread = threading.Thread(target=self._run, name='link-changes', daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        while True:
+            try:
+                self.poll()
+            except Exception as e:
+                self.errors += 1
+                print(f"Error polling link changes: {e}")
+            time.sleep(self.poll_interval)
+
+    def poll(self):
+        """Apply changes logged since the previous poll; returns how many were new"""
+        started = self.clock()
+        rows = self.fetch(self._since - self.overlap)
+        new = 0
+        for change_id, token, changed_at in rows:
+            if change_id in self._seen:
+                continue
+            self._seen[change_id] = changed_at
+            self.on_change(token, changed_at)
+            new += 1
+        self._since = started
+        horizon = started - 2 * self.overlap
+        self._seen = {change_id: at for change_id, at in self._seen.items() if at >= horizon}
+        self.polls += 1
+        self.changes += new
+        return new
+
+    def stats(self):
+        return {'polls': self.polls, 'changes': self.changes, 'errors': self.errors}
@@ -0,0 +1,267 @@
+#!/usr/bin/env python3
+"""
+Link Index
+Immutable, memory-mapped snapshot of active links shared by all workers
+
+File layout (little-endian):
+
+    header       magic, record count, key width, url count, section offsets, build time
+    records      sorted fixed-width rows: token (NUL padded), link id, 6 url ids
+    url offsets  (url count + 1) uint64 offsets into the url blob
+    url blob     UTF-8 URLs, de-duplicated
+
+Every worker maps the same file read-only, so the page cache holds a single
+copy and a lookup is a binary search over the record table (narrowed first by
+a small in-memory sample of keys).
+"""
+
+from array import array
+from bisect import bisect_right
+import mmap
+import os
+import shutil
+import struct
+import sys
+import tempfile
+import threading
+import time
+
+from link_cache import LinkRecord
+
+
+MAGIC = b'LNKIDX01'
+HEADER = struct.Struct('<8sQIIQQQd')
+RECORD_TAIL = struct.Struct('<q6I')
+NO_URL = 0xFFFFFFFF
+OFFSET = struct.Struct('<Q')
+FENCE_STRIDE = 128
+
+
+def write_index(path, rows, key_width, built_at=None):
+    """
+    Write an index file from rows sorted by token
+
+    rows yields (token, link_id, android_url, ios_url, windows_url,
+    macos_url, linux_url, fallback_url) in ascending byte order of token.
+    The file is written next to `path` and atomically renamed into place,
+    so readers never see a partial snapshot. built_at (epoch seconds, default
+    now) should be taken before the rows were queried: links changed after
+    it are looked up in the database instead (see LinkIndex.mark_changed).
+    Returns the record count.
+    """
+    if built_at is None:
+        built_at = time.time()
+    tmp_path = f'{path}.tmp.{os.getpid()}'
+    url_ids = {}
+    url_offsets = array('Q', [0])
+    count = 0
+    previous = b''
+
+    with open(tmp_path, 'wb') as f, tempfile.TemporaryFile(dir=os.path.dirname(os.path.abspath(path))) as blob:
+        f.write(b'\0' * HEADER.size)
+        records_offset = f.tell()
+
+        for row in rows:
+            token = row[0].encode()
+            if len(token) > key_width:
+                raise ValueError(f'token {row[0]!r} is longer than key width {key_width}')
+            if token <= previous and count:
+                raise ValueError('rows must be sorted by token and unique')
+            previous = token
+
+            ids = []
+            for url in row[2:8]:
+                if not url:
+                    ids.append(NO_URL)
+                    continue
+                url_id = url_ids.get(url)
+                if url_id is None:
+                    # URLs are streamed to a side file so only the dedupe map stays in memory
+                    url_id = url_ids[url] = len(url_offsets) - 1
+                    data = url.encode()
+                    blob.write(data)
+                    url_offsets.append(url_offsets[-1] + len(data))
+                ids.append(url_id)
+
+            f.write(token.ljust(key_width, b'\0'))
+            f.write(RECORD_TAIL.pack(row[1], *ids))
+            count += 1
+
+        url_offsets_offset = f.tell()
+        if sys.byteorder != 'little':
+            url_offsets.byteswap()
+        f.write(url_offsets.tobytes())
+
+        blob_offset = f.tell()
+        blob.seek(0)
+        shutil.copyfileobj(blob, f, 1 << 20)
+
+        f.seek(0)
+        f.write(HEADER.pack(MAGIC, count, key_width, len(url_offsets) - 1,
+                            records_offset, url_offsets_offset, blob_offset, built_at))
+        f.flush()
+        os.fsync(f.fileno())
+
+    os.replace(tmp_path, path)
+    return count
+
+
+class _Snapshot:
+    """One mapped version of the index file"""
+
+    def __init__(self, path):
+        with open(path, 'rb') as f:
+            stat = os.fstat(f.fileno())
+            self.identity = (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+            self.map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        (magic, self.count, self.key_width, self.url_count, self.records_offset,
+         self.url_offsets_offset, self.blob_offset, self.built_at) = HEADER.unpack_from(self.map, 0)
+        if magic != MAGIC:
+            raise ValueError(f'{path} is not a link index file')
+        self.record_size = self.key_width + RECORD_TAIL.size
+        self.size = stat.st_size
+
+        # Every FENCE_STRIDE-th key kept in memory: bisect (in C) picks the
+        # block, leaving only a few probes of the mapped table per lookup
+        self.fence = [self._key(i) for i in range(0, self.count, FENCE_STRIDE)]
+
+    def _key(self, position):
+        offset = self.records_offset + position * self.record_size
+        return self.map[offset:offset + self.key_width]
+
+    def find(self, token):
+        key = token.encode()
+        if len(key) > self.key_width:
+            return None
+        key = key.ljust(self.key_width, b'\0')
+
+        block = bisect_right(self.fence, key) - 1
+        if block < 0:
+            return None
+
+        data = self.map
+        base = self.records_offset
+        size = self.record_size
+        width = self.key_width
+        low = block * FENCE_STRIDE
+        high = min(low + FENCE_STRIDE, self.count)
+        while low < high:
+            middle = (low + high) // 2
+            offset = base + middle * size
+            probe = data[offset:offset + width]
+            if probe < key:
+                low = middle + 1
+            elif probe > key:
+                high = middle
+            else:
+                link_id, *url_ids = RECORD_TAIL.unpack_from(data, offset + width)
+                return LinkRecord(link_id, True, *(self._url(url_id) for url_id in url_ids))
+        return None
+
+    def _url(self, url_id):
+        if url_id == NO_URL:
+            return None
+        start, end = struct.unpack_from('<QQ', self.map, self.url_offsets_offset + url_id * OFFSET.size)
+        return self.map[self.blob_offset + start:self.blob_offset + end].decode()
+
+
+class _EmptySnapshot:
+    """Stands in until the first index file has been built"""
+
+    identity = None
+    count = 0
+    size = 0
+    built_at = 0.0
+
+    def find(self, token):
+        return None
+
+
+class LinkIndex:
+    """
+    Reader for a link index file with hot reload
+
+    At most every check_interval seconds a lookup stats the path; if a new
+    snapshot has been renamed into place it is mapped and swapped in. The old
+    mapping is left to the garbage collector so in-flight lookups finish.
+    A missing file reads as an empty index until one is built.
+
+    Tokens passed to mark_changed() are not served from a snapshot built
+    before (or up to change_margin seconds after) their change, so edits and
+    deactivations take effect before the next rebuild.
+    """
+
+    def __init__(self, path, check_interval=5.0, change_margin=60.0):
+        self.path = path
+        self.check_interval = check_interval
+        self.change_margin = change_margin
+        self.lookups = 0
+        self.hits = 0
+        self.reloads = 0
+        self._lock = threading.Lock()
+        self._snapshot = _Snapshot(path) if os.path.exists(path) else _EmptySnapshot()
+        self._next_check = time.monotonic() + check_interval
+        self._changed = {}  # token -> epoch seconds of its latest change
+
+    @classmethod
+    def for_path(cls, path, check_interval=5.0, change_margin=60.0):
+        """Return a LinkIndex for path, or None if no path is configured"""
+        if not path:
+            return None
+        return cls(path, check_interval, change_margin)
+
+    @property
+    def built_at(self):
+        return self._snapshot.built_at
+
+    def mark_changed(self, token, changed_at):
+        """Record that token was edited at changed_at (epoch seconds)"""
+        if changed_at >= self._snapshot.built_at - self.change_margin:
+            self._changed[token] = max(changed_at, self._changed.get(token, changed_at))
+
+    def _maybe_reload(self):
+        now = time.monotonic()
+        if now < self._next_check:
+            return
+        with self._lock:
+            if now < self._next_check:
+                return
+            self._next_check = now + self.check_interval
+            try:
+                stat = os.stat(self.path)
+            except FileNotFoundError:
+                return
+            if (stat.st_ino, stat.st_mtime_ns, stat.st_size) != self._snapshot.identity:
+                try:
+                    self._snapshot = _Snapshot(self.path)
+                    self.reloads += 1
+                    cutoff = self._snapshot.built_at - self.change_margin
+                    self._changed = {token: at for token, at in self._changed.items() if at >= cutoff}
+                except Exception as e:
+                    print(f"Error reloading link index: {e}")
+
+    def get(self, token):
+        """Return the LinkRecord for an active token in the snapshot, or None"""
+        self._maybe_reload()
+        self.lookups += 1
+        snapshot = self._snapshot
+        changed_at = self._changed.get(token)
+        if changed_at is not None and changed_at >= snapshot.built_at - self.change_margin:
+            return None  # edited since this snapshot was built
+        record = snapshot.find(token)
+        if record is not None:
+            self.hits += 1
+        return record
+
+    def stats(self):
+        snapshot = self._snapshot
+        return {
+            'links': snapshot.count,
+            'bytes': snapshot.size,
+            'built_at': snapshot.built_at,
+            'lookups': self.lookups,
+            'hits': self.hits,
+            'reloads': self.reloads,
+            'changed': len(self._changed),
+        }
@@ -0,0 +1,259 @@
+#!/usr/bin/env python3
+"""
+Metrics
+Prometheus text exposition aggregated across gunicorn worker processes
+
+Each process keeps its counters and histograms in memory (a dict update per
+observation on the hot path) and periodically writes a JSON snapshot to a
+shared directory. Whichever worker serves /metrics merges every snapshot, so
+the numbers cover all workers no matter which one is scraped.
+"""
+
+from bisect import bisect_left
+import json
+import os
+import threading
+import time
+
+
+DEFAULT_BUCKETS = (
+    0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0
+)
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_labels(names, values, extra=()):
+    pairs = list(zip(names, values)) + list(extra)
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in pairs) + '}'
+
+
+def _format_value(value):
+    return repr(float(value)) if isinstance(value, float) and not value.is_integer() else str(int(value))
+
+
+class _Metric:
+    kind = None
+
+    def __init__(self, registry, name, documentation, labelnames=()):
+        self.registry = registry
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = registry._lock
+
+
+class Counter(_Metric):
+    """Monotonic counter, summed across processes"""
+
+    kind = 'counter'
+
+    def inc(self, *labels, amount=1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def set_total(self, *labels, value):
+        """Record a running total kept elsewhere in this process (e.g. ClickWriter.dropped)"""
+        with self._lock:
+            self._values[labels] = value
+
+
+class Gauge(_Metric):
+    """Point-in-time value, reported per process with a pid label"""
+
+    kind = 'gauge'
+
+    def set(self, *labels, value):
+        with self._lock:
+            self._values[labels] = value
+
+
+class Histogram(_Metric):
+    """Bucketed distribution, summed across processes"""
+
+    kind = 'histogram'
+
+    def __init__(self, registry, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(registry, name, documentation, labelnames)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value, *labels):
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            state = self._values.get(labels)
+            if state is None:
+                state = self._values[labels] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            state[0][index] += 1
+            state[1] += value
+            state[2] += 1
+
+
+class Registry:
+    """
+    Process-local metric registry with file-based multi-process aggregation
+
+    directory defaults to METRICS_DIR, which gunicorn.conf.py points at a
+    fresh directory shared by all workers of one master. Without it the
+    registry only reports the current process.
+    """
+
+    def __init__(self, directory=None, flush_interval=2.0):
+        self.directory = directory or os.environ.get('METRICS_DIR')
+        self.flush_interval = flush_interval
+        self.metrics = {}
+        self.collectors = []
+        self._lock = threading.Lock()
+        self._thread = None
+        self._pid = None
+
+    def counter(self, name, documentation, labelnames=()):
+        return self._register(Counter(self, name, documentation, labelnames))
+
+    def gauge(self, name, documentation, labelnames=()):
+        return self._register(Gauge(self, name, documentation, labelnames))
+
+    def histogram(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        return self._register(Histogram(self, name, documentation, labelnames, buckets))
+
+    def _register(self, metric):
+        self.metrics[metric.name] = metric
+        return metric
+
+    def register_collector(self, fn):
+        """fn() is called before each snapshot to refresh gauges and externally kept totals"""
+        self.collectors.append(fn)
+        return fn
+
+    # Snapshots
+
+    def _path(self, pid):
+        return os.path.join(self.directory, f'{pid}.json')
+
+    def snapshot(self):
+        for collector in self.collectors:
+            try:
+                collector()
+            except Exception as e:
+                print(f"Error in metrics collector: {e}")
+        with self._lock:
+            return {
+                name: [[list(labels), value] for labels, value in metric._values.items()]
+                if metric.kind != 'histogram' else
+                [[list(labels), list(state[0]), state[1], state[2]] for labels, state in metric._values.items()]
+                for name, metric in self.metrics.items()
+            }
+
+    def write_snapshot(self):
+        """Write this process's values where other workers can read them (atomic rename)"""
+        if not self.directory:
+            return
+        os.makedirs(self.directory, exist_ok=True)
+        pid = os.getpid()
+        data = {'pid': pid, 'written_at': time.time(), 'metrics': self.snapshot()}
+        tmp_path = self._path(pid) + '.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump(data, f)
+        os.replace(tmp_path, self._path(pid))
+
+    def _run(self):
+        while True:
+            time.sleep(self.flush_interval)
+            try:
+                self.write_snapshot()
+            except Exception as e:
+                print(f"Error writing metrics snapshot: {e}")
+
+    def start(self):
+        """Start the periodic snapshot writer in this process (idempotent, fork-aware)"""
+        if not self.directory or (self._thread is not None and self._pid == os.getpid()):
+            return
+        with self._lock:
+            if self._thread is None or self._pid != os.getpid():
+                self._pid = os.getpid()
+                self._thread = threading.Thread(target=self._run, name='metrics-writer', daemon=True)
+                self._thread.start()
+
+    def _read_snapshots(self):
+        own_pid = os.getpid()
+        snapshots = [{'pid': own_pid, 'metrics': self.snapshot()}]
+        if not self.directory:
+            return snapshots
+        try:
+            names = os.listdir(self.directory)
+        except FileNotFoundError:
+            return snapshots
+        for filename in names:
+            if not filename.endswith('.json') or filename == f'{own_pid}.json':
+                continue
+            try:
+                with open(os.path.join(self.directory, filename)) as f:
+                    snapshots.append(json.load(f))
+            except (OSError, ValueError):
+                continue
+        return snapshots
+
+    # Exposition
+
+    def render(self):
+        """Merge every process's snapshot into Prometheus text format"""
+        merged = {name: {} for name in self.metrics}
+        for snapshot in self._read_snapshots():
+            pid = snapshot['pid']
+            alive = pid == os.getpid() or _pid_alive(pid)
+            for name, samples in snapshot['metrics'].items():
+                metric = self.metrics.get(name)
+                if metric is None:
+                    continue
+                target = merged[name]
+                for sample in samples:
+                    labels = tuple(sample[0])
+                    if metric.kind == 'gauge':
+                        # Gauges of exited workers are meaningless; keep live ones per pid
+                        if alive:
+                            target[labels + (str(pid),)] = sample[1]
+                    elif metric.kind == 'counter':
+                        target[labels] = target.get(labels, 0) + sample[1]
+                    else:
+                        buckets, total, count = sample[1], sample[2], sample[3]
+                        state = target.setdefault(labels, [[0] * len(buckets), 0.0, 0])
+                        state[0] = [a + b for a, b in zip(state[0], buckets)]
+                        state[1] += total
+                        state[2] += count
+
+        lines = []
+        for name, metric in self.metrics.items():
+            lines.append(f'# HELP {name} {metric.documentation}')
+            lines.append(f'# TYPE {name} {metric.kind}')
+            for labels, value in sorted(merged[name].items()):
+                if metric.kind == 'gauge':
+                    label_text = _format_labels(metric.labelnames + ('pid',), labels)
+                    lines.append(f'{name}{label_text} {_format_value(value)}')
+                elif metric.kind == 'counter':
+                    lines.append(f'{name}{_format_labels(metric.labelnames, labels)} {_format_value(value)}')
+                else:
+                    buckets, total, count = value
+                    cumulative = 0
+                    for bound, bucket_count in zip(metric.buckets + (float('inf'),), buckets):
+                        cumulative += bucket_count
+                        le = '+Inf' if bound == float('inf') else repr(bound)
+                        label_text = _format_labels(metric.labelnames, labels, [('le', le)])
+                        lines.append(f'{name}_bucket{label_text} {cumulative}')
+                    label_text = _format_labels(metric.labelnames, labels)
+                    lines.append(f'{name}_sum{label_text} {_format_value(total)}')
+                    lines.append(f'{name}_count{label_text} {count}')
+        return '\n'.join(lines) + '\n'
+
+
+def _pid_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
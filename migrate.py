@@ -0,0 +1,42 @@
+#!/usr/bin/env python3
+"""
+Migrate: Bring the database schema up to date
+Run once per deploy (before starting workers)
+"""
+
+import argparse
+
+from app import app, db
+import migrations
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Apply pending schema migrations')
+    parser.add_argument('--status', action='store_true', help='list pending migrations without applying them')
+    args = parser.parse_args()
+
+    with app.app_context():
+        if args.status:
+            pending = migrations.pending(db.engine)
+            for version, description in pending:
+                print(f"pending {version}: {description}")
+            if not pending:
+                print("✅ Schema is up to date")
+            return
+
+        try:
+            applied = migrations.upgrade(db.engine)
+            if applied:
+                print(f"\n✅ Applied {len(applied)} migration(s)")
+            else:
+                print("✅ Schema is up to date")
+        except Exception as e:
+            print(f"❌ Migration failed: {e}")
+            raise
+
+
+if __name__ == '__main__':
+    print("=" * 60)
+    print("MIGRATE")
+    print("=" * 60)
+    main()
@@ -0,0 +1,222 @@
+#!/usr/bin/env python3
+"""
+Migrations
+Ordered, versioned schema changes that run on both SQLite and PostgreSQL
+
+Applied versions are recorded in schema_migrations. Each migration declares
+the tables it touches with plain SQLAlchemy Core (not the app's models) so it
+keeps producing the same schema as the models evolve, and is written to be
+safe on databases that were created by db.create_all() before versioning.
+
+Run `python migrate.py` once per deploy; workers never touch the schema.
+"""
+
+from datetime import datetime
+
+from sqlalchemy import (
+    MetaData, Table, Column, Integer, BigInteger, SmallInteger, String, Text, DateTime, Date, Boolean,
+    ForeignKey, Index, inspect, select, text,
+)
+
+
+MIGRATIONS = []
+
+VERSION_TABLE = Table(
+    'schema_migrations', MetaData(),
+    Column('version', Integer, primary_key=True, autoincrement=False),
+    Column('description', String(200), nullable=False),
+    Column('applied_at', DateTime, nullable=False),
+)
+
+# Arbitrary key for PostgreSQL's advisory lock so concurrent deploys serialise
+ADVISORY_LOCK_ID = 7316401
+
+
+def migration(version, description):
+    """Register fn(connection) as schema version `version`"""
+    def register(fn):
+        MIGRATIONS.append((version, description, fn))
+        MIGRATIONS.sort(key=lambda entry: entry[0])
+        return fn
+    return register
+
+
+def _has_table(connection, name):
+    return inspect(connection).has_table(name)
+
+
+def _has_index(connection, table, name):
+    return any(index['name'] == name for index in inspect(connection).get_indexes(table))
+
+
+def _smart_links(metadata):
+    return Table(
+        'smart_links', metadata,
+        Column('id', Integer, primary_key=True),
+        Column('token', String(64), unique=True, nullable=False, index=True),
+        Column('name', String(200)),
+        Column('android_url', Text),
+        Column('ios_url', Text),
+        Column('windows_url', Text),
+        Column('macos_url', Text),
+        Column('linux_url', Text),
+        Column('fallback_url', Text, nullable=False),
+        Column('click_count', Integer),
+        Column('created_at', DateTime),
+        Column('last_clicked_at', DateTime),
+        Column('is_active', Boolean),
+    )
+
+
+def _link_clicks(metadata):
+    return Table(
+        'link_clicks', metadata,
+        Column('id', Integer, primary_key=True),
+        Column('link_id', Integer, ForeignKey('smart_links.id'), nullable=False, index=True),
+        Column('clicked_at', DateTime, nullable=False, index=True),
+        Column('device_type', String(20)),
+        Column('user_agent', Text),
+        Column('ip_address', String(45)),
+        Column('country', String(2)),
+        Column('redirected_to', Text),
+    )
+
+
+@migration(1, 'Create smart_links and link_clicks')
+def create_base_tables(connection):
+    metadata = MetaData()
+    _smart_links(metadata)
+    _link_clicks(metadata)
+    metadata.create_all(connection, checkfirst=True)
+
+
+@migration(2, 'Add composite (link_id, clicked_at) index on link_clicks')
+def add_click_time_index(connection):
+    if not _has_index(connection, 'link_clicks', 'ix_link_clicks_link_id_clicked_at'):
+        metadata = MetaData()
+        clicks = _link_clicks(metadata)
+        Index('ix_link_clicks_link_id_clicked_at', clicks.c.link_id, clicks.c.clicked_at).create(connection)
+
+
+@migration(3, 'Create click_rollups')
+def create_click_rollups(connection):
+    metadata = MetaData()
+    _smart_links(metadata)
+    Table(
+        'click_rollups', metadata,
+        Column('link_id', Integer, ForeignKey('smart_links.id'), primary_key=True),
+        Column('day', Date, primary_key=True),
+        Column('device_type', String(20), primary_key=True),
+        Column('clicks', Integer, nullable=False),
+    )
+    metadata.tables['click_rollups'].create(connection, checkfirst=True)
+
+
+@migration(4, 'Create link_counter_shards')
+def create_link_counter_shards(connection):
+    metadata = MetaData()
+    _smart_links(metadata)
+    Table(
+        'link_counter_shards', metadata,
+        Column('link_id', Integer, ForeignKey('smart_links.id'), primary_key=True),
+        Column('shard', SmallInteger, primary_key=True, autoincrement=False),
+        Column('clicks', Integer, nullable=False),
+        Column('last_clicked_at', DateTime),
+    )
+    metadata.tables['link_counter_shards'].create(connection, checkfirst=True)
+
+
+@migration(5, 'Create country_rollups')
+def create_country_rollups(connection):
+    metadata = MetaData()
+    _smart_links(metadata)
+    Table(
+        'country_rollups', metadata,
+        Column('link_id', Integer, ForeignKey('smart_links.id'), primary_key=True),
+        Column('day', Date, primary_key=True),
+        Column('country', String(8), primary_key=True),
+        Column('clicks', Integer, nullable=False),
+    )
+    metadata.tables['country_rollups'].create(connection, checkfirst=True)
+
+
+@migration(6, 'Create user_agents and destinations; add user_agent_id and destination_id to link_clicks')
+def add_normalized_click_storage(connection):
+    metadata = MetaData()
+    Table(
+        'user_agents', metadata,
+        Column('id', BigInteger, primary_key=True, autoincrement=False),
+        Column('user_agent', Text, nullable=False),
+    )
+    Table(
+        'destinations', metadata,
+        Column('id', BigInteger, primary_key=True, autoincrement=False),
+        Column('url', Text, nullable=False),
+    )
+    metadata.create_all(connection, checkfirst=True)
+
+    columns = {column['name'] for column in inspect(connection).get_columns('link_clicks')}
+    if 'user_agent_id' not in columns:
+        connection.execute(text('ALTER TABLE link_clicks ADD COLUMN user_agent_id BIGINT'))
+    if 'destination_id' not in columns:
+        connection.execute(text('ALTER TABLE link_clicks ADD COLUMN destination_id BIGINT'))
+
+
+@migration(7, 'Add version and updated_at to smart_links; create link_changes')
+def add_link_versions(connection):
+    columns = {column['name'] for column in inspect(connection).get_columns('smart_links')}
+    if 'version' not in columns:
+        connection.execute(text('ALTER TABLE smart_links ADD COLUMN version INTEGER NOT NULL DEFAULT 1'))
+    if 'updated_at' not in columns:
+        connection.execute(text('ALTER TABLE smart_links ADD COLUMN updated_at TIMESTAMP'))
+
+    metadata = MetaData()
+    Table(
+        'link_changes', metadata,
+        Column('id', Integer, primary_key=True),
+        Column('link_id', Integer, nullable=False),
+        Column('token', String(64), nullable=False),
+        Column('version', Integer, nullable=False),
+        Column('changed_at', DateTime, nullable=False, index=True),
+    )
+    metadata.tables['link_changes'].create(connection, checkfirst=True)
+
+
+def applied_versions(connection):
+    if not _has_table(connection, VERSION_TABLE.name):
+        return set()
+    return set(connection.execute(select(VERSION_TABLE.c.version)).scalars())
+
+
+def pending(engine):
+    """Return [(version, description)] not yet applied"""
+    with engine.connect() as connection:
+        done = applied_versions(connection)
+    return [(version, description) for version, description, _ in MIGRATIONS if version not in done]
+
+
+def upgrade(engine, log=print):
+    """Apply every pending migration in order, each in its own transaction"""
+    with engine.connect() as lock_connection:
+        if engine.dialect.name == 'postgresql':
+            lock_connection.execute(text('SELECT pg_advisory_lock(:id)'), {'id': ADVISORY_LOCK_ID})
+        try:
+            with engine.begin() as connection:
+                VERSION_TABLE.create(connection, checkfirst=True)
+
+            applied = []
+            for version, description, fn in MIGRATIONS:
+                with engine.begin() as connection:
+                    if version in applied_versions(connection):
+                        continue
+                    log(f"Applying {version}: {description}")
+                    fn(connection)
+                    connection.execute(VERSION_TABLE.insert().values(
+                        version=version, description=description, applied_at=datetime.utcnow()
+                    ))
+                applied.append(version)
+            return applied
+        finally:
+            if engine.dialect.name == 'postgresql':
+                lock_connection.execute(text('SELECT pg_advisory_unlock(:id)'), {'id': ADVISORY_LOCK_ID})
+                lock_connection.commit()
@@ -0,0 +1,176 @@
+#!/usr/bin/env python3
+"""
+Request Profiling
+Opt-in cProfile and SQL capture for individual Flask requests
+
+A request is profiled when it carries the secret header
+(`X-Profile: <PROFILE_SECRET>`) or is picked by 1-in-N sampling. Each
+profiled request leaves two files in <directory>/<route>/:
+
+    <id>.prof   cProfile stats (python -m pstats, snakeviz, ...)
+    <id>.json   method, path, status, duration and every SQL statement
+                run on the request's thread, grouped with count and timings
+
+Nothing is registered unless RequestProfiler.init_app() is called, so a
+disabled profiler adds no work to any request. Only one request per process
+is profiled at a time; others arriving meanwhile run unprofiled.
+"""
+
+import contextvars
+import cProfile
+from collections import defaultdict
+import hmac
+import json
+import os
+import random
+import re
+import threading
+import time
+
+from flask import g, request
+from sqlalchemy import event
+
+
+MAX_STATEMENT_CHARS = 1000
+
+# SQL capture for the profile running in this thread/context, if any
+_active_queries = contextvars.ContextVar('profile_queries', default=None)
+
+
+class RequestProfiler:
+    """
+    Profile requests selected by `header` == secret or with probability 1/sample_every
+
+    sample_every=0 disables sampling; secret=None disables the header. Up
+    to `keep` dumps are kept per route, oldest deleted first.
+    """
+
+    def __init__(self, directory, secret=None, sample_every=0, header='X-Profile', keep=50):
+        self.directory = directory
+        self.secret = secret
+        self.sample_every = sample_every
+        self.header = header
+        self.keep = keep
+        self._busy = threading.Lock()
+        self.profiled = 0
+        self.skipped_busy = 0
+
+    def init_app(self, app, engines):
+        """Install request hooks on app and SQL timing listeners on each engine"""
+        os.makedirs(self.directory, exist_ok=True)
+        app.before_request(self._start)
+        app.after_request(self._finish)
+        app.teardown_request(self._abandon)
+        for engine in engines:
+            event.listen(engine, 'before_cursor_execute', _before_cursor_execute)
+            event.listen(engine, 'after_cursor_execute', _after_cursor_execute)
+
+    def _selected(self):
+        if self.secret:
+            value = request.headers.get(self.header)
+            if value is not None and hmac.compare_digest(value, self.secret):
+                return True
+        return self.sample_every > 0 and random.randrange(self.sample_every) == 0
+
+    def _start(self):
+        if not self._selected():
+            return
+        # cProfile hooks are process-wide on newer Pythons: one profile at a time
+        if not self._busy.acquire(blocking=False):
+            self.skipped_busy += 1
+            return
+        g.profile_queries = []
+        g.profile_token = _active_queries.set(g.profile_queries)
+        g.profile_started = time.perf_counter()
+        g.profile = cProfile.Profile()
+        g.profile.enable()
+
+    def _stop(self):
+        profile = g.pop('profile', None)
+        if profile is None:
+            return None
+        profile.disable()
+        _active_queries.reset(g.pop('profile_token'))
+        self._busy.release()
+        return profile
+
+    def _finish(self, response):
+        profile = self._stop()
+        if profile is not None:
+            seconds = time.perf_counter() - g.pop('profile_started')
+            profile_id = self._write(profile, g.pop('profile_queries'), response.status_code, seconds)
+            response.headers['X-Profile-Id'] = profile_id
+        return response
+
+    def _abandon(self, exception):
+        """Release the profiler if the request failed before after_request ran"""
+        self._stop()
+
+    def _write(self, profile, queries, status, seconds):
+        route = request.url_rule.rule if request.url_rule else 'unmatched'
+        directory = os.path.join(self.directory, re.sub(r'[^A-Za-z0-9]+', '_', route).strip('_') or 'root')
+        os.makedirs(directory, exist_ok=True)
+        profile_id = f'{time.strftime("%Y%m%dT%H%M%S")}-{os.getpid()}-{self.profiled:06d}'
+        self.profiled += 1
+
+        profile.dump_stats(os.path.join(directory, f'{profile_id}.prof'))
+        with open(os.path.join(directory, f'{profile_id}.json'), 'w') as f:
+            json.dump({
+                'id': profile_id,
+                'route': route,
+                'method': request.method,
+                'path': request.full_path,
+                'status': status,
+                'duration_ms': round(seconds * 1000, 3),
+                'sql': sql_summary(queries),
+            }, f, indent=2)
+        self._trim(directory)
+        return profile_id
+
+    def _trim(self, directory):
+        dumps = sorted(name[:-len('.json')] for name in os.listdir(directory) if name.endswith('.json'))
+        for stem in dumps[:max(0, len(dumps) - self.keep)]:
+            for suffix in ('.json', '.prof'):
+                try:
+                    os.remove(os.path.join(directory, stem + suffix))
+                except FileNotFoundError:
+                    pass
+
+    def stats(self):
+        return {'profiled': self.profiled, 'skipped_busy': self.skipped_busy}
+
+
+def sql_summary(queries):
+    """Statement count, total time and per-statement timings, slowest first"""
+    grouped = defaultdict(list)
+    for statement, seconds in queries:
+        grouped[statement].append(seconds)
+    statements = [
+        {
+            'statement': statement[:MAX_STATEMENT_CHARS],
+            'count': len(timings),
+            'total_ms': round(sum(timings) * 1000, 3),
+            'max_ms': round(max(timings) * 1000, 3),
+        }
+        for statement, timings in grouped.items()
+    ]
+    statements.sort(key=lambda entry: entry['total_ms'], reverse=True)
+    return {
+        'count': len(queries),
+        'total_ms': round(sum(seconds for _, seconds in queries) * 1000, 3),
+        'statements': statements,
+    }
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if _active_queries.get() is not None:
+        conn.info.setdefault('profile_query_started', []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    queries = _active_queries.get()
+    if queries is None:
+        return
+    started = conn.info.get('profile_query_started')
+    if started:
+        queries.append((statement, time.perf_counter() - started.pop()))
@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+"""
+Retention: Delete raw clicks older than CLICK_RETENTION_DAYS
+Run periodically (e.g. from cron, or with --interval as a sidecar process)
+
+Clicks are deleted oldest first in small batches, one short transaction each,
+so redirects writing new clicks are never blocked for long. Per-day rollups,
+link counters and stats are left untouched and keep the totals; only the raw
+rows behind /api/analytics/<token>/clicks, ?source=raw and exports age out.
+The cutoff is rounded down to midnight UTC so whole days are removed, which
+lets backfill_rollups.py rebuild every remaining day without losing counts.
+"""
+
+import argparse
+import os
+import time
+from datetime import datetime, timedelta
+
+from app import app, db, LinkClick
+from sqlalchemy import select, delete, func
+
+
+RETENTION_DAYS = os.environ.get('CLICK_RETENTION_DAYS')
+
+# Fixed-width columns (id, link_id, clicked_at, user_agent_id,
+# destination_id) per row; variable-width columns are measured with
+# length(), so the byte count is an estimate of row data only and does not
+# include index entries or per-row overhead
+FIXED_ROW_BYTES = 40
+
+
+def row_bytes():
+    return FIXED_ROW_BYTES + sum(
+        func.coalesce(func.length(column), 0)
+        for column in (LinkClick.device_type, LinkClick.user_agent, LinkClick.ip_address,
+                       LinkClick.country, LinkClick.redirected_to)
+    )
+
+
+def prune(retention_days, batch_size=5000, pause=0.0, dry_run=False):
+    """
+    Delete clicks from days older than retention_days, batch_size rows per transaction
+
+    Sleeps `pause` seconds between batches to leave room for other writers.
+    Returns {'cutoff', 'rows', 'bytes', 'batches'}; with dry_run nothing is
+    deleted and the totals describe what would be.
+    """
+    cutoff = (datetime.utcnow() - timedelta(days=retention_days)).replace(hour=0, minute=0, second=0, microsecond=0)
+    report = {'cutoff': cutoff.isoformat(), 'rows': 0, 'bytes': 0, 'batches': 0}
+
+    with app.app_context():
+        if dry_run:
+            rows, size = db.session.execute(
+                select(func.count(), func.coalesce(func.sum(row_bytes()), 0))
+                .where(LinkClick.clicked_at < cutoff)
+            ).one()
+            report.update(rows=rows, bytes=int(size))
+            return report
+
+        try:
+            while True:
+                # Oldest first via the clicked_at index; ids keep the delete exact
+                batch = select(LinkClick.id).where(LinkClick.clicked_at < cutoff) \
+                    .order_by(LinkClick.clicked_at).limit(batch_size)
+                ids = db.session.execute(batch).scalars().all()
+                if not ids:
+                    break
+
+                size = db.session.execute(
+                    select(func.coalesce(func.sum(row_bytes()), 0)).where(LinkClick.id.in_(ids))
+                ).scalar()
+                db.session.execute(delete(LinkClick).where(LinkClick.id.in_(ids)))
+                db.session.commit()
+
+                report['rows'] += len(ids)
+                report['bytes'] += int(size)
+                report['batches'] += 1
+                if len(ids) < batch_size:
+                    break
+                if pause:
+                    time.sleep(pause)
+
+        except Exception as e:
+            print(f"❌ Pruning failed: {e}")
+            db.session.rollback()
+            raise
+
+    return report
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Delete raw clicks older than the retention period')
+    parser.add_argument('--days', type=float, default=float(RETENTION_DAYS) if RETENTION_DAYS else None,
+                        help='keep this many days of clicks (default: CLICK_RETENTION_DAYS)')
+    parser.add_argument('--batch-size', type=int, default=5000, help='rows per transaction')
+    parser.add_argument('--pause', type=float, default=0.0, help='seconds to sleep between batches')
+    parser.add_argument('--dry-run', action='store_true', help='report what would be deleted')
+    parser.add_argument('--interval', type=float, default=None, help='keep running, pruning every N seconds')
+    args = parser.parse_args()
+
+    if args.days is None:
+        parser.error('set CLICK_RETENTION_DAYS or pass --days')
+
+    while True:
+        started = time.perf_counter()
+        report = prune(args.days, args.batch_size, args.pause, args.dry_run)
+        verb = 'Would delete' if args.dry_run else 'Deleted'
+        print(f"✅ {verb} {report['rows']:,} clicks before {report['cutoff']} "
+              f"(~{report['bytes'] / 1e6:.1f} MB of row data) in {report['batches']} batches, "
+              f"{time.perf_counter() - started:.2f}s")
+        if args.interval is None:
+            break
+        time.sleep(args.interval)
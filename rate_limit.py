@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+"""
+Rate Limit
+Per-key token buckets held in memory (one set per worker process)
+"""
+
+from collections import OrderedDict
+import threading
+import time
+
+
+class TokenBucketLimiter:
+    """
+    Allow `rate` events per second per key, with bursts of up to `burst`
+
+    Each key's bucket refills continuously and is stored as (tokens, last
+    refill time). Only the max_keys most recently seen keys are tracked; a
+    forgotten key starts again with a full bucket, which errs on the side
+    of allowing.
+    """
+
+    def __init__(self, rate, burst, max_keys=100000, clock=time.monotonic):
+        self.rate = rate
+        self.burst = burst
+        self.max_keys = max_keys
+        self.clock = clock
+        self._buckets = OrderedDict()
+        self._lock = threading.Lock()
+        self.allowed = 0
+        self.limited = 0
+        self.evictions = 0
+
+    def allow(self, key, cost=1.0):
+        """Take `cost` tokens from key's bucket; False if it does not have them"""
+        now = self.clock()
+        with self._lock:
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                tokens = self.burst
+                if len(self._buckets) >= self.max_keys:
+                    self._buckets.popitem(last=False)
+                    self.evictions += 1
+            else:
+                tokens, last = bucket
+                tokens = min(self.burst, tokens + (now - last) * self.rate)
+                self._buckets.move_to_end(key)
+
+            if tokens >= cost:
+                self._buckets[key] = (tokens - cost, now)
+                self.allowed += 1
+                return True
+            self._buckets[key] = (tokens, now)
+            self.limited += 1
+            return False
+
+    def stats(self):
+        return {
+            'keys': len(self._buckets),
+            'max_keys': self.max_keys,
+            'allowed': self.allowed,
+            'limited': self.limited,
+            'evictions': self.evictions,
+        }
@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+"""
+Tokens
+Pluggable generators for link tokens
+
+    random  16 URL-safe characters from secrets (unguessable, the default)
+    time    11 base62 characters from a 63-bit time-ordered id:
+            41 bits of milliseconds since TOKEN_EPOCH, 10 bits of worker id
+            and 12 bits of per-millisecond sequence
+
+Time-ordered tokens are unique without a database check as long as every
+live process has its own worker id, and consecutive tokens land next to each
+other in the token index instead of at random pages. They reveal creation
+time and are guessable, so only use them where links are not secrets.
+"""
+
+import os
+import secrets
+import threading
+import time
+
+
+ALPHABET = '0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz'  # ASCII order
+TOKEN_EPOCH_MS = 1704067200000  # 2024-01-01T00:00:00Z
+
+TIMESTAMP_BITS = 41
+WORKER_BITS = 10
+SEQUENCE_BITS = 12
+MAX_WORKER_ID = (1 << WORKER_BITS) - 1
+MAX_SEQUENCE = (1 << SEQUENCE_BITS) - 1
+TIME_TOKEN_WIDTH = 11  # 62 ** 11 > 2 ** 63
+
+
+_PAIRS = [a + b for a in ALPHABET for b in ALPHABET]  # two digits per divmod
+
+
+def base62(number, width):
+    """Fixed-width base62, so string order matches numeric order"""
+    chars = []
+    for _ in range(width // 2):
+        number, remainder = divmod(number, 3844)
+        chars.append(_PAIRS[remainder])
+    if width % 2:
+        number, remainder = divmod(number, 62)
+        chars.append(ALPHABET[remainder])
+    if number:
+        raise ValueError(f'number does not fit in {width} base62 digits')
+    return ''.join(reversed(chars))
+
+
+def random_token():
+    """Generate a new random link token"""
+    return secrets.token_urlsafe(12)
+
+
+class TimeOrderedTokens:
+    """
+    Snowflake-style generator: callable returning the next token
+
+    worker_id defaults to TOKEN_WORKER_ID (set per worker by gunicorn.conf.py),
+    falling back to the process id, and is re-read after a fork so a
+    pre-forked master never hands its id and sequence to several workers.
+    If the clock steps backwards the last timestamp is reused until the
+    clock catches up, so tokens never repeat or go out of order.
+    """
+
+    def __init__(self, worker_id=None, epoch_ms=TOKEN_EPOCH_MS, clock=time.time):
+        if worker_id is not None and not 0 <= worker_id <= MAX_WORKER_ID:
+            raise ValueError(f'worker_id must be between 0 and {MAX_WORKER_ID}')
+        self.epoch_ms = epoch_ms
+        self.clock = clock
+        self._configured_worker_id = worker_id
+        self._lock = threading.Lock()
+        self._pid = None
+
+    def _reset(self):
+        worker_id = self._configured_worker_id
+        if worker_id is None:
+            worker_id = int(os.environ.get('TOKEN_WORKER_ID', os.getpid())) & MAX_WORKER_ID
+        self.worker_id = worker_id
+        self._last_ms = -1
+        self._sequence = 0
+        self._pid = os.getpid()
+
+    def _now_ms(self):
+        return int(self.clock() * 1000) - self.epoch_ms
+
+    def __call__(self):
+        with self._lock:
+            if self._pid != os.getpid():
+                self._reset()
+
+            now = max(self._now_ms(), self._last_ms)
+            if now == self._last_ms:
+                self._sequence = (self._sequence + 1) & MAX_SEQUENCE
+                if self._sequence == 0:
+                    # 4096 tokens this millisecond already: wait for the next one
+                    while now <= self._last_ms:
+                        now = self._now_ms()
+            else:
+                self._sequence = 0
+            self._last_ms = now
+
+            if now >> TIMESTAMP_BITS:
+                raise OverflowError('token timestamp exceeds 41 bits; move TOKEN_EPOCH_MS')
+            number = (now << (WORKER_BITS + SEQUENCE_BITS)) | (self.worker_id << SEQUENCE_BITS) | self._sequence
+            return base62(number, TIME_TOKEN_WIDTH)
+
+
+GENERATORS = {
+    'random': lambda: random_token,
+    'time': TimeOrderedTokens,
+}
+
+
+def make_generator(name):
+    """Return a zero-argument token generator by name (see GENERATORS)"""
+    if name not in GENERATORS:
+        raise ValueError(f'TOKEN_GENERATOR must be one of {sorted(GENERATORS)}, got {name!r}')
+    return GENERATORS[name]()